@@ -26,6 +26,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'organizations.instrumentation.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -33,6 +34,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'organizations.middleware.OrganizationContextMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -157,6 +159,68 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Default page size of the opt-in cursor pagination of plans, main and sub-activities
+# (organizations/pagination.py); clients may ask for up to 1000 with ?page_size=
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', '100'))
+
+# Cache shared by the costing reference data and the objective tree cache. It must be seen
+# by every process (web workers, run_import_worker, management commands): invalidations
+# are token bumps in this cache, and a per-process cache would keep serving stale trees.
+# Files on the local disk by default; with several hosts point CACHE_BACKEND at a shared
+# backend such as django.core.cache.backends.redis.RedisCache and CACHE_LOCATION at it
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', str(BASE_DIR / 'cache')),
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', '5000'))},
+    }
+}
+
+# Seconds a serialized objective tree stays cached (also invalidated when anything in it changes)
+OBJECTIVE_TREE_CACHE_TIMEOUT = int(os.getenv('OBJECTIVE_TREE_CACHE_TIMEOUT', '3600'))
+
+# Seconds a worker keeps its copy of /costing/reference-data/ (also invalidated on rate changes)
+COSTING_REFERENCE_CACHE_TIMEOUT = int(os.getenv('COSTING_REFERENCE_CACHE_TIMEOUT', '300'))
+
+# Per-request query count, SQL time, repeated queries and serialization time, reported in the
+# Server-Timing header and logged by organizations.instrumentation. Every request is measured
+# with DEBUG; in production set e.g. REQUEST_METRICS_SAMPLE_RATE=0.05 to measure a sample
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv('REQUEST_METRICS_SAMPLE_RATE', '1.0' if DEBUG else '0.0'))
+# Lets a client ask for the measurement of one request with the X-Request-Metrics: 1 header
+REQUEST_METRICS_ALLOW_HEADER_OPT_IN = os.getenv('REQUEST_METRICS_ALLOW_HEADER_OPT_IN', str(DEBUG)) == 'True'
+# A query shape repeated this many times in one request is logged as a warning (likely N+1)
+REQUEST_METRICS_DUPLICATE_THRESHOLD = int(os.getenv('REQUEST_METRICS_DUPLICATE_THRESHOLD', '5'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'organizations.instrumentation': {
+            'handlers': ['console'],
+            'level': os.getenv('REQUEST_METRICS_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+# Uploaded import files wait here for run_import_worker; web and worker processes must share it
+IMPORT_JOB_DIR = os.getenv('IMPORT_JOB_DIR', str(BASE_DIR / 'import_jobs'))
+# A RUNNING import job whose worker has not checkpointed for this many seconds is resumed by another worker
+IMPORT_JOB_STALE_AFTER = int(os.getenv('IMPORT_JOB_STALE_AFTER', '300'))
+
+
+# Rendered plan PDFs (GET /plans/<id>/export.pdf/), least recently downloaded evicted first
+PLAN_PDF_CACHE_DIR = os.getenv('PLAN_PDF_CACHE_DIR', str(BASE_DIR / 'plan_pdf_cache'))
+PLAN_PDF_CACHE_MAX_BYTES = int(os.getenv('PLAN_PDF_CACHE_MAX_BYTES', str(500 * 1024 * 1024)))
+PLAN_PDF_CACHE_MAX_FILES = int(os.getenv('PLAN_PDF_CACHE_MAX_FILES', '2000'))
+# Render threads per process, and how long a request waits for a render before getting a 202
+PLAN_PDF_WORKERS = int(os.getenv('PLAN_PDF_WORKERS', '2'))
+PLAN_PDF_WAIT_SECONDS = int(os.getenv('PLAN_PDF_WAIT_SECONDS', '30'))
+# Most plans one GET /plans/export.xlsx/ request writes; larger exports must be narrowed by filters
+PLAN_EXPORT_MAX_PLANS = int(os.getenv('PLAN_EXPORT_MAX_PLANS', '100'))
 
 SECURE_BROWSER_XSS_FILTER = False
 SECURE_CONTENT_TYPE_NOSNIFF = False
@@ -1,12 +1,14 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django import forms
 from .models import (
     Organization, OrganizationUser, StrategicObjective, 
     Program, StrategicInitiative, PerformanceMeasure, MainActivity,
     ActivityBudget, ActivityCostingAssumption, InitiativeFeed,
     Location, LandTransport, AirTransport, PerDiem, Accommodation,
-    ParticipantCost, SessionCost, PrintingCost, SupervisorCost,ProcurementItem,Plan,SubActivity
+    ParticipantCost, SessionCost, PrintingCost, SupervisorCost,ProcurementItem,Plan,SubActivity,ImportJob
 )
+from .costing_engine import recompute_sub_activity_costs
+from . import org_hierarchy
 admin.site.register(Plan)
 class OrganizationAdminForm(forms.ModelForm):
     core_values_text = forms.CharField(
@@ -26,6 +28,12 @@ class OrganizationAdminForm(forms.ModelForm):
         if self.instance.pk and self.instance.core_values:
             self.fields['core_values_text'].initial = '\n'.join(self.instance.core_values)
 
+    def clean_parent(self):
+        parent = self.cleaned_data.get('parent')
+        # Shown on the field instead of failing in the pre_save signal
+        org_hierarchy.validate_parent(self.instance, parent.pk if parent else None)
+        return parent
+
     def clean(self):
         cleaned_data = super().clean()
         # Convert newline-separated text back to list for JSON field
@@ -217,6 +225,21 @@ class ActivityCostingAssumptionAdmin(admin.ModelAdmin):
     search_fields = ('description',)
     ordering = ('activity_type', 'location', 'cost_type')
 
+def _report_recompute(modeladmin, request, summary):
+    modeladmin.message_user(
+        request,
+        f"Checked {summary['scanned']} tool-based sub-activities: {summary['changed']} would change, "
+        f"{summary['skipped']} skipped. Total cost {summary['total_before']:,.2f} -> {summary['total_after']:,.2f}. "
+        f"Nothing was saved; run the recompute_tool_costs command with --apply to save.",
+        messages.SUCCESS
+    )
+
+
+@admin.action(description="Preview costs of all tool-based sub-activities with current rates")
+def recompute_all_tool_costs(modeladmin, request, queryset):
+    _report_recompute(modeladmin, request, recompute_sub_activity_costs(dry_run=True))
+
+
 # New models registration
 @admin.register(Location)
 class LocationAdmin(admin.ModelAdmin):
@@ -237,6 +260,7 @@ class LocationAdmin(admin.ModelAdmin):
 
 @admin.register(LandTransport)
 class LandTransportAdmin(admin.ModelAdmin):
+    actions = [recompute_all_tool_costs]
     list_display = ('origin', 'destination', 'trip_type', 'price')
     list_filter = ('trip_type', 'origin__region', 'destination__region')
     search_fields = ('origin__name', 'destination__name')
@@ -251,6 +275,7 @@ class AirTransportAdmin(admin.ModelAdmin):
 
 @admin.register(PerDiem)
 class PerDiemAdmin(admin.ModelAdmin):
+    actions = [recompute_all_tool_costs]
     list_display = ('location', 'amount', 'hardship_allowance_amount')
     list_filter = ('location__region',)
     search_fields = ('location__name',)
@@ -258,6 +283,7 @@ class PerDiemAdmin(admin.ModelAdmin):
 
 @admin.register(Accommodation)
 class AccommodationAdmin(admin.ModelAdmin):
+    actions = [recompute_all_tool_costs]
     list_display = ('location', 'service_type', 'price')
     list_filter = ('service_type', 'location__region')
     search_fields = ('location__name',)
@@ -299,7 +325,8 @@ class ProcurementItemAdmin(admin.ModelAdmin):
     )
 @admin.register(SubActivity)
 class SubActivityAdmin(admin.ModelAdmin):
-    list_display = ('name', 'main_activity', 'activity_type')
+    list_display = ('name', 'main_activity', 'activity_type', 'budget_calculation_type', 'estimated_cost_with_tool')
+    actions = ['recompute_tool_costs']
     list_filter = ('main_activity', 'activity_type')
     search_fields = ('name',)
     ordering = ('main_activity', 'name')
@@ -308,3 +335,25 @@ class SubActivityAdmin(admin.ModelAdmin):
             'fields': ('name', 'main_activity', 'activity_type')
         }),
     )
+
+    @admin.action(description="Preview tool-based costs with current rates")
+    def recompute_tool_costs(self, request, queryset):
+        _report_recompute(self, request, recompute_sub_activity_costs(queryset=queryset, dry_run=True))
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'original_filename', 'rows_processed', 'rows_imported',
+                    'error_count', 'attempts', 'created_by', 'created_at')
+    list_filter = ('kind', 'status')
+    search_fields = ('original_filename',)
+    actions = ['retry_jobs']
+    readonly_fields = [field.name for field in ImportJob._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Retry selected failed jobs from their last checkpoint")
+    def retry_jobs(self, request, queryset):
+        retried = queryset.filter(status='FAILED').update(status='PENDING', attempts=0, failure_reason='', finished_at=None)
+        self.message_user(request, f"{retried} import jobs queued again.", messages.SUCCESS)
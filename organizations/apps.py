@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class OrganizationsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'organizations'
+
+    def ready(self):
+        # Connect cache invalidation and summary maintenance signal handlers
+        from . import signals  # noqa: F401
@@ -1,9 +1,74 @@
 import pandas as pd
 import json
 from decimal import Decimal
-from django.db import transaction
+from django.db import connection, transaction
 from django.core.exceptions import ValidationError
-from .models import SubActivity, MainActivity, Organization, ProcurementItem
+from .models import SubActivity, MainActivity, Organization, ProcurementItem, organization_scope_q
+from .plan_budget import mark_main_activities_dirty
+from .objective_cache import invalidate_main_activities
+
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def validate_file_format(file_path):
+    """Validate file format and return file type"""
+    if file_path.endswith('.csv'):
+        return 'csv'
+    elif file_path.endswith(('.xlsx', '.xls')):
+        return 'excel'
+    else:
+        raise ValueError('Unsupported file format. Please use CSV or Excel files.')
+
+
+def iter_file_chunks(file_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yield DataFrames of at most ``chunk_size`` rows, indexed by their line number in
+    the file (the header is line 1), without loading the whole file.
+
+    CSV is read with pandas ``chunksize``; XLSX with openpyxl in read-only mode, one
+    sheet row at a time. Legacy .xls files cannot be streamed and are read whole.
+    """
+    if validate_file_format(file_path) == 'csv':
+        for chunk in pd.read_csv(file_path, chunksize=chunk_size):
+            chunk.index = chunk.index + 2
+            yield chunk
+        return
+
+    if file_path.endswith('.xls'):
+        df = pd.read_excel(file_path)
+        df.index = df.index + 2
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+        return
+
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(column).strip() if column is not None else f'Unnamed: {i}' for i, column in enumerate(header)]
+
+        values, lines = [], []
+        for line, row in enumerate(rows, start=2):
+            if all(value is None or value == '' for value in row):
+                continue
+            values.append(row[:len(columns)])
+            lines.append(line)
+            if len(values) >= chunk_size:
+                yield pd.DataFrame(values, columns=columns, index=lines)
+                values, lines = [], []
+        if values:
+            yield pd.DataFrame(values, columns=columns, index=lines)
+    finally:
+        workbook.close()
+
+
+class JSONError:
+    """Marker for a details cell that is not valid JSON"""
 
 
 class BulkSubActivityImporter:
@@ -26,21 +91,37 @@ class BulkSubActivityImporter:
         'printing_details', 'supervision_details', 'partners_details'
     ]
 
-    def __init__(self, default_organization_id=None):
+    AMOUNT_COLUMNS = [
+        'estimated_cost_with_tool', 'estimated_cost_without_tool',
+        'government_treasury', 'sdg_funding', 'partners_funding', 'other_funding'
+    ]
+
+    JSON_COLUMNS = [
+        'training_details', 'meeting_workshop_details', 'procurement_details',
+        'printing_details', 'supervision_details', 'partners_details'
+    ]
+
+    DEFAULT_BATCH_SIZE = 1000
+
+    def __init__(self, default_organization_id=None, batch_size=None, chunk_size=None,
+                 main_activity_organization_ids=None):
         self.default_organization_id = default_organization_id
+        # Organizations whose main activities rows may name (with the shared ones); None is all
+        self.main_activity_organization_ids = main_activity_organization_ids
+        self.batch_size = batch_size or self.DEFAULT_BATCH_SIZE
+        self.chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
         self.errors = []
         self.warnings = []
         self.stdout = None
         self.style = None
+        # Lookup caches shared by every chunk of an import
+        self.main_activity_ids = {}
+        self.organization_exists = {}
+        self._available_names = None
 
     def validate_file_format(self, file_path):
         """Validate file format and return file type"""
-        if file_path.endswith('.csv'):
-            return 'csv'
-        elif file_path.endswith(('.xlsx', '.xls')):
-            return 'excel'
-        else:
-            raise ValueError('Unsupported file format. Please use CSV or Excel files.')
+        return validate_file_format(file_path)
 
     def read_file(self, file_path):
         """Read data from CSV or Excel file"""
@@ -56,6 +137,16 @@ class BulkSubActivityImporter:
         except Exception as e:
             raise ValueError(f'Error reading file: {str(e)}')
 
+    def iter_chunks(self, file_path):
+        """Stream the file as DataFrames of ``chunk_size`` rows indexed by line number"""
+        self.validate_file_format(file_path)
+        try:
+            yield from iter_file_chunks(file_path, self.chunk_size)
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f'Error reading file: {str(e)}')
+
     def validate_columns(self, df):
         """Validate that required columns exist"""
         missing_columns = [col for col in self.REQUIRED_COLUMNS if col not in df.columns]
@@ -71,217 +162,293 @@ class BulkSubActivityImporter:
                 self.stdout.write(message)
         else:
             print(message)
-    def validate_row(self, row, line_number):
-        """Validate a single row of data"""
-        errors = []
-        
-        # Validate main activity exists
+
+    def log_messages(self):
+        """Display the first errors and warnings"""
+        if self.errors:
+            self.log('ERRORS:', self.style.ERROR if self.style else None)
+            for error in self.errors[:10]:
+                self.log(f'  {error}', self.style.ERROR if self.style else None)
+            if len(self.errors) > 10:
+                self.log(f'  ... and {len(self.errors) - 10} more errors', self.style.ERROR if self.style else None)
+
+        if self.warnings:
+            self.log('WARNINGS:', self.style.WARNING if self.style else None)
+            for warning in self.warnings[:5]:
+                self.log(f'  {warning}', self.style.WARNING if self.style else None)
+            if len(self.warnings) > 5:
+                self.log(f'  ... and {len(self.warnings) - 5} more warnings', self.style.WARNING if self.style else None)
+
+    def resolve_main_activities(self, names):
+        """
+        Map main-activity names to IDs with one query for every name not seen yet.
+        Names shared by several main activities map to None (ambiguous). Only shared main
+        activities and those of ``main_activity_organization_ids`` are matched.
+        """
+        missing = [name for name in set(names) if name and name not in self.main_activity_ids]
+        if missing:
+            for name in missing:
+                self.main_activity_ids[name] = False
+            activities = MainActivity.objects.filter(
+                organization_scope_q(self.main_activity_organization_ids), name__in=missing
+            ).values_list('id', 'name')
+            for activity_id, name in activities:
+                self.main_activity_ids[name] = None if self.main_activity_ids[name] else activity_id
+        return self.main_activity_ids
+
+    def resolve_organizations(self, organization_ids):
+        """Record which organization IDs exist, with one query for the IDs not checked yet"""
+        missing = [org_id for org_id in set(organization_ids) if org_id not in self.organization_exists]
+        if missing:
+            found = set(Organization.objects.filter(id__in=missing).values_list('id', flat=True))
+            for org_id in missing:
+                self.organization_exists[org_id] = org_id in found
+        return self.organization_exists
+
+    def available_main_activity_names(self):
+        if self._available_names is None:
+            activities = MainActivity.objects.filter(organization_scope_q(self.main_activity_organization_ids))
+            self._available_names = ', '.join(activities.values_list('name', flat=True)[:10])
+        return self._available_names
+
+    @staticmethod
+    def _text(df, column, default=''):
+        if column not in df.columns:
+            return pd.Series(default, index=df.index, dtype=object)
+        return df[column].fillna(default).astype(str).str.strip()
+
+    @staticmethod
+    def _id(value):
         try:
-            main_activity_name = str(row['main_activity_name']).strip()
-            if not main_activity_name:
-                errors.append('Main activity name is required and cannot be empty')
-                return None, errors
-                
-            # Try to find the main activity by name
-            try:
-                main_activity = MainActivity.objects.get(name=main_activity_name)
-                self.log(f'Found main activity: {main_activity_name} (ID: {main_activity.id})')
-            except MainActivity.MultipleObjectsReturned:
-                errors.append(f'Multiple main activities found with name "{main_activity_name}". Please ensure unique names.')
-                return None, errors
-            except MainActivity.DoesNotExist:
-                # Provide helpful error with available names
-                available_names = list(MainActivity.objects.values_list('name', flat=True)[:10])
-                errors.append(f'Main activity "{main_activity_name}" not found. Available names (first 10): {", ".join(available_names)}')
-                return None, errors
-        except (ValueError, TypeError):
-            errors.append(f'Invalid main_activity_name: {row["main_activity_name"]}')
-            return None, errors
-
-        # Validate organization if specified
-        organization_id = self.default_organization_id or row.get('organization_id')
-        organization = None
-        if organization_id:
-            try:
-                organization = Organization.objects.get(id=organization_id)
-                self.log(f'Using organization: {organization.name} (ID: {organization_id})')
-            except Organization.DoesNotExist:
-                errors.append(f'Organization {organization_id} not found')
-
-        # Validate name
-        name = str(row['name']).strip()
-        if not name:
-            errors.append('Name is required and cannot be empty')
-
-        # Validate activity type
-        activity_type = str(row.get('activity_type', 'Other')).strip()
-        if activity_type not in self.VALID_ACTIVITY_TYPES:
-            self.warnings.append(f'Line {line_number}: Invalid activity_type "{activity_type}", using "Other"')
-            activity_type = 'Other'
-
-        # Validate budget calculation type
-        budget_calc_type = str(row.get('budget_calculation_type', 'WITHOUT_TOOL')).upper()
-        if budget_calc_type not in self.VALID_BUDGET_TYPES:
-            self.warnings.append(f'Line {line_number}: Invalid budget_calculation_type "{budget_calc_type}", using "WITHOUT_TOOL"')
-            budget_calc_type = 'WITHOUT_TOOL'
-
-        # Validate numeric fields
+            return int(float(value))
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _decimal(value):
+        if value is None or (isinstance(value, float) and pd.isna(value)) or value == '':
+            return Decimal('0')
+        return Decimal(str(value))
+
+    def validate_frame(self, df):
+        """
+        Validate a DataFrame of sub-activity rows column by column.
+
+        Lookups are resolved in bulk. Returns the model instances for valid rows; errors
+        and warnings are collected with the file line numbers held in ``df.index``.
+        """
+        lines = pd.Series(df.index, index=df.index)
+        row_errors = pd.Series([[] for _ in range(len(df))], index=df.index, dtype=object)
+
+        def add_error(mask, message):
+            for index in mask[mask].index:
+                text = message(index) if callable(message) else message
+                row_errors[index].append(text)
+
+        # Main activities
+        main_activity_names = self._text(df, 'main_activity_name')
+        main_activity_ids = self.resolve_main_activities(main_activity_names.tolist())
+        resolved = main_activity_names.map(lambda name: main_activity_ids.get(name, False))
+        empty_name = main_activity_names == ''
+        add_error(empty_name, 'Main activity name is required and cannot be empty')
+        add_error(~empty_name & resolved.isna(), lambda i: (
+            f'Multiple main activities found with name "{main_activity_names[i]}". Please ensure unique names.'
+        ))
+        add_error(~empty_name & (resolved == False), lambda i: (  # noqa: E712
+            f'Main activity "{main_activity_names[i]}" not found. '
+            f'Available names (first 10): {self.available_main_activity_names()}'
+        ))
+
+        # Organization
+        if self.default_organization_id:
+            organization_values = [self.default_organization_id] * len(df)
+        elif 'organization_id' in df.columns:
+            organization_values = [
+                None if pd.isna(value) or str(value).strip() == '' else value
+                for value in df['organization_id']
+            ]
+        else:
+            organization_values = [None] * len(df)
+        organization_ids = [self._id(value) for value in organization_values]
+        exists = self.resolve_organizations([org_id for org_id in organization_ids if org_id is not None])
+        missing_organization = pd.Series([
+            value is not None and not exists.get(org_id, False)
+            for value, org_id in zip(organization_values, organization_ids)
+        ], index=df.index)
+        add_error(missing_organization, lambda i: f'Organization {organization_values[df.index.get_loc(i)]} not found')
+
+        # Name
+        names = self._text(df, 'name')
+        add_error(names == '', 'Name is required and cannot be empty')
+
+        # Activity and budget calculation types fall back to defaults with a warning
+        activity_types = self._text(df, 'activity_type', 'Other')
+        invalid_types = ~activity_types.isin(self.VALID_ACTIVITY_TYPES)
+        for index in invalid_types[invalid_types].index:
+            self.warnings.append(f'Line {lines[index]}: Invalid activity_type "{activity_types[index]}", using "Other"')
+        activity_types = activity_types.where(~invalid_types, 'Other')
+
+        budget_types = self._text(df, 'budget_calculation_type', 'WITHOUT_TOOL').str.upper()
+        invalid_budget_types = ~budget_types.isin(self.VALID_BUDGET_TYPES)
+        for index in invalid_budget_types[invalid_budget_types].index:
+            self.warnings.append(
+                f'Line {lines[index]}: Invalid budget_calculation_type "{budget_types[index]}", using "WITHOUT_TOOL"'
+            )
+        budget_types = budget_types.where(~invalid_budget_types, 'WITHOUT_TOOL')
+
+        # Numbers: blanks are 0, anything else must parse
+        amounts = {}
+        invalid_number = pd.Series(False, index=df.index)
+        for column in self.AMOUNT_COLUMNS:
+            raw = df[column] if column in df.columns else pd.Series(0, index=df.index)
+            blank = raw.isna() | (raw.astype(str).str.strip() == '')
+            parsed = pd.to_numeric(raw.where(~blank, 0), errors='coerce')
+            bad = parsed.isna()
+            add_error(bad & ~invalid_number, lambda i, column=column: f'Invalid numeric value for {column}: {raw[i]}')
+            invalid_number |= bad
+            amounts[column] = parsed.fillna(0)
+
+        numbers_ok = ~invalid_number
+        add_error(
+            numbers_ok & (amounts['estimated_cost_with_tool'] <= 0) & (amounts['estimated_cost_without_tool'] <= 0),
+            'At least one estimated cost must be greater than 0'
+        )
+        total_funding = (
+            amounts['government_treasury'] + amounts['sdg_funding'] +
+            amounts['partners_funding'] + amounts['other_funding']
+        ).round(2)
+        effective_cost = amounts['estimated_cost_with_tool'].where(
+            budget_types == 'WITH_TOOL', amounts['estimated_cost_without_tool']
+        ).round(2)
+        add_error(numbers_ok & (total_funding > effective_cost), lambda i: (
+            f'Total funding ({total_funding[i]}) cannot exceed estimated cost ({effective_cost[i]})'
+        ))
+
+        for index, messages in row_errors.items():
+            self.errors.extend(f'Line {lines[index]}: {message}' for message in messages)
+        valid = row_errors.map(len) == 0
+        if not valid.any():
+            return []
+
+        # Build the instances from plain column lists of the valid rows
+        columns = {
+            'main_activity_id': resolved[valid].tolist(),
+            'name': names[valid].tolist(),
+            'activity_type': activity_types[valid].tolist(),
+            'description': self._text(df, 'description')[valid].tolist(),
+            'budget_calculation_type': budget_types[valid].tolist(),
+        }
+        for column in self.AMOUNT_COLUMNS:
+            values = df.loc[valid, column].tolist() if column in df.columns else []
+            columns[column] = [self._decimal(value) for value in values] or [Decimal('0')] * int(valid.sum())
+
+        # JSON details, parsed only where a value was given
+        valid_lines = lines[valid].tolist()
+        for column in self.JSON_COLUMNS:
+            if column not in df.columns:
+                continue
+            parsed = []
+            for line, value in zip(valid_lines, df.loc[valid, column].tolist()):
+                value = self._parse_json(value)
+                if isinstance(value, JSONError):
+                    self.warnings.append(f'Line {line}: Invalid {column} JSON, skipping')
+                    value = None
+                parsed.append(value)
+            columns[column] = parsed
+
+        fields = list(columns)
+        return [SubActivity(**dict(zip(fields, values))) for values in zip(*columns.values())]
+
+    @staticmethod
+    def _parse_json(value):
+        if value is None or (isinstance(value, float) and pd.isna(value)) or str(value).strip() == '':
+            return None
         try:
-            estimated_cost_with_tool = Decimal(str(row.get('estimated_cost_with_tool', 0) or 0))
-            estimated_cost_without_tool = Decimal(str(row.get('estimated_cost_without_tool', 0) or 0))
-            government_treasury = Decimal(str(row.get('government_treasury', 0) or 0))
-            sdg_funding = Decimal(str(row.get('sdg_funding', 0) or 0))
-            partners_funding = Decimal(str(row.get('partners_funding', 0) or 0))
-            other_funding = Decimal(str(row.get('other_funding', 0) or 0))
-        except (ValueError, TypeError, decimal.InvalidOperation) as e:
-            errors.append(f'Invalid numeric value: {str(e)}')
-            return None, errors
-
-        # Validate that at least one estimated cost is positive
-        if estimated_cost_with_tool <= 0 and estimated_cost_without_tool <= 0:
-            errors.append('At least one estimated cost must be greater than 0')
-
-        # Validate funding doesn't exceed estimated cost
-        total_funding = government_treasury + sdg_funding + partners_funding + other_funding
-        effective_cost = estimated_cost_with_tool if budget_calc_type == 'WITH_TOOL' else estimated_cost_without_tool
-        
-        if total_funding > effective_cost:
-            errors.append(f'Total funding ({total_funding}) cannot exceed estimated cost ({effective_cost})')
-
-        if errors:
-            return None, errors
-
-        # Parse JSON details if provided
-        training_details = None
-        meeting_workshop_details = None
-        procurement_details = None
-        printing_details = None
-        supervision_details = None
-        partners_details = None
-
-        json_fields = [
-            ('training_details', 'training_details'),
-            ('meeting_workshop_details', 'meeting_workshop_details'),
-            ('procurement_details', 'procurement_details'),
-            ('printing_details', 'printing_details'),
-            ('supervision_details', 'supervision_details'),
-            ('partners_details', 'partners_details')
-        ]
-
-        for field_name, var_name in json_fields:
-            if row.get(field_name):
-                try:
-                    locals()[var_name] = json.loads(str(row[field_name]))
-                except json.JSONDecodeError:
-                    self.warnings.append(f'Line {line_number}: Invalid {field_name} JSON, skipping')
-
-        return {
-            'main_activity': main_activity,
-            'name': name,
-            'activity_type': activity_type,
-            'description': str(row.get('description', '')).strip(),
-            'budget_calculation_type': budget_calc_type,
-            'estimated_cost_with_tool': estimated_cost_with_tool,
-            'estimated_cost_without_tool': estimated_cost_without_tool,
-            'government_treasury': government_treasury,
-            'sdg_funding': sdg_funding,
-            'partners_funding': partners_funding,
-            'other_funding': other_funding,
-            'training_details': training_details,
-            'meeting_workshop_details': meeting_workshop_details,
-            'procurement_details': procurement_details,
-            'printing_details': printing_details,
-            'supervision_details': supervision_details,
-            'partners_details': partners_details,
-        }, []
+            return json.loads(str(value))
+        except json.JSONDecodeError:
+            return JSONError()
+
+    def create_sub_activities(self, sub_activities):
+        """Insert with bulk_create in batches of ``batch_size``"""
+        with transaction.atomic():
+            SubActivity.objects.bulk_create(sub_activities, batch_size=self.batch_size)
+            # bulk_create sends no signals
+            main_activity_ids = {sub_activity.main_activity_id for sub_activity in sub_activities}
+            mark_main_activities_dirty(main_activity_ids)
+            invalidate_main_activities(main_activity_ids)
+        return len(sub_activities)
+
+    def import_chunk(self, chunk, dry_run=False):
+        """Validate one chunk and insert its valid rows; returns the valid sub-activities"""
+        self.validate_columns(chunk)
+        sub_activities = self.validate_frame(chunk)
+        if sub_activities and not dry_run:
+            self.create_sub_activities(sub_activities)
+        return sub_activities
+
+    def skip_chunk(self, chunk):
+        """Account for a chunk imported by an earlier run (nothing to remember here)"""
 
     def import_from_file(self, file_path, dry_run=False):
-        """Import sub-activities from file"""
+        """
+        Import sub-activities from file, streaming it ``chunk_size`` rows at a time.
+
+        Each chunk is validated and inserted before the next one is read, inside a
+        single transaction, so memory stays bounded by the chunk size.
+        """
         self.errors = []
         self.warnings = []
+        rows_read = 0
+        valid_count = 0
+        preview = []
 
         try:
-            # Read file
-            df = self.read_file(file_path)
-            self.log(f'Read {len(df)} rows from file')
-
-            # Validate columns
-            self.validate_columns(df)
-
-            # Process each row
-            valid_sub_activities = []
-            line_number = 1
-
-            for index, row in df.iterrows():
-                line_number = index + 2  # +2 because index starts at 0 and we skip header
-                
-                validated_data, row_errors = self.validate_row(row, line_number)
-                
-                if row_errors:
-                    self.errors.extend([f'Line {line_number}: {error}' for error in row_errors])
-                    continue
-
-                if validated_data:
-                    valid_sub_activities.append(validated_data)
-
-            # Display summary
-            self.log(f'Validation complete:')
-            self.log(f'  Valid sub-activities: {len(valid_sub_activities)}')
-            self.log(f'  Errors: {len(self.errors)}')
-            self.log(f'  Warnings: {len(self.warnings)}')
-
-            # Display errors
-            if self.errors:
-                self.log('ERRORS:', self.style.ERROR if self.style else None)
-                for error in self.errors[:10]:
-                    self.log(f'  {error}', self.style.ERROR if self.style else None)
-                if len(self.errors) > 10:
-                    self.log(f'  ... and {len(self.errors) - 10} more errors', self.style.ERROR if self.style else None)
-
-            # Display warnings
-            if self.warnings:
-                self.log('WARNINGS:', self.style.WARNING if self.style else None)
-                for warning in self.warnings[:5]:
-                    self.log(f'  {warning}', self.style.WARNING if self.style else None)
-                if len(self.warnings) > 5:
-                    self.log(f'  ... and {len(self.warnings) - 5} more warnings', self.style.WARNING if self.style else None)
-
-            if len(valid_sub_activities) == 0:
-                self.log('No valid sub-activities to import. Aborting.', self.style.ERROR if self.style else None)
-                return 0
-
-            # Preview or import
-            if dry_run:
-                self.log('DRY RUN PREVIEW (first 5):', self.style.SUCCESS if self.style else None)
-                for i, data in enumerate(valid_sub_activities[:5]):
-                    cost = data['estimated_cost_with_tool'] if data['budget_calculation_type'] == 'WITH_TOOL' else data['estimated_cost_without_tool']
-                    self.log(f'  {i+1}. {data["name"]} ({data["activity_type"]}) - '
-                           f'Cost: ETB {cost} - Main Activity: {data["main_activity"].name}')
-                if len(valid_sub_activities) > 5:
-                    self.log(f'  ... and {len(valid_sub_activities) - 5} more')
-                return len(valid_sub_activities)
-
-            # Bulk create
             with transaction.atomic():
-                created_count = 0
-                for data in valid_sub_activities:
-                    try:
-                        SubActivity.objects.create(**data)
-                        created_count += 1
-                    except Exception as e:
-                        self.log(f'Failed to create sub-activity {data["name"]}: {str(e)}', self.style.ERROR if self.style else None)
-
-                self.log(f'Successfully imported {created_count} sub-activities!', self.style.SUCCESS if self.style else None)
-                
-                # Display organization summary
-                if self.default_organization_id:
-                    try:
-                        org = Organization.objects.get(id=self.default_organization_id)
-                        self.log(f'All sub-activities assigned to organization: {org.name}')
-                    except Organization.DoesNotExist:
-                        pass
-
-                return created_count
+                for chunk in self.iter_chunks(file_path):
+                    rows_read += len(chunk)
+                    sub_activities = self.import_chunk(chunk, dry_run)
+                    valid_count += len(sub_activities)
+                    if dry_run:
+                        preview.extend(sub_activities[:5 - len(preview)])
+                    self.log(f'Processed {rows_read} rows ({valid_count} valid)')
+
+                # Display summary
+                self.log(f'Read {rows_read} rows from file')
+                self.log(f'Validation complete:')
+                self.log(f'  Valid sub-activities: {valid_count}')
+                self.log(f'  Errors: {len(self.errors)}')
+                self.log(f'  Warnings: {len(self.warnings)}')
+                self.log_messages()
+
+                if valid_count == 0:
+                    self.log('No valid sub-activities to import. Aborting.', self.style.ERROR if self.style else None)
+                    return 0
+
+                # Preview or import
+                if dry_run:
+                    self.log('DRY RUN PREVIEW (first 5):', self.style.SUCCESS if self.style else None)
+                    main_activity_names = {
+                        activity_id: name for name, activity_id in self.main_activity_ids.items() if activity_id
+                    }
+                    for i, sub_activity in enumerate(preview):
+                        self.log(f'  {i+1}. {sub_activity.name} ({sub_activity.activity_type}) - '
+                               f'Cost: ETB {sub_activity.estimated_cost} - '
+                               f'Main Activity: {main_activity_names.get(sub_activity.main_activity_id)}')
+                    if valid_count > 5:
+                        self.log(f'  ... and {valid_count - 5} more')
+                    return valid_count
+
+            self.log(f'Successfully imported {valid_count} sub-activities!', self.style.SUCCESS if self.style else None)
+
+            # Display organization summary
+            if self.default_organization_id:
+                try:
+                    org = Organization.objects.get(id=self.default_organization_id)
+                    self.log(f'All sub-activities assigned to organization: {org.name}')
+                except Organization.DoesNotExist:
+                    pass
+
+            return valid_count
 
         except Exception as e:
             self.log(f'Import failed: {str(e)}', self.style.ERROR if self.style else None)
@@ -315,20 +482,30 @@ class BulkProcurementImporter:
         'category', 'name', 'unit', 'unit_price'
     ]
 
-    def __init__(self):
+    KEY_FIELDS = ['category', 'name', 'unit']
+
+    # insert: existing items are errors; skip: existing items are left alone;
+    # upsert: existing items get the new unit price
+    MODES = ['insert', 'upsert', 'skip']
+
+    DEFAULT_BATCH_SIZE = 1000
+
+    def __init__(self, mode='skip', batch_size=None, chunk_size=None):
+        if mode not in self.MODES:
+            raise ValueError(f'Invalid mode "{mode}". Valid options: {", ".join(self.MODES)}')
+        self.mode = mode
+        self.batch_size = batch_size or self.DEFAULT_BATCH_SIZE
+        self.chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
         self.errors = []
         self.warnings = []
         self.stdout = None
         self.style = None
+        self._existing_prices = None
+        self._seen_keys = set()
 
     def validate_file_format(self, file_path):
         """Validate file format and return file type"""
-        if file_path.endswith('.csv'):
-            return 'csv'
-        elif file_path.endswith(('.xlsx', '.xls')):
-            return 'excel'
-        else:
-            raise ValueError('Unsupported file format. Please use CSV or Excel files.')
+        return validate_file_format(file_path)
 
     def read_file(self, file_path):
         """Read data from CSV or Excel file"""
@@ -344,6 +521,16 @@ class BulkProcurementImporter:
         except Exception as e:
             raise ValueError(f'Error reading file: {str(e)}')
 
+    def iter_chunks(self, file_path):
+        """Stream the file as DataFrames of ``chunk_size`` rows indexed by line number"""
+        self.validate_file_format(file_path)
+        try:
+            yield from iter_file_chunks(file_path, self.chunk_size)
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f'Error reading file: {str(e)}')
+
     def validate_columns(self, df):
         """Validate that required columns exist"""
         missing_columns = [col for col in self.REQUIRED_COLUMNS if col not in df.columns]
@@ -360,149 +547,190 @@ class BulkProcurementImporter:
         else:
             print(message)
 
-    def validate_row(self, row, line_number):
-        """Validate a single row of procurement data"""
-        errors = []
-        
-        # Validate category
-        try:
-            category = str(row['category']).strip().upper()
-            if category not in self.VALID_CATEGORIES:
-                errors.append(f'Invalid category "{category}". Valid options: {", ".join(self.VALID_CATEGORIES)}')
-                return None, errors
-        except (ValueError, TypeError):
-            errors.append(f'Invalid category: {row["category"]}')
-            return None, errors
-
-        # Validate name
-        try:
-            name = str(row['name']).strip()
-            if not name:
-                errors.append('Item name is required and cannot be empty')
-                return None, errors
-        except (ValueError, TypeError):
-            errors.append(f'Invalid name: {row["name"]}')
-            return None, errors
-
-        # Validate unit
-        try:
-            unit = str(row['unit']).strip().upper()
-            if unit not in self.VALID_UNITS:
-                errors.append(f'Invalid unit "{unit}". Valid options: {", ".join(self.VALID_UNITS)}')
-                return None, errors
-        except (ValueError, TypeError):
-            errors.append(f'Invalid unit: {row["unit"]}')
-            return None, errors
-
-        # Validate unit price
-        try:
-            unit_price = Decimal(str(row['unit_price'] or 0))
-            if unit_price <= 0:
-                errors.append('Unit price must be greater than 0')
-                return None, errors
-        except (ValueError, TypeError, decimal.InvalidOperation) as e:
-            errors.append(f'Invalid unit_price: {str(e)}')
-            return None, errors
-
-        # Check for duplicate items (same category, name, unit)
-        existing_item = ProcurementItem.objects.filter(
-            category=category,
-            name=name,
-            unit=unit
-        ).first()
-        
-        if existing_item:
-            self.warnings.append(f'Line {line_number}: Item "{name}" ({category}, {unit}) already exists with price ETB {existing_item.unit_price}. Will be skipped.')
-            return None, []  # Skip duplicate, but no error
-
-        if errors:
-            return None, errors
+    def log_messages(self):
+        """Display the first errors and warnings"""
+        if self.errors:
+            self.log('ERRORS:', self.style.ERROR if self.style else None)
+            for error in self.errors[:10]:
+                self.log(f'  {error}', self.style.ERROR if self.style else None)
+            if len(self.errors) > 10:
+                self.log(f'  ... and {len(self.errors) - 10} more errors', self.style.ERROR if self.style else None)
+
+        if self.warnings:
+            self.log('WARNINGS:', self.style.WARNING if self.style else None)
+            for warning in self.warnings[:5]:
+                self.log(f'  {warning}', self.style.WARNING if self.style else None)
+            if len(self.warnings) > 5:
+                self.log(f'  ... and {len(self.warnings) - 5} more warnings', self.style.WARNING if self.style else None)
+
+    def existing_prices(self):
+        """(category, name, unit) -> unit price of every item in the catalog, loaded once"""
+        if self._existing_prices is None:
+            self._existing_prices = {
+                (category, name, unit): unit_price
+                for category, name, unit, unit_price in ProcurementItem.objects.values_list(
+                    'category', 'name', 'unit', 'unit_price'
+                )
+            }
+        return self._existing_prices
+
+    def validate_frame(self, df):
+        """
+        Validate a DataFrame of procurement rows (indexed by file line number) column by column.
+
+        Returns the valid rows as dicts. Rows repeated within the file keep the last
+        occurrence; rows matching an existing item are handled according to ``mode``.
+        """
+        lines = pd.Series(df.index, index=df.index)
+        invalid = pd.Series(False, index=df.index)
+
+        def reject(mask, message):
+            mask = mask & ~invalid
+            for index in mask[mask].index:
+                self.errors.append(f'Line {lines[index]}: {message(index) if callable(message) else message}')
+            return invalid | mask
+
+        categories = df['category'].fillna('').astype(str).str.strip().str.upper()
+        names = df['name'].fillna('').astype(str).str.strip()
+        units = df['unit'].fillna('').astype(str).str.strip().str.upper()
+        prices = pd.to_numeric(df['unit_price'].fillna(0), errors='coerce')
+
+        invalid = reject(~categories.isin(self.VALID_CATEGORIES), lambda i: (
+            f'Invalid category "{categories[i]}". Valid options: {", ".join(self.VALID_CATEGORIES)}'
+        ))
+        invalid = reject(names == '', 'Item name is required and cannot be empty')
+        invalid = reject(~units.isin(self.VALID_UNITS), lambda i: (
+            f'Invalid unit "{units[i]}". Valid options: {", ".join(self.VALID_UNITS)}'
+        ))
+        invalid = reject(prices.isna(), lambda i: f'Invalid unit_price: {df.at[i, "unit_price"]}')
+        invalid = reject(prices <= 0, 'Unit price must be greater than 0')
+
+        rows = pd.DataFrame({
+            'line': lines, 'category': categories, 'name': names, 'unit': units,
+            'unit_price': df['unit_price'],
+        })[~invalid]
+
+        # Duplicates within the file: the last row wins
+        repeated = rows.duplicated(subset=self.KEY_FIELDS, keep='last')
+        for line, name in rows.loc[repeated, ['line', 'name']].itertuples(index=False):
+            self.warnings.append(f'Line {line}: Item "{name}" appears again later in the file. Using the later row.')
+        rows = rows[~repeated]
+
+        # Duplicates of rows in earlier chunks: upsert lets the later row update the
+        # item, the other modes keep the row that was already taken
+        keys = list(zip(rows['category'], rows['name'], rows['unit']))
+        seen = pd.Series([key in self._seen_keys for key in keys], index=rows.index, dtype=bool)
+        for line, name in rows.loc[seen, ['line', 'name']].itertuples(index=False):
+            if self.mode == 'upsert':
+                self.warnings.append(f'Line {line}: Item "{name}" appears earlier in the file. Using this row.')
+            else:
+                self.warnings.append(f'Line {line}: Item "{name}" appears earlier in the file. Will be skipped.')
+        self._seen_keys.update(keys)
+        if self.mode != 'upsert':
+            rows = rows[~seen]
+
+        # Items already in the catalog, checked against one set of keys
+        existing = self.existing_prices()
+        keys = list(zip(rows['category'], rows['name'], rows['unit']))
+        in_catalog = pd.Series([key in existing for key in keys], index=rows.index, dtype=bool)
+        for line, category, name, unit in rows.loc[in_catalog, ['line', 'category', 'name', 'unit']].itertuples(index=False):
+            price = existing[(category, name, unit)]
+            if self.mode == 'insert':
+                self.errors.append(f'Line {line}: Item "{name}" ({category}, {unit}) already exists with price ETB {price}.')
+            elif self.mode == 'skip':
+                self.warnings.append(f'Line {line}: Item "{name}" ({category}, {unit}) already exists with price ETB {price}. Will be skipped.')
+        if self.mode != 'upsert':
+            rows = rows[~in_catalog]
+
+        return [
+            {
+                'category': category,
+                'name': name,
+                'unit': unit,
+                'unit_price': Decimal(str(unit_price)),
+            }
+            for category, name, unit, unit_price in rows[['category', 'name', 'unit', 'unit_price']].itertuples(index=False)
+        ]
 
-        return {
-            'category': category,
-            'name': name,
-            'unit': unit,
-            'unit_price': unit_price,
-        }, []
+    def save_items(self, items):
+        """Insert (or upsert) items with bulk_create; returns the number of rows written"""
+        objects = [ProcurementItem(**item) for item in items]
+        with transaction.atomic():
+            if self.mode == 'upsert':
+                options = {'update_conflicts': True, 'update_fields': ['unit_price', 'updated_at']}
+                # MySQL upserts on any unique key and rejects an explicit target
+                if connection.features.supports_update_conflicts_with_target:
+                    options['unique_fields'] = self.KEY_FIELDS
+                ProcurementItem.objects.bulk_create(objects, batch_size=self.batch_size, **options)
+            else:
+                ProcurementItem.objects.bulk_create(objects, batch_size=self.batch_size)
+        return len(objects)
+
+    def import_chunk(self, chunk, dry_run=False):
+        """Validate one chunk and save its valid rows; returns the valid items"""
+        self.validate_columns(chunk)
+        valid_items = self.validate_frame(chunk)
+        if valid_items and not dry_run:
+            self.save_items(valid_items)
+        return valid_items
+
+    def skip_chunk(self, chunk):
+        """Remember the keys of a chunk imported by an earlier run so duplicates are still caught"""
+        categories = chunk['category'].fillna('').astype(str).str.strip().str.upper()
+        names = chunk['name'].fillna('').astype(str).str.strip()
+        units = chunk['unit'].fillna('').astype(str).str.strip().str.upper()
+        self._seen_keys.update(zip(categories, names, units))
 
     def import_from_file(self, file_path, dry_run=False):
-        """Import procurement items from file"""
+        """
+        Import procurement items from file, streaming it ``chunk_size`` rows at a time.
+
+        Each chunk is validated and saved before the next one is read, inside a
+        single transaction, so memory stays bounded by the chunk size.
+        """
         self.errors = []
         self.warnings = []
+        self._seen_keys = set()
+        rows_read = 0
+        saved_count = 0
+        preview = []
 
         try:
-            # Read file
-            df = self.read_file(file_path)
-            self.log(f'Read {len(df)} rows from file')
-
-            # Validate columns
-            self.validate_columns(df)
-
-            # Process each row
-            valid_items = []
-            line_number = 1
-
-            for index, row in df.iterrows():
-                line_number = index + 2  # +2 because index starts at 0 and we skip header
-                
-                validated_data, row_errors = self.validate_row(row, line_number)
-                
-                if row_errors:
-                    self.errors.extend([f'Line {line_number}: {error}' for error in row_errors])
-                    continue
-
-                if validated_data:
-                    valid_items.append(validated_data)
-
-            # Display summary
-            self.log(f'Validation complete:')
-            self.log(f'  Valid procurement items: {len(valid_items)}')
-            self.log(f'  Errors: {len(self.errors)}')
-            self.log(f'  Warnings: {len(self.warnings)}')
-
-            # Display errors
-            if self.errors:
-                self.log('ERRORS:', self.style.ERROR if self.style else None)
-                for error in self.errors[:10]:
-                    self.log(f'  {error}', self.style.ERROR if self.style else None)
-                if len(self.errors) > 10:
-                    self.log(f'  ... and {len(self.errors) - 10} more errors', self.style.ERROR if self.style else None)
-
-            # Display warnings
-            if self.warnings:
-                self.log('WARNINGS:', self.style.WARNING if self.style else None)
-                for warning in self.warnings[:5]:
-                    self.log(f'  {warning}', self.style.WARNING if self.style else None)
-                if len(self.warnings) > 5:
-                    self.log(f'  ... and {len(self.warnings) - 5} more warnings', self.style.WARNING if self.style else None)
-
-            if len(valid_items) == 0:
-                self.log('No valid procurement items to import. Aborting.', self.style.ERROR if self.style else None)
-                return 0
-
-            # Preview or import
-            if dry_run:
-                self.log('DRY RUN PREVIEW (first 5):', self.style.SUCCESS if self.style else None)
-                for i, data in enumerate(valid_items[:5]):
-                    self.log(f'  {i+1}. {data["name"]} ({data["category"]}) - '
-                           f'Unit: {data["unit"]} - Price: ETB {data["unit_price"]}')
-                if len(valid_items) > 5:
-                    self.log(f'  ... and {len(valid_items) - 5} more')
-                return len(valid_items)
-
-            # Bulk create
             with transaction.atomic():
-                created_count = 0
-                for data in valid_items:
-                    try:
-                        ProcurementItem.objects.create(**data)
-                        created_count += 1
-                    except Exception as e:
-                        self.log(f'Failed to create procurement item {data["name"]}: {str(e)}', self.style.ERROR if self.style else None)
-
-                self.log(f'Successfully imported {created_count} procurement items!', self.style.SUCCESS if self.style else None)
-                return created_count
+                for chunk in self.iter_chunks(file_path):
+                    rows_read += len(chunk)
+                    valid_items = self.import_chunk(chunk, dry_run)
+                    saved_count += len(valid_items)
+                    if dry_run:
+                        preview.extend(valid_items[:5 - len(preview)])
+                    self.log(f'Processed {rows_read} rows ({saved_count} valid)')
+
+                # Display summary
+                self.log(f'Read {rows_read} rows from file')
+                self.log(f'Validation complete:')
+                self.log(f'  Valid procurement items: {saved_count}')
+                self.log(f'  Errors: {len(self.errors)}')
+                self.log(f'  Warnings: {len(self.warnings)}')
+                self.log_messages()
+
+                if saved_count == 0:
+                    self.log('No valid procurement items to import. Aborting.', self.style.ERROR if self.style else None)
+                    return 0
+
+                # Preview or import
+                if dry_run:
+                    self.log('DRY RUN PREVIEW (first 5):', self.style.SUCCESS if self.style else None)
+                    for i, data in enumerate(preview):
+                        self.log(f'  {i+1}. {data["name"]} ({data["category"]}) - '
+                               f'Unit: {data["unit"]} - Price: ETB {data["unit_price"]}')
+                    if saved_count > 5:
+                        self.log(f'  ... and {saved_count - 5} more')
+                    return saved_count
+
+            verb = 'imported or updated' if self.mode == 'upsert' else 'imported'
+            self.log(f'Successfully {verb} {saved_count} procurement items!', self.style.SUCCESS if self.style else None)
+            return saved_count
 
         except Exception as e:
             self.log(f'Import failed: {str(e)}', self.style.ERROR if self.style else None)
-            return 0
\ No newline at end of file
+            return 0
@@ -0,0 +1,134 @@
+"""
+Conditional GET (ETag / Last-Modified) for read-heavy viewsets.
+
+The validators of a list or detail response are derived from MAX(updated_at) and the
+row count of the rows being served and of the rows the serializer nests, plus the
+query string and the requesting user's organization scope. They cost one aggregate
+query per nested model, restricted to the rows related to the served ones, and are
+checked against If-None-Match / If-Modified-Since before the response is serialized.
+The count catches deletes, which MAX(updated_at) alone misses; If-Modified-Since only
+sees the timestamp, so clients should prefer the ETag (browsers send both, and
+If-None-Match wins).
+
+Responses that nest objective trees use the objective_cache generation tokens of the
+objectives they serve instead of reading the five tree tables; they send no
+Last-Modified, since the tokens carry no timestamp.
+"""
+import hashlib
+from urllib.parse import urlencode
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+from .middleware import get_organization_context
+from .objective_cache import tree_version
+
+
+class NotModified(APIException):
+    """Raised before the handler runs when the client's copy is still current"""
+    status_code = status.HTTP_304_NOT_MODIFIED
+
+
+def table_state(queryset, field='updated_at'):
+    """(MAX(field), COUNT(*)) of a queryset; tables without ``updated_at`` use their largest ID"""
+    model = queryset.model
+    if field not in {f.name for f in model._meta.get_fields()}:
+        field = 'pk'
+    state = queryset.order_by().aggregate(latest=Max(field), count=Count('pk'))
+    return state['latest'], state['count']
+
+
+class ConditionalGetMixin:
+    """
+    Answer ``list`` and ``retrieve`` (including viewsets that override them) with
+    304 Not Modified while the client's validators still match.
+    ``conditional_dependencies`` lists the other models the serializer nests, either as
+    a model (the whole table counts) or as ``(model, field)`` where ``field`` leads from
+    the served rows to the nested ones; a change to any of them changes the validators.
+    ``conditional_objective_fields`` lead from the served rows to the objectives whose
+    trees the response nests.
+    """
+    conditional_dependencies = ()
+    conditional_objective_fields = ()
+
+    def get_validator_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            try:
+                queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            except (TypeError, ValueError, ValidationError):
+                # A malformed ID, as in DRF's get_object_or_404
+                raise Http404
+        return queryset
+
+    def get_validators(self, request):
+        """``(etag, last_modified)`` of the response this request would get"""
+        # Annotations and prefetches of the served queryset are not needed for the state
+        served = self.get_validator_queryset().order_by()
+        states = [table_state(served.model._base_manager.filter(pk__in=served.values('pk')))]
+        for dependency in self.conditional_dependencies:
+            if isinstance(dependency, tuple):
+                model, field = dependency
+                states.append(table_state(model._base_manager.filter(pk__in=served.values(field))))
+            else:
+                states.append(table_state(dependency._base_manager.all()))
+
+        trees = ''
+        if self.conditional_objective_fields:
+            objective_ids = set()
+            for field in self.conditional_objective_fields:
+                objective_ids.update(served.exclude(**{field: None}).values_list(field, flat=True).distinct())
+            trees = tree_version(objective_ids)
+
+        context = get_organization_context(request)
+        key = '|'.join([
+            self.__class__.__name__,
+            self.action,
+            request.path,
+            # ``_`` is a client-side cache buster, not part of the query
+            urlencode(sorted((k, v) for k, v in request.query_params.lists() if k != '_'), doseq=True),
+            ','.join(str(org_id) for org_id in sorted(context.organization_ids)),
+            ','.join(sorted(context.roles)),
+            str(request.user.is_superuser),
+        ] + [f'{latest}:{count}' for latest, count in states] + [trees])
+        etag = hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+        timestamps = [latest for latest, _ in states if latest is not None and hasattr(latest, 'timestamp')]
+        last_modified = int(max(timestamps).timestamp()) if timestamps and not trees else None
+        return etag, last_modified
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Checked after authentication and permissions, before the handler serializes anything
+        self.validators = None
+        if request.method in ('GET', 'HEAD') and self.action in ('list', 'retrieve'):
+            self.validators = self.get_validators(request)
+            etag, last_modified = self.validators
+            response = get_conditional_response(
+                request._request, etag=quote_etag(etag), last_modified=last_modified
+            )
+            if response is not None and response.status_code == status.HTTP_304_NOT_MODIFIED:
+                raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, 'validators', None)
+        if validators and response.status_code in (200, 304):
+            etag, last_modified = validators
+            response['ETag'] = quote_etag(etag)
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            # The body depends on the session's user: revalidate every time, never share
+            response['Cache-Control'] = 'private, no-cache'
+            patch_vary_headers(response, ['Cookie'])
+        return response
@@ -0,0 +1,572 @@
+"""
+Server-side costing engine.
+
+Recomputes the budget of a sub-activity from the parameters the React costing tools
+store in ``training_details``, ``meeting_workshop_details``, ``supervision_details``,
+``printing_details`` and ``procurement_details``, using the rate tables instead of
+trusting ``estimated_cost_with_tool``. The rules mirror ``calculateTotalBudget`` in
+the corresponding ``*CostingTool.tsx``.
+
+All rate tables are loaded once into ``RateTables`` and indexed by location,
+(location, service type) and route pair, so costing thousands of sub-activities
+costs the same handful of queries as costing one.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from .models import (
+    Location, LandTransport, AirTransport, PerDiem, Accommodation,
+    ParticipantCost, SessionCost, SupervisorCost, ProcurementItem
+)
+
+ZERO = Decimal('0')
+CENT = Decimal('0.01')
+
+# Which JSON field holds the tool parameters for each activity type
+DETAILS_FIELDS = {
+    'Training': 'training_details',
+    'Meeting': 'meeting_workshop_details',
+    'Workshop': 'meeting_workshop_details',
+    'Supervision': 'supervision_details',
+    'Printing': 'printing_details',
+    'Procurement': 'procurement_details',
+}
+
+# Fallback rates the training tool uses when a rate table has no row (or a zero amount)
+DEFAULT_ACCOMMODATION_PRICES = {
+    'BED': Decimal('1500'),
+    'LUNCH': Decimal('400'),
+    'DINNER': Decimal('500'),
+    'FULL_BOARD': Decimal('2400'),
+    'HALL_REFRESHMENT': Decimal('800'),
+}
+DEFAULT_PER_DIEM_ADDIS = Decimal('1200')
+DEFAULT_PER_DIEM = Decimal('1100')
+DEFAULT_HARDSHIP_ALLOWANCE = Decimal('200')
+HARDSHIP_ACCOMMODATION_FACTOR = Decimal('1.1')
+
+# Prices the training tool charges for additional costs; it never reads the rate tables
+TRAINING_PARTICIPANT_COSTS = {'ALL': Decimal('700'), 'FLASH_DISK': Decimal('500'), 'STATIONARY': Decimal('200')}
+TRAINING_SESSION_COSTS = {
+    'ALL': Decimal('1000'),
+    'FLIP_CHART': Decimal('300'),
+    'MARKER': Decimal('150'),
+    'TONER_PAPER': Decimal('1000'),
+}
+# DOCUMENT_TYPES in types/costing.ts; the printing tool has no rate table lookup
+PRINTING_PRICES = {
+    'Manual': Decimal('50'),
+    'Booklet': Decimal('40'),
+    'Leaflet': Decimal('30'),
+    'Brochure': Decimal('35'),
+}
+DEFAULT_LAND_TRANSPORT_PRICE = Decimal('1000')
+DEFAULT_AIR_TRANSPORT_PRICE = Decimal('5000')
+
+
+class CostingError(ValueError):
+    """Raised when a sub-activity cannot be costed with the engine"""
+
+
+def _number(value, default=ZERO):
+    """Parse a number from tool JSON (ints, floats, numeric strings, None)"""
+    if value is None or value == '':
+        return default
+    try:
+        number = Decimal(str(value))
+    except (InvalidOperation, ValueError, TypeError):
+        return default
+    # 'NaN' and 'Infinity' parse, but no tool can produce them
+    return number if number.is_finite() else default
+
+
+def _list(value):
+    """A list from tool JSON; anything else counts as empty"""
+    return value if isinstance(value, list) else []
+
+
+def _key(value):
+    return str(value).strip().lower() if value not in (None, '') else None
+
+
+def _cost_type(entry):
+    """Additional cost entries are stored either as 'FLASH_DISK' or {'costType': 'FLASH_DISK'}"""
+    if isinstance(entry, dict):
+        entry = entry.get('costType') or entry.get('cost_type')
+    return entry if isinstance(entry, str) else None
+
+
+class RateTables:
+    """In-memory, indexed snapshot of every costing rate table"""
+
+    def __init__(self, locations=(), per_diems=(), accommodations=(), land_transports=(),
+                 air_transports=(), participant_costs=(), session_costs=(),
+                 supervisor_costs=(), procurement_items=()):
+        self.locations = {str(loc['id']): loc for loc in locations}
+
+        self.per_diems = {}
+        for row in per_diems:
+            self.per_diems.setdefault(str(row['location_id']), row)
+
+        self.accommodations = {}
+        for row in accommodations:
+            self.accommodations.setdefault((str(row['location_id']), row['service_type']), row['price'])
+
+        self.land_transports, self.land_routes = self._index_routes(land_transports)
+        self.air_transports, self.air_routes = self._index_routes(air_transports)
+
+        self.participant_costs = self._first_by_type(participant_costs, 'price')
+        self.session_costs = self._first_by_type(session_costs, 'price')
+        self.supervisor_costs = self._first_by_type(supervisor_costs, 'amount')
+
+        self.procurement_prices = {str(row['id']): row['unit_price'] for row in procurement_items}
+
+    @staticmethod
+    def _first_by_type(rows, price_field):
+        index = {}
+        for row in rows:
+            index.setdefault(row['cost_type'], row[price_field])
+        return index
+
+    def _index_routes(self, rows):
+        """Index transport rows by id and by (origin, destination) as both IDs and names"""
+        by_id = {}
+        by_pair = {}
+        for row in rows:
+            by_id[str(row['id'])] = row
+            origin = self.locations.get(str(row['origin_id']), {})
+            destination = self.locations.get(str(row['destination_id']), {})
+            pairs = [
+                (_key(row['origin_id']), _key(row['destination_id'])),
+                (_key(origin.get('name')), _key(destination.get('name'))),
+            ]
+            for pair in pairs:
+                by_pair.setdefault(pair, []).append(row)
+        return by_id, by_pair
+
+    @classmethod
+    def load(cls):
+        """Load every rate table with one query per table"""
+        return cls(
+            locations=Location.objects.values('id', 'name', 'region', 'is_hardship_area'),
+            per_diems=PerDiem.objects.order_by('id').values('location_id', 'amount', 'hardship_allowance_amount'),
+            accommodations=Accommodation.objects.order_by('id').values('location_id', 'service_type', 'price'),
+            land_transports=LandTransport.objects.order_by('id').values('id', 'origin_id', 'destination_id', 'trip_type', 'price'),
+            air_transports=AirTransport.objects.order_by('id').values('id', 'origin_id', 'destination_id', 'price'),
+            participant_costs=ParticipantCost.objects.order_by('id').values('cost_type', 'price'),
+            session_costs=SessionCost.objects.order_by('id').values('cost_type', 'price'),
+            supervisor_costs=SupervisorCost.objects.order_by('id').values('cost_type', 'amount'),
+            procurement_items=ProcurementItem.objects.values('id', 'unit_price'),
+        )
+
+    def location(self, location_id):
+        return self.locations.get(str(location_id)) if location_id not in (None, '') else None
+
+    def route_price(self, route, air=False):
+        """
+        Price of a stored transport route: the selected transport row, else the rate for
+        its origin/destination pair, else the price the tool saved with the route
+        """
+        transports, routes = (self.air_transports, self.air_routes) if air else (self.land_transports, self.land_routes)
+
+        transport = transports.get(str(route.get('transportId'))) if route.get('transportId') else None
+        if transport is None:
+            origin = route.get('originName') or route.get('origin')
+            destination = route.get('destinationName') or route.get('destination')
+            candidates = routes.get((_key(origin), _key(destination)), [])
+            trip_type = route.get('tripType') or route.get('trip_type')
+            if trip_type:
+                candidates = [row for row in candidates if row.get('trip_type') == trip_type] or candidates
+            transport = candidates[0] if candidates else None
+
+        if transport is not None:
+            return transport['price']
+        return _number(route.get('price'))
+
+    def average_transport_price(self, air=False):
+        """Average over every transport row, priceless rows counting as zero"""
+        transports = self.air_transports if air else self.land_transports
+        if not transports:
+            return DEFAULT_AIR_TRANSPORT_PRICE if air else DEFAULT_LAND_TRANSPORT_PRICE
+        return sum((row['price'] or ZERO for row in transports.values()), ZERO) / len(transports)
+
+    def unit_cost(self, index, cost_type):
+        """Price of one additional cost type; 'ALL' is the sum of every other type"""
+        if cost_type == 'ALL':
+            return sum((price or ZERO for k, price in index.items() if k != 'ALL'), ZERO)
+        return index.get(cost_type) or ZERO
+
+
+def _stays(main_location, main_people, main_days, additional_locations, people_field):
+    """(location ID, people, days) for the main location and every additional location"""
+    stays = [(main_location, main_people, main_days)]
+    for extra in _list(additional_locations):
+        if not isinstance(extra, dict) or not extra.get('locationId'):
+            continue
+        stays.append((
+            extra['locationId'],
+            _number(extra.get(people_field)),
+            _number(extra.get('days')),
+        ))
+    return stays
+
+
+def _default_per_diem(location):
+    rate = DEFAULT_PER_DIEM_ADDIS if location.get('region') == 'Addis Ababa' else DEFAULT_PER_DIEM
+    return rate + (DEFAULT_HARDSHIP_ALLOWANCE if location.get('is_hardship_area') else ZERO)
+
+
+def _training_lodging_cost(rates, stays, cost_mode, service_type):
+    """Per diem or accommodation for every stay, falling back to the built-in rates"""
+    total = ZERO
+    for index, (location_id, people, days) in enumerate(stays):
+        location = rates.location(location_id) or {}
+        if cost_mode == 'accommodation':
+            price = rates.accommodations.get((str(location_id), service_type))
+            if price is None:
+                price = DEFAULT_ACCOMMODATION_PRICES.get(service_type, DEFAULT_ACCOMMODATION_PRICES['BED'])
+                if location.get('is_hardship_area'):
+                    price *= HARDSHIP_ACCOMMODATION_FACTOR
+            total += (price or ZERO) * people * days
+            continue
+
+        per_diem = rates.per_diems.get(str(location_id))
+        if per_diem is None:
+            rate = _default_per_diem(location)
+        elif index == 0:
+            # Only the main location falls back column by column on a zero or missing amount
+            hardship = DEFAULT_HARDSHIP_ALLOWANCE if location.get('is_hardship_area') else ZERO
+            rate = (per_diem['amount'] or DEFAULT_PER_DIEM_ADDIS) + (per_diem['hardship_allowance_amount'] or hardship)
+        else:
+            rate = (per_diem['amount'] or ZERO) + (per_diem['hardship_allowance_amount'] or ZERO)
+        total += rate * people * days
+    return total
+
+
+def _table_lodging_cost(rates, stays, cost_mode, service_types, require_main_row):
+    """
+    Per diem or accommodation from rate table rows only. With ``require_main_row``
+    (meeting/workshop) no stay is paid unless the main location has a row.
+    """
+    main_location = str(stays[0][0])
+    total = ZERO
+    if cost_mode == 'accommodation':
+        for service_type in service_types:
+            if require_main_row and (main_location, service_type) not in rates.accommodations:
+                continue
+            for location_id, people, days in stays:
+                price = rates.accommodations.get((str(location_id), service_type))
+                total += (price or ZERO) * people * days
+        return total
+
+    if require_main_row and main_location not in rates.per_diems:
+        return ZERO
+    for location_id, people, days in stays:
+        per_diem = rates.per_diems.get(str(location_id))
+        if per_diem is not None:
+            rate = (per_diem['amount'] or ZERO) + (per_diem['hardship_allowance_amount'] or ZERO)
+            total += rate * people * days
+    return total
+
+
+def _routes_cost(rates, details, default_participants=Decimal('1')):
+    """Routes priced from the rate tables; training and meetings count a route without participants once"""
+    total = ZERO
+    for air, field in ((False, 'landTransportRoutes'), (True, 'airTransportRoutes')):
+        for route in _list(details.get(field)):
+            if not isinstance(route, dict):
+                continue
+            participants = _number(route.get('participants')) or default_participants
+            total += rates.route_price(route, air=air) * participants
+    return total
+
+
+def calculate_training(details, rates):
+    location_id = details.get('trainingLocationId')
+    if rates.location(location_id) is None:
+        return {'total': ZERO}
+
+    days = _number(details.get('numberOfDays'))
+    participants = _number(details.get('numberOfParticipants'))
+    sessions = _number(details.get('numberOfSessions')) or Decimal('1')
+    cost_mode = details.get('costMode') or 'perdiem'
+
+    stays = _stays(location_id, participants, days, details.get('additionalLocations'), 'participants')
+    lodging = _training_lodging_cost(rates, stays, cost_mode, details.get('selectedAccommodationType') or 'BED')
+
+    transport = _routes_cost(rates, details) if details.get('transportRequired') else ZERO
+
+    participant_costs = sum((
+        participants * TRAINING_PARTICIPANT_COSTS.get(_cost_type(entry), ZERO)
+        for entry in _list(details.get('additionalParticipantCosts'))
+    ), ZERO)
+    session_costs = sum((
+        sessions * TRAINING_SESSION_COSTS.get(_cost_type(entry), ZERO)
+        for entry in _list(details.get('additionalSessionCosts'))
+    ), ZERO)
+    other = _number(details.get('otherCosts'))
+
+    subtotal = lodging + transport + participant_costs + session_costs + other
+    return {
+        'total': subtotal * sessions,
+        'lodging': lodging,
+        'transport': transport,
+        'participant_costs': participant_costs,
+        'session_costs': session_costs,
+        'other_costs': other,
+        'sessions': sessions,
+    }
+
+
+def calculate_meeting_workshop(details, rates):
+    location_id = details.get('trainingLocation') or details.get('location')
+    if rates.location(location_id) is None:
+        return {'total': ZERO}
+
+    days = _number(details.get('numberOfDays'))
+    participants = _number(details.get('numberOfParticipants'))
+    sessions = _number(details.get('numberOfSessions')) or Decimal('1')
+    cost_mode = details.get('costMode') or 'perdiem'
+    additional_locations = details.get('additionalLocations')
+
+    stays = _stays(location_id, participants, days, additional_locations, 'participants')
+    service_types = [_cost_type(entry) for entry in _list(details.get('selectedAccommodationTypes'))]
+    lodging = _table_lodging_cost(rates, stays, cost_mode, list(filter(None, service_types)), require_main_row=True)
+
+    # Participant costs apply to the participants of every additional location, chosen or not;
+    # 'ALL' replaces the rest
+    all_participants = participants + sum((
+        _number(extra.get('participants')) for extra in _list(additional_locations) if isinstance(extra, dict)
+    ), ZERO)
+    participant_types = [_cost_type(entry) for entry in _list(details.get('additionalParticipantCosts'))]
+    if 'ALL' in participant_types:
+        participant_types = ['ALL']
+    participant_costs = sum((
+        all_participants * rates.unit_cost(rates.participant_costs, cost_type) for cost_type in participant_types
+    ), ZERO)
+    session_types = [_cost_type(entry) for entry in _list(details.get('additionalSessionCosts'))]
+    if 'ALL' in session_types:
+        session_types = ['ALL']
+    session_costs = sum((sessions * rates.unit_cost(rates.session_costs, cost_type) for cost_type in session_types), ZERO)
+
+    transport = ZERO
+    if details.get('transportRequired'):
+        transport = _routes_cost(rates, details)
+        if not _list(details.get('landTransportRoutes')) and not _list(details.get('airTransportRoutes')):
+            transport = (
+                _number(details.get('landTransportParticipants')) * DEFAULT_LAND_TRANSPORT_PRICE +
+                _number(details.get('airTransportParticipants')) * DEFAULT_AIR_TRANSPORT_PRICE
+            )
+    other = _number(details.get('otherCosts'))
+
+    subtotal = lodging + participant_costs + session_costs + transport + other
+    return {
+        'total': subtotal * sessions,
+        'lodging': lodging,
+        'transport': transport,
+        'participant_costs': participant_costs,
+        'session_costs': session_costs,
+        'other_costs': other,
+        'sessions': sessions,
+    }
+
+
+def calculate_supervision(details, rates):
+    location_id = details.get('location')
+    days = _number(details.get('numberOfDays'))
+    supervisors = _number(details.get('numberOfSupervisors'))
+    cost_mode = details.get('costMode') or 'perdiem'
+
+    stays = _stays(location_id, supervisors, days, details.get('additionalLocations'), 'supervisors')
+    lodging = _table_lodging_cost(
+        rates, stays, cost_mode, [details.get('accommodationType') or 'FULL_BOARD'], require_main_row=False
+    )
+
+    additional_supervisors = _number(details.get('numberOfSupervisorsWithAdditionalCost'))
+    supervisor_costs = sum((
+        rates.supervisor_costs.get(_cost_type(entry), ZERO) * additional_supervisors
+        for entry in _list(details.get('additionalSupervisorCosts'))
+    ), ZERO)
+
+    transport = _routes_cost(rates, details, default_participants=ZERO)
+    if details.get('transportRequired'):
+        transport += _number(details.get('landTransportSupervisors')) * rates.average_transport_price()
+        transport += _number(details.get('airTransportSupervisors')) * rates.average_transport_price(air=True)
+    other = _number(details.get('otherCosts'))
+
+    return {
+        'total': lodging + supervisor_costs + transport + other,
+        'lodging': lodging,
+        'transport': transport,
+        'supervisor_costs': supervisor_costs,
+        'other_costs': other,
+    }
+
+
+def calculate_printing(details, rates):
+    document_type = details.get('documentType')
+    price_per_page = PRINTING_PRICES.get(document_type, ZERO) if isinstance(document_type, str) else ZERO
+    printing = price_per_page * _number(details.get('numberOfPages')) * _number(details.get('numberOfCopies'))
+    other = _number(details.get('otherCosts'))
+    return {'total': printing + other, 'printing': printing, 'other_costs': other}
+
+
+def calculate_procurement(details, rates):
+    # The tool prices nothing, not even other costs, until the catalogue has loaded
+    if not rates.procurement_prices:
+        return {'total': ZERO}
+    items = ZERO
+    for item in _list(details.get('items')):
+        if not isinstance(item, dict) or not item.get('itemId'):
+            continue
+        unit_price = rates.procurement_prices.get(str(item['itemId']))
+        if unit_price is not None:
+            items += unit_price * _number(item.get('quantity'))
+    other = _number(details.get('otherCosts'))
+    return {'total': items + other, 'items': items, 'other_costs': other}
+
+
+CALCULATORS = {
+    'Training': calculate_training,
+    'Meeting': calculate_meeting_workshop,
+    'Workshop': calculate_meeting_workshop,
+    'Supervision': calculate_supervision,
+    'Printing': calculate_printing,
+    'Procurement': calculate_procurement,
+}
+
+
+def calculate(activity_type, details, rates):
+    """
+    Cost one set of tool parameters. Returns the breakdown with every amount
+    rounded to cents; raises CostingError for unsupported input.
+    """
+    calculator = CALCULATORS.get(activity_type) if isinstance(activity_type, str) else None
+    if calculator is None:
+        raise CostingError(f'No costing tool for activity type {activity_type!r}')
+    if not isinstance(details, dict):
+        raise CostingError(f'{DETAILS_FIELDS[activity_type]} must be an object')
+
+    try:
+        breakdown = calculator(details, rates)
+        breakdown = {key: value.quantize(CENT, rounding=ROUND_HALF_UP) for key, value in breakdown.items()}
+    except (ArithmeticError, AttributeError, KeyError, TypeError, ValueError) as e:
+        # Malformed tool JSON fails this item only, never a whole batch
+        raise CostingError(f'Invalid {DETAILS_FIELDS[activity_type]}: {e}') from e
+    if not all(value.is_finite() for value in breakdown.values()):
+        raise CostingError(f'{DETAILS_FIELDS[activity_type]} does not produce a finite cost')
+    return breakdown
+
+
+def calculate_sub_activity(sub_activity, rates):
+    """Cost a sub-activity from its stored tool details"""
+    activity_type = sub_activity.activity_type
+    if activity_type not in DETAILS_FIELDS:
+        raise CostingError(f'No costing tool for activity type {activity_type!r}')
+    details = getattr(sub_activity, DETAILS_FIELDS[activity_type])
+    if not details:
+        raise CostingError(f'{DETAILS_FIELDS[activity_type]} is empty')
+    return calculate(activity_type, details, rates)
+
+
+def recompute_sub_activity_costs(queryset=None, chunk_size=500, dry_run=True, progress=None):
+    """
+    Recompute ``estimated_cost_with_tool`` of tool-based sub-activities from their stored
+    details and the current rates. Nothing is saved unless ``dry_run`` is False.
+
+    Rows are read in primary-key order, ``chunk_size`` at a time, and each chunk's changes
+    are written with one ``bulk_update`` in its own transaction, so the whole table is
+    never held in memory. ``progress(summary)`` is called after every chunk.
+    Returns a summary of what changed.
+    """
+    from django.db import transaction
+    from django.utils import timezone
+    from .models import SubActivity
+    from .objective_cache import invalidate_main_activities
+    from .plan_budget import mark_main_activities_dirty
+
+    if queryset is None:
+        queryset = SubActivity.objects.all()
+    queryset = queryset.filter(
+        budget_calculation_type='WITH_TOOL',
+        activity_type__in=list(DETAILS_FIELDS),
+    ).only(
+        'id', 'name', 'main_activity', 'activity_type', 'estimated_cost_with_tool',
+        *sorted(set(DETAILS_FIELDS.values()))
+    ).order_by('id')
+
+    rates = RateTables.load()
+    summary = {
+        'scanned': 0,
+        'changed': 0,
+        'unchanged': 0,
+        'skipped': 0,
+        'total_before': ZERO,
+        'total_after': ZERO,
+        'by_activity_type': {},
+        'largest_changes': [],
+        'errors': [],
+        'dry_run': dry_run,
+    }
+
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+
+        changed = []
+        now = timezone.now()
+        for sub_activity in chunk:
+            summary['scanned'] += 1
+            try:
+                new_cost = calculate_sub_activity(sub_activity, rates)['total']
+            except Exception as e:
+                # calculate() reports bad details (including non-finite totals) as CostingError;
+                # anything else wrong with one stored row must not stop the pass over the table either
+                summary['skipped'] += 1
+                if len(summary['errors']) < 100:
+                    summary['errors'].append({'sub_activity': sub_activity.id, 'error': str(e)})
+                continue
+
+            old_cost = sub_activity.estimated_cost_with_tool or ZERO
+            summary['total_before'] += old_cost
+            summary['total_after'] += new_cost
+            if new_cost == old_cost:
+                summary['unchanged'] += 1
+                continue
+
+            by_type = summary['by_activity_type'].setdefault(sub_activity.activity_type, {
+                'changed': 0, 'total_before': ZERO, 'total_after': ZERO
+            })
+            by_type['changed'] += 1
+            by_type['total_before'] += old_cost
+            by_type['total_after'] += new_cost
+            summary['largest_changes'].append({
+                'sub_activity': sub_activity.id,
+                'name': sub_activity.name,
+                'old': old_cost,
+                'new': new_cost,
+                'difference': new_cost - old_cost,
+            })
+
+            sub_activity.estimated_cost_with_tool = new_cost
+            sub_activity.updated_at = now
+            changed.append(sub_activity)
+
+        summary['changed'] += len(changed)
+        summary['largest_changes'] = sorted(
+            summary['largest_changes'], key=lambda change: abs(change['difference']), reverse=True
+        )[:20]
+
+        if changed and not dry_run:
+            with transaction.atomic():
+                SubActivity.objects.bulk_update(changed, ['estimated_cost_with_tool', 'updated_at'])
+                # bulk_update sends no signals
+                main_activity_ids = {sub_activity.main_activity_id for sub_activity in changed}
+                mark_main_activities_dirty(main_activity_ids)
+                invalidate_main_activities(main_activity_ids)
+
+        if progress:
+            progress(summary)
+
+    return summary
@@ -0,0 +1,104 @@
+"""
+One versioned document with every costing rate table, so the costing tools load their
+reference data with a single (usually 304) request instead of seven or more.
+
+The bundle is cached in process per version. The version lives in the Django cache
+and is bumped from signals whenever a rate model is saved or deleted, so every worker
+sees the bump through the shared cache; each worker's copy also expires after
+COSTING_REFERENCE_CACHE_TIMEOUT seconds.
+"""
+import hashlib
+import json
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from .models import (
+    Location, LandTransport, AirTransport, PerDiem, Accommodation,
+    ParticipantCost, SessionCost, PrintingCost, SupervisorCost
+)
+from .serializers import (
+    LocationSerializer, LandTransportSerializer, AirTransportSerializer,
+    PerDiemSerializer, AccommodationSerializer, ParticipantCostSerializer,
+    SessionCostSerializer, PrintingCostSerializer, SupervisorCostSerializer
+)
+
+VERSION_CACHE_KEY = 'costing_reference_data_version'
+
+# (bundle key, model, serializer, queryset factory)
+RATE_TABLES = [
+    ('locations', Location, LocationSerializer,
+     lambda: Location.objects.order_by('region', 'name')),
+    ('land_transports', LandTransport, LandTransportSerializer,
+     lambda: LandTransport.objects.select_related('origin', 'destination').order_by('id')),
+    ('air_transports', AirTransport, AirTransportSerializer,
+     lambda: AirTransport.objects.select_related('origin', 'destination').order_by('id')),
+    ('per_diems', PerDiem, PerDiemSerializer,
+     lambda: PerDiem.objects.select_related('location').order_by('id')),
+    ('accommodations', Accommodation, AccommodationSerializer,
+     lambda: Accommodation.objects.select_related('location').order_by('id')),
+    ('participant_costs', ParticipantCost, ParticipantCostSerializer,
+     lambda: ParticipantCost.objects.order_by('id')),
+    ('session_costs', SessionCost, SessionCostSerializer,
+     lambda: SessionCost.objects.order_by('id')),
+    ('printing_costs', PrintingCost, PrintingCostSerializer,
+     lambda: PrintingCost.objects.order_by('id')),
+    ('supervisor_costs', SupervisorCost, SupervisorCostSerializer,
+     lambda: SupervisorCost.objects.order_by('id')),
+]
+
+RATE_MODELS = [model for _, model, _, _ in RATE_TABLES]
+
+_lock = threading.Lock()
+_cached = {}  # version, etag, data, built_at
+
+
+def _cache_timeout():
+    return getattr(settings, 'COSTING_REFERENCE_CACHE_TIMEOUT', 300)
+
+
+def current_version():
+    """The current reference-data version, creating one on first use"""
+    return cache.get_or_set(VERSION_CACHE_KEY, lambda: uuid.uuid4().hex, timeout=None)
+
+
+def bump_version():
+    """Invalidate the bundle once the current transaction commits"""
+    def _bump():
+        cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, timeout=None)
+        with _lock:
+            _cached.clear()
+    transaction.on_commit(_bump)
+
+
+def build_reference_data():
+    """Serialize every rate table; the ETag is a hash of the content"""
+    data = {
+        key: serializer(queryset(), many=True).data
+        for key, _, serializer, queryset in RATE_TABLES
+    }
+    content = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+    etag = hashlib.sha1(content.encode('utf-8')).hexdigest()
+    return data, etag
+
+
+def get_reference_data():
+    """
+    Return ``(data, etag)`` for the current version, rebuilding only after a rate
+    table changed or the local copy expired
+    """
+    version = current_version()
+    with _lock:
+        if (
+            _cached.get('version') == version and
+            time.monotonic() - _cached['built_at'] < _cache_timeout()
+        ):
+            return _cached['data'], _cached['etag']
+
+    data, etag = build_reference_data()
+    with _lock:
+        _cached.update(version=version, etag=etag, data=data, built_at=time.monotonic())
+    return data, etag
@@ -0,0 +1,137 @@
+"""
+Dashboard statistics aggregated with SQL GROUP BY instead of shipping every
+sub-activity to the browser.
+"""
+from decimal import Decimal
+from django.db.models import Count, Sum, Value, DecimalField
+from django.db.models.functions import Coalesce, Greatest
+from .models import Plan, PlanBudgetSummary, estimated_cost_expression, total_funding_expression
+
+# Plans in these statuses count towards the budget figures, as on the admin dashboard
+BUDGET_PLAN_STATUSES = ['SUBMITTED', 'APPROVED']
+
+FUNDING_SOURCES = ['government_treasury', 'sdg_funding', 'partners_funding', 'other_funding']
+
+ZERO = Value(Decimal('0'))
+MONEY = DecimalField(max_digits=20, decimal_places=2)
+
+
+def _money_sum(expression):
+    return Coalesce(Sum(expression), ZERO, output_field=MONEY)
+
+
+def funding_gap_expression(total_budget, total_funding):
+    """Unfunded part of a total, as MainActivity.funding_gap: never negative, taken after summing"""
+    return Greatest(total_budget - total_funding, ZERO, output_field=MONEY)
+
+
+def budget_aggregates():
+    """Aggregates of sub-activity rows shared by every budget grouping"""
+    cost = estimated_cost_expression()
+    funding = total_funding_expression()
+    aggregates = {
+        'sub_activity_count': Count('id'),
+        'total_budget': _money_sum(cost),
+        'total_funding': _money_sum(funding),
+        'funding_gap': funding_gap_expression(_money_sum(cost), _money_sum(funding)),
+    }
+    for source in FUNDING_SOURCES:
+        aggregates[source] = _money_sum(source)
+    return aggregates
+
+
+def summary_aggregates(prefix=''):
+    """The same aggregates over PlanBudgetSummary rows (``prefix`` reaches them through a relation)"""
+    aggregates = {
+        # First: the annotations below shadow the columns it sums
+        'funding_gap': funding_gap_expression(
+            _money_sum(f'{prefix}total_budget'), _money_sum(f'{prefix}total_funding')
+        ),
+        'sub_activity_count': Coalesce(Sum(f'{prefix}sub_activity_count'), Value(0)),
+        'total_budget': _money_sum(f'{prefix}total_budget'),
+        'total_funding': _money_sum(f'{prefix}total_funding'),
+    }
+    for source in FUNDING_SOURCES:
+        aggregates[source] = _money_sum(f'{prefix}{source}')
+    return aggregates
+
+
+def _plans(fiscal_year=None, organization_ids=None):
+    plans = Plan.objects.all()
+    if fiscal_year:
+        plans = plans.filter(fiscal_year=fiscal_year)
+    if organization_ids is not None:
+        plans = plans.filter(organization_id__in=organization_ids)
+    return plans
+
+
+def dashboard_stats(fiscal_year=None, organization_ids=None):
+    """
+    Budget totals, funding by source and funding gap grouped by organization,
+    activity type and plan status. ``organization_ids`` of None means all organizations.
+
+    Budgets are those of the plans in scope, read from the maintained PlanBudgetSummary
+    table, so every sub-activity counts once per plan that holds it and the fiscal year
+    filters the budget itself. Totals cover submitted and approved plans.
+    """
+    plans = _plans(fiscal_year, organization_ids)
+    summaries = PlanBudgetSummary.objects.filter(plan__in=plans).order_by()
+    budget_summaries = summaries.filter(plan__status__in=BUDGET_PLAN_STATUSES)
+    aggregates = summary_aggregates()
+
+    totals = budget_summaries.aggregate(**aggregates)
+
+    by_organization = list(
+        budget_summaries.values(
+            'plan__organization_id', 'plan__organization__name'
+        ).annotate(**aggregates).order_by('plan__organization__name')
+    )
+    for row in by_organization:
+        row['organization'] = row.pop('plan__organization_id')
+        row['organization_name'] = row.pop('plan__organization__name')
+
+    by_activity_type = list(
+        budget_summaries.values('activity_type').annotate(**aggregates).order_by('activity_type')
+    )
+
+    # Every plan status, each plan's budget counted under its own status only
+    by_plan_status = {
+        row['status']: dict(row, total_budget=Decimal('0'), total_funding=Decimal('0'), funding_gap=Decimal('0'))
+        for row in plans.order_by().values('status').annotate(
+            plan_count=Count('id'), organization_count=Count('organization_id', distinct=True)
+        )
+    }
+    status_budgets = summaries.values('plan__status').annotate(
+        **{field: aggregates[field] for field in ['funding_gap', 'total_budget', 'total_funding']}
+    )
+    for row in status_budgets:
+        entry = by_plan_status.get(row['plan__status'])
+        if entry:
+            entry.update({field: row[field] for field in ['total_budget', 'total_funding', 'funding_gap']})
+
+    # Per-plan totals come from the maintained summary table
+    plan_aggregates = summary_aggregates('budget_summaries__')
+    by_plan = list(
+        plans.order_by().values(
+            'id', 'organization_id', 'organization__name', 'status', 'fiscal_year', 'submitted_at'
+        ).annotate(
+            **{field: plan_aggregates[field] for field in ['funding_gap', 'total_budget', 'total_funding']}
+        ).order_by('organization__name', 'id')
+    )
+    for row in by_plan:
+        row['plan'] = row.pop('id')
+        row['organization'] = row.pop('organization_id')
+        row['organization_name'] = row.pop('organization__name')
+
+    return {
+        'filters': {
+            'fiscal_year': fiscal_year,
+            'organizations': organization_ids,
+        },
+        'totals': totals,
+        'funding_by_source': {source: totals[source] for source in FUNDING_SOURCES},
+        'by_organization': by_organization,
+        'by_activity_type': by_activity_type,
+        'by_plan_status': sorted(by_plan_status.values(), key=lambda entry: entry['status']),
+        'by_plan': by_plan,
+    }
@@ -0,0 +1,179 @@
+"""
+Database-backed queue for bulk imports.
+
+Upload endpoints store the file under IMPORT_JOB_DIR and create an ImportJob; the
+``run_import_worker`` command claims jobs and imports them chunk by chunk. Every chunk
+is committed together with the job's checkpoint, so a job whose worker died (no
+heartbeat for IMPORT_JOB_STALE_AFTER seconds) is claimed again and resumes at the
+first uncommitted chunk.
+"""
+import logging
+import os
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from .bulk_import import BulkSubActivityImporter, BulkProcurementImporter, validate_file_format
+from .models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+# A job that keeps killing its worker is failed instead of being retried forever
+MAX_ATTEMPTS = 3
+
+CHECKPOINT_FIELDS = [
+    'chunks_completed', 'rows_processed', 'rows_imported', 'error_count', 'warning_count',
+    'errors', 'warnings', 'heartbeat_at', 'updated_at',
+]
+
+
+class LostClaim(Exception):
+    """Another worker took the job over after this one missed its heartbeat"""
+
+
+def build_importer(job):
+    """The importer for a job, configured from the options given at upload time"""
+    options = job.options or {}
+    if job.kind == 'SUB_ACTIVITIES':
+        return BulkSubActivityImporter(
+            default_organization_id=options.get('organization_id'),
+            chunk_size=options.get('chunk_size'),
+            # Uploads from the API may only attach rows to their organization's main activities
+            main_activity_organization_ids=(
+                [options.get('organization_id')] if options.get('scope_main_activities') else None
+            ),
+        )
+    return BulkProcurementImporter(
+        mode=options.get('mode', 'skip'),
+        chunk_size=options.get('chunk_size'),
+    )
+
+
+def enqueue_import(kind, uploaded_file, user=None, **options):
+    """
+    Store an uploaded file and queue it; raises ValueError for unsupported files or options.
+    The job is only visible to workers once the surrounding transaction commits.
+    """
+    validate_file_format(uploaded_file.name)
+    if kind == 'PROCUREMENT_ITEMS' and options.get('mode', 'skip') not in BulkProcurementImporter.MODES:
+        raise ValueError(
+            f'Invalid mode "{options["mode"]}". Valid options: {", ".join(BulkProcurementImporter.MODES)}'
+        )
+
+    os.makedirs(settings.IMPORT_JOB_DIR, exist_ok=True)
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+    file_path = os.path.join(settings.IMPORT_JOB_DIR, f'{uuid.uuid4().hex}{extension}')
+    with open(file_path, 'wb') as destination:
+        for data in uploaded_file.chunks():
+            destination.write(data)
+
+    return ImportJob.objects.create(
+        kind=kind,
+        file_path=file_path,
+        original_filename=os.path.basename(uploaded_file.name)[:255],
+        options=options,
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def claim_next_job(worker, stale_after=None):
+    """
+    Claim the oldest pending job, or a running one whose worker stopped checkpointing.
+    Returns None when there is nothing to do.
+    """
+    if stale_after is None:
+        stale_after = settings.IMPORT_JOB_STALE_AFTER
+    while True:
+        with transaction.atomic():
+            stale = timezone.now() - timedelta(seconds=stale_after)
+            job = ImportJob.objects.select_for_update(skip_locked=True).filter(
+                Q(status='PENDING') |
+                Q(status='RUNNING', heartbeat_at__lt=stale)
+            ).order_by('created_at', 'id').first()
+            if job is None:
+                return None
+
+            now = timezone.now()
+            if job.attempts >= MAX_ATTEMPTS:
+                job.status = 'FAILED'
+                job.failure_reason = f'Gave up after {job.attempts} attempts'
+                job.finished_at = now
+                job.save(update_fields=['status', 'failure_reason', 'finished_at', 'updated_at'])
+                logger.warning('Import job %s failed after %s attempts', job.pk, job.attempts)
+                continue
+
+            if job.status == 'RUNNING':
+                logger.warning(
+                    'Resuming import job %s from chunk %s (worker %s stopped)',
+                    job.pk, job.chunks_completed, job.worker
+                )
+            job.status = 'RUNNING'
+            job.worker = worker
+            job.attempts = F('attempts') + 1
+            job.heartbeat_at = now
+            job.started_at = job.started_at or now
+            job.save(update_fields=['status', 'worker', 'attempts', 'heartbeat_at', 'started_at', 'updated_at'])
+            job.refresh_from_db(fields=['attempts'])
+            return job
+
+
+def _save_checkpoint(job, **extra):
+    """Save the job's progress, but only while this worker still owns it"""
+    fields = {name: getattr(job, name) for name in CHECKPOINT_FIELDS}
+    fields['updated_at'] = timezone.now()
+    fields.update(extra)
+    updated = ImportJob.objects.filter(pk=job.pk, status='RUNNING', worker=job.worker).update(**fields)
+    if not updated:
+        raise LostClaim(f'Import job {job.pk} was claimed by another worker')
+
+
+def run_job(job, progress=None):
+    """
+    Import a claimed job from its checkpoint onwards. Chunks committed by an earlier
+    attempt are read but not imported again.
+    """
+    importer = build_importer(job)
+    dry_run = bool((job.options or {}).get('dry_run'))
+
+    try:
+        for index, chunk in enumerate(importer.iter_chunks(job.file_path)):
+            if index < job.chunks_completed:
+                importer.skip_chunk(chunk)
+                continue
+
+            importer.errors = []
+            importer.warnings = []
+            with transaction.atomic():
+                valid = importer.import_chunk(chunk, dry_run)
+                job.record_chunk(len(chunk), len(valid), importer.errors, importer.warnings)
+                _save_checkpoint(job)
+            if progress:
+                progress(job)
+    except LostClaim:
+        logger.warning('Stopped import job %s: claimed by another worker', job.pk)
+        return job
+    except Exception as e:
+        logger.exception('Import job %s failed', job.pk)
+        job.status = 'FAILED'
+        job.failure_reason = str(e)
+        job.finished_at = timezone.now()
+        ImportJob.objects.filter(pk=job.pk, worker=job.worker).update(
+            status=job.status, failure_reason=job.failure_reason,
+            finished_at=job.finished_at, updated_at=job.finished_at,
+        )
+        return job
+
+    job.status = 'COMPLETED'
+    job.finished_at = timezone.now()
+    try:
+        _save_checkpoint(job, status=job.status, finished_at=job.finished_at)
+    except LostClaim:
+        return job
+
+    try:
+        os.remove(job.file_path)
+    except OSError:
+        pass
+    return job
@@ -0,0 +1,168 @@
+"""
+Per-request SQL and serialization metrics.
+
+``RequestMetricsMiddleware`` installs a database execute wrapper for the duration of
+a sampled request and records the number of queries, their total time, repeated query
+shapes (the usual sign of an N+1 in a nested serializer), the time spent in
+serializers and the response size. The figures go out as a ``Server-Timing`` header
+(visible in the browser's network panel) and as one structured log line per request.
+
+Settings:
+
+* ``REQUEST_METRICS_SAMPLE_RATE``: share of requests measured, 0.0 to 1.0 (1.0 with
+  DEBUG, 0.0 otherwise). A request can opt in with the ``X-Request-Metrics: 1``
+  header when ``REQUEST_METRICS_ALLOW_HEADER_OPT_IN`` is set.
+* ``REQUEST_METRICS_DUPLICATE_THRESHOLD``: a query shape repeated this many times is
+  logged as a warning (default 5).
+"""
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+_IN_LIST = re.compile(r'\bIN\s*\((?:\s*%s\s*,)*\s*%s\s*\)', re.IGNORECASE)
+_NUMBER = re.compile(r'\b\d+\b')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """The shape of a query: parameters are already placeholders, IN lists and literals collapse"""
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.fingerprints = Counter()
+        self.serialize_time = 0.0
+        self._serialize_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Django execute wrapper
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - started
+            self.query_count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self, limit=5):
+        """The most repeated query shapes as (count, sql) pairs"""
+        return [(count, sql) for sql, count in self.fingerprints.most_common(limit) if count > 1]
+
+    @property
+    def duplicate_count(self):
+        return sum(count - 1 for count in self.fingerprints.values() if count > 1)
+
+
+def current_metrics():
+    """The metrics of the request being measured on this thread, if any"""
+    return getattr(_local, 'metrics', None)
+
+
+class SerializationTimer:
+    """Time the outermost serializer of a response; nested serializers run inside it"""
+
+    def __enter__(self):
+        self.metrics = current_metrics()
+        if self.metrics is not None:
+            self.metrics._serialize_depth += 1
+            if self.metrics._serialize_depth == 1:
+                self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.metrics is not None:
+            self.metrics._serialize_depth -= 1
+            if self.metrics._serialize_depth == 0:
+                self.metrics.serialize_time += time.perf_counter() - self.started
+        return False
+
+
+class TimedSerializerMixin:
+    """Serializer mixin adding its to_representation time to the request metrics"""
+
+    def to_representation(self, instance):
+        with SerializationTimer():
+            return super().to_representation(instance)
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1)
+
+
+class RequestMetricsMiddleware:
+    """
+    Measure sampled requests and report them in ``Server-Timing`` and the log.
+    Place it first so session and authentication queries are counted too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'REQUEST_METRICS_SAMPLE_RATE', 1.0 if settings.DEBUG else 0.0)
+        self.allow_header_opt_in = getattr(settings, 'REQUEST_METRICS_ALLOW_HEADER_OPT_IN', settings.DEBUG)
+        self.duplicate_threshold = getattr(settings, 'REQUEST_METRICS_DUPLICATE_THRESHOLD', 5)
+
+    def _sampled(self, request):
+        if self.allow_header_opt_in and request.headers.get('X-Request-Metrics') == '1':
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if not self._sampled(request):
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        _local.metrics = metrics
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+
+        total_time = time.perf_counter() - metrics.started
+        size = None if getattr(response, 'streaming', False) else len(response.content)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={_ms(metrics.sql_time)};desc="{metrics.query_count} queries"',
+            f'dup;desc="{metrics.duplicate_count} repeated queries"',
+            f'serialize;dur={_ms(metrics.serialize_time)}',
+            f'total;dur={_ms(total_time)}',
+        ])
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': _ms(total_time),
+            'queries': metrics.query_count,
+            'sql_ms': _ms(metrics.sql_time),
+            'duplicate_queries': metrics.duplicate_count,
+            'serialize_ms': _ms(metrics.serialize_time),
+            'response_bytes': size,
+            'user': getattr(getattr(request, 'user', None), 'pk', None),
+        }
+        worst = metrics.duplicates(limit=3)
+        if worst and worst[0][0] >= self.duplicate_threshold:
+            record['repeated'] = [{'count': count, 'sql': sql[:300]} for count, sql in worst]
+            logger.warning('request_metrics %s', json.dumps(record))
+        else:
+            logger.info('request_metrics %s', json.dumps(record))
+        return response
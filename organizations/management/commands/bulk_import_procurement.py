@@ -4,7 +4,7 @@ from decimal import Decimal
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from organizations.models import ProcurementItem
-from organizations.bulk_import import BulkProcurementImporter
+from organizations.bulk_import import BulkProcurementImporter, DEFAULT_CHUNK_SIZE
 
 
 class Command(BaseCommand):
@@ -17,6 +17,25 @@ class Command(BaseCommand):
             help='Path to CSV or Excel file containing procurement items data',
             required=True
         )
+        parser.add_argument(
+            '--mode',
+            choices=BulkProcurementImporter.MODES,
+            default='skip',
+            help='insert: fail rows that already exist; skip: leave existing items unchanged (default); '
+                 'upsert: update the unit price of existing items',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BulkProcurementImporter.DEFAULT_BATCH_SIZE,
+            help='Rows written per bulk_create batch',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Rows read from the file and validated at a time',
+        )
         parser.add_argument(
             '--dry-run',
             action='store_true',
@@ -31,14 +50,18 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING('DRY RUN MODE - No data will be saved'))
 
         # Use the BulkProcurementImporter class
-        importer = BulkProcurementImporter()
+        importer = BulkProcurementImporter(
+            mode=options['mode'],
+            batch_size=options['batch_size'],
+            chunk_size=options['chunk_size']
+        )
         importer.stdout = self.stdout
         importer.style = self.style
         
         result = importer.import_from_file(file_path, dry_run)
         
         if result > 0 and not dry_run:
-            self.stdout.write(self.style.SUCCESS(f'Import completed successfully! {result} procurement items created.'))
+            self.stdout.write(self.style.SUCCESS(f'Import completed successfully! {result} procurement items saved.'))
         elif result > 0 and dry_run:
             self.stdout.write(self.style.SUCCESS(f'Dry run completed. {result} procurement items ready for import.'))
         else:
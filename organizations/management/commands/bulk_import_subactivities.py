@@ -4,6 +4,7 @@ from decimal import Decimal
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from organizations.models import SubActivity, MainActivity, Organization
+from organizations.bulk_import import BulkSubActivityImporter, DEFAULT_CHUNK_SIZE
 
 
 class Command(BaseCommand):
@@ -22,6 +23,18 @@ class Command(BaseCommand):
             help='Target organization ID for all sub-activities',
             required=False
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BulkSubActivityImporter.DEFAULT_BATCH_SIZE,
+            help='Rows inserted per bulk_create batch',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='Rows read from the file and validated at a time',
+        )
         parser.add_argument(
             '--dry-run',
             action='store_true',
@@ -37,7 +50,11 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING('DRY RUN MODE - No data will be saved'))
 
         # Use the BulkSubActivityImporter class
-        importer = BulkSubActivityImporter(default_organization_id=organization_id)
+        importer = BulkSubActivityImporter(
+            default_organization_id=organization_id,
+            batch_size=options['batch_size'],
+            chunk_size=options['chunk_size']
+        )
         importer.stdout = self.stdout
         importer.style = self.style
         
@@ -0,0 +1,110 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from organizations.models import (
+    ActivityBudget, MainActivity, PerformanceMeasure, Plan, StrategicInitiative, SubActivity,
+    organization_scope_q
+)
+
+
+def _first(model, field):
+    value = model.objects.order_by().values_list(field, flat=True).filter(**{f'{field}__isnull': False}).first()
+    return value if value is not None else 0
+
+
+def _column_indexes(model, column):
+    """Names of the indexes (including unique constraints) whose first column is ``column``"""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    names = {
+        name for name, info in constraints.items()
+        if (info['index'] or info['unique']) and info['columns'] and info['columns'][0] == column
+    }
+    if connection.vendor == 'sqlite':
+        # Inline UNIQUE columns get automatic indexes that introspection does not name
+        names.add(f'sqlite_autoindex_{table}')
+    return names
+
+
+def query_checks():
+    """(description, queryset, index names any of which the plan must use) for the hot query shapes"""
+    organization_id = _first(Plan, 'organization_id')
+    initiative_ids = list(StrategicInitiative.objects.order_by('id').values_list('id', flat=True)[:20]) or [0]
+    main_activity_id = _first(SubActivity, 'main_activity_id')
+    scope = organization_scope_q([organization_id])
+
+    return [
+        (
+            'Organization-scoped measures of initiatives (plan tree prefetch)',
+            PerformanceMeasure.objects.filter(scope, initiative_id__in=initiative_ids).order_by('id'),
+            {'idx_measure_init_org'},
+        ),
+        (
+            'Organization-scoped main activities of initiatives (plan tree prefetch)',
+            MainActivity.objects.filter(scope, initiative_id__in=initiative_ids).order_by('id'),
+            {'idx_mainactivity_init_org'},
+        ),
+        (
+            'Sub-activities of a main activity, in Meta.ordering',
+            SubActivity.objects.filter(main_activity_id=main_activity_id),
+            {'idx_subactivity_activity'},
+        ),
+        (
+            'Plan.clean duplicate submission check',
+            Plan.objects.filter(
+                organization_id=organization_id, fiscal_year=_first(Plan, 'fiscal_year'),
+                status__in=['SUBMITTED', 'APPROVED'],
+            ),
+            {'idx_plan_org_year_status'},
+        ),
+        (
+            'Pending reviews',
+            Plan.objects.filter(status='SUBMITTED'),
+            {'idx_plan_status_year'},
+        ),
+        (
+            'Budgets of a sub-activity',
+            ActivityBudget.objects.filter(sub_activity_id=_first(SubActivity, 'id')),
+            _column_indexes(ActivityBudget, 'sub_activity_id'),
+        ),
+    ]
+
+
+def run_query_checks():
+    """EXPLAIN every hot query shape: (description, queryset, plan, expected index names, used ones)"""
+    results = []
+    for description, queryset, indexes in query_checks():
+        plan = queryset.explain()
+        results.append((description, queryset, plan, indexes, sorted(name for name in indexes if name in plan)))
+    return results
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot filter queries and fail when one does not use its index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Print the full EXPLAIN output of every query',
+        )
+
+    def handle(self, *args, **options):
+        failures = []
+        for description, queryset, plan, indexes, used in run_query_checks():
+            if used:
+                self.stdout.write(self.style.SUCCESS(f'OK    {description}: {", ".join(used)}'))
+            else:
+                failures.append(description)
+                self.stdout.write(self.style.ERROR(
+                    f'MISS  {description}: expected {", ".join(sorted(indexes)) or "an index"}'
+                ))
+            if options['verbose_plans'] or not used:
+                self.stdout.write(f'      {str(queryset.query)}')
+                for line in plan.splitlines():
+                    self.stdout.write(f'      {line}')
+
+        if failures:
+            # Planners prefer table scans on nearly empty tables: run against realistic data
+            raise CommandError(f'{len(failures)} of the checked queries do not use their index')
+        self.stdout.write(self.style.SUCCESS('All checked queries use their indexes.'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from organizations.org_hierarchy import rebuild_closure
+
+
+class Command(BaseCommand):
+    help = 'Recompute the organization closure table from the parent links'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report missing and stale rows without fixing them',
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No data will be saved'))
+
+        summary = rebuild_closure(dry_run=options['dry_run'])
+
+        self.stdout.write(f"Expected rows: {summary['rows']}")
+        self.stdout.write(f"Missing rows:  {summary['missing']}")
+        self.stdout.write(f"Stale rows:    {summary['stale']}")
+        if summary['missing'] or summary['stale']:
+            verb = 'needs rebuilding' if options['dry_run'] else 'rebuilt'
+            self.stdout.write(self.style.SUCCESS(f'Closure table {verb}.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Closure table is up to date.'))
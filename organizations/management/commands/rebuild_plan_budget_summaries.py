@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from organizations.models import Plan
+from organizations.plan_budget import rebuild_plan_summaries
+
+
+class Command(BaseCommand):
+    help = 'Recompute the plan budget summary table from sub-activities and fix rows that drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--plan-id',
+            type=int,
+            action='append',
+            help='Only rebuild this plan (may be given several times)'
+        )
+        parser.add_argument(
+            '--organization-id',
+            type=int,
+            help='Only rebuild plans of this organization'
+        )
+        parser.add_argument(
+            '--fiscal-year',
+            help='Only rebuild plans of this fiscal year'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report out-of-date plans without fixing them',
+        )
+
+    def handle(self, *args, **options):
+        plans = Plan.objects.all()
+        if options.get('plan_id'):
+            plans = plans.filter(id__in=options['plan_id'])
+        if options.get('organization_id'):
+            plans = plans.filter(organization_id=options['organization_id'])
+        if options.get('fiscal_year'):
+            plans = plans.filter(fiscal_year=options['fiscal_year'])
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No data will be saved'))
+
+        def progress(plan):
+            self.stdout.write(f'  plan {plan.id} ({plan.fiscal_year}) was out of date')
+
+        summary = rebuild_plan_summaries(plans, dry_run=options['dry_run'], progress=progress)
+
+        verb = 'need rebuilding' if options['dry_run'] else 'rebuilt'
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {summary['plans']} plans, {summary['out_of_date']} {verb}."
+        ))
@@ -0,0 +1,92 @@
+from django.core.management.base import BaseCommand, CommandError
+from organizations.models import SubActivity
+from organizations.costing_engine import DETAILS_FIELDS, recompute_sub_activity_costs
+
+
+class Command(BaseCommand):
+    help = (
+        'Report how tool-based sub-activity costs differ from the current costing rate tables; '
+        'pass --apply to save the recomputed costs'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Sub-activities read and updated per batch (default 500)'
+        )
+        parser.add_argument(
+            '--activity-type',
+            choices=sorted(DETAILS_FIELDS),
+            help='Only recompute sub-activities of this type'
+        )
+        parser.add_argument(
+            '--organization-id',
+            type=int,
+            help='Only recompute sub-activities of this organization'
+        )
+        parser.add_argument(
+            '--apply',
+            action='store_true',
+            help='Save the recomputed costs (by default the differences are only reported)',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        queryset = SubActivity.objects.all()
+        if options.get('activity_type'):
+            queryset = queryset.filter(activity_type=options['activity_type'])
+        if options.get('organization_id'):
+            queryset = queryset.filter(main_activity__organization_id=options['organization_id'])
+
+        dry_run = not options['apply']
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No data will be saved (pass --apply to save)'))
+
+        def progress(summary):
+            self.stdout.write(
+                f"  scanned {summary['scanned']}, changed {summary['changed']}, skipped {summary['skipped']}"
+            )
+
+        summary = recompute_sub_activity_costs(
+            queryset=queryset,
+            chunk_size=chunk_size,
+            dry_run=dry_run,
+            progress=progress
+        )
+
+        self.stdout.write('')
+        self.stdout.write(f"Scanned:   {summary['scanned']}")
+        self.stdout.write(f"Changed:   {summary['changed']}")
+        self.stdout.write(f"Unchanged: {summary['unchanged']}")
+        self.stdout.write(f"Skipped:   {summary['skipped']}")
+        self.stdout.write(
+            f"Total cost: {summary['total_before']:,.2f} -> {summary['total_after']:,.2f} "
+            f"({summary['total_after'] - summary['total_before']:+,.2f})"
+        )
+
+        for activity_type, diff in sorted(summary['by_activity_type'].items()):
+            self.stdout.write(
+                f"  {activity_type}: {diff['changed']} changed, "
+                f"{diff['total_before']:,.2f} -> {diff['total_after']:,.2f}"
+            )
+
+        if summary['largest_changes']:
+            self.stdout.write('Largest changes:')
+            for change in summary['largest_changes'][:10]:
+                self.stdout.write(
+                    f"  #{change['sub_activity']} {change['name']}: "
+                    f"{change['old']:,.2f} -> {change['new']:,.2f} ({change['difference']:+,.2f})"
+                )
+
+        for error in summary['errors'][:10]:
+            self.stdout.write(self.style.WARNING(f"  Skipped #{error['sub_activity']}: {error['error']}"))
+
+        if dry_run:
+            self.stdout.write(self.style.SUCCESS(f"Dry run completed. {summary['changed']} sub-activities would change."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Recompute completed. {summary['changed']} sub-activities updated."))
@@ -0,0 +1,69 @@
+import os
+import socket
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from organizations.import_jobs import claim_next_job, run_job
+
+
+class Command(BaseCommand):
+    help = 'Process queued bulk import jobs (run one or more of these next to the web server)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the jobs that are queued now, then exit',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5,
+            help='Seconds to wait between checks when the queue is empty (default 5)'
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=settings.IMPORT_JOB_STALE_AFTER,
+            help='Resume RUNNING jobs whose worker has not checkpointed for this many seconds'
+        )
+
+    def handle(self, *args, **options):
+        if options['poll_interval'] <= 0:
+            raise CommandError('--poll-interval must be positive')
+
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        self.stdout.write(f'Import worker {worker} started')
+
+        def progress(job):
+            self.stdout.write(
+                f'  job {job.pk}: chunk {job.chunks_completed}, '
+                f'{job.rows_processed} rows, {job.rows_imported} imported, {job.error_count} errors'
+            )
+
+        try:
+            while True:
+                close_old_connections()
+                job = claim_next_job(worker, stale_after=options['stale_after'])
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                self.stdout.write(
+                    f'Import job {job.pk} ({job.get_kind_display()}, {job.original_filename}), '
+                    f'attempt {job.attempts}, starting at chunk {job.chunks_completed}'
+                )
+                job = run_job(job, progress=progress)
+                if job.status == 'COMPLETED':
+                    self.stdout.write(self.style.SUCCESS(
+                        f'Import job {job.pk} completed: {job.rows_imported} of {job.rows_processed} rows imported'
+                    ))
+                elif job.status == 'FAILED':
+                    self.stdout.write(self.style.ERROR(f'Import job {job.pk} failed: {job.failure_reason}'))
+                else:
+                    self.stdout.write(self.style.WARNING(f'Import job {job.pk} was taken over by another worker'))
+        except KeyboardInterrupt:
+            self.stdout.write('Import worker stopped')
@@ -0,0 +1,86 @@
+from django.utils.functional import SimpleLazyObject
+from .models import OrganizationUser
+
+
+class OrganizationContext:
+    """
+    The organizations and roles of the requesting user, resolved once per request
+    """
+
+    def __init__(self, memberships):
+        self.memberships = list(memberships)
+        self.organization_ids = [m.organization_id for m in self.memberships]
+        self.roles = {m.role for m in self.memberships}
+
+    @classmethod
+    def for_user(cls, user):
+        if user is None or not user.is_authenticated:
+            return cls([])
+        return cls(
+            OrganizationUser.objects.filter(user=user).select_related('organization').order_by('id')
+        )
+
+    @property
+    def primary(self):
+        """The user's first organization membership (what organization_users.first() returned)"""
+        return self.memberships[0] if self.memberships else None
+
+    @property
+    def primary_organization_id(self):
+        return self.primary.organization_id if self.primary else None
+
+    @property
+    def primary_organization(self):
+        return self.primary.organization if self.primary else None
+
+    @property
+    def primary_scope(self):
+        """
+        Organization IDs the nested serializers scope measures and activities to,
+        or None (no scoping) when the user has no organization
+        """
+        organization_id = self.primary_organization_id
+        return [organization_id] if organization_id else None
+
+    def has_role(self, *roles):
+        return any(role in self.roles for role in roles)
+
+    def membership_with_role(self, *roles):
+        """First membership holding one of the given roles"""
+        for membership in self.memberships:
+            if membership.role in roles:
+                return membership
+        return None
+
+    def __bool__(self):
+        return bool(self.memberships)
+
+
+def get_organization_context(request):
+    """
+    Return the organization context of a request, building it on first use when the
+    middleware did not run (management commands, tests, admin-only URL confs)
+    """
+    if request is None:
+        return OrganizationContext([])
+    context = getattr(request, 'organization_context', None)
+    if context is None:
+        context = OrganizationContext.for_user(getattr(request, 'user', None))
+        request.organization_context = context
+    return context
+
+
+class OrganizationContextMiddleware:
+    """
+    Attach ``request.organization_context`` so serializers, querysets and role checks
+    share one membership lookup per request. Must run after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.organization_context = SimpleLazyObject(
+            lambda: OrganizationContext.for_user(request.user)
+        )
+        return self.get_response(request)
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='plan',
+            index=models.Index(fields=['created_at', 'id'], name='idx_plan_created'),
+        ),
+        migrations.AddIndex(
+            model_name='mainactivity',
+            index=models.Index(fields=['created_at', 'id'], name='idx_mainactivity_created'),
+        ),
+        migrations.AddIndex(
+            model_name='subactivity',
+            index=models.Index(fields=['created_at', 'id'], name='idx_subactivity_created'),
+        ),
+    ]
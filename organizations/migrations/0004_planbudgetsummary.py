@@ -0,0 +1,36 @@
+# Generated by Django 4.2.10 on 2026-10-17 03:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0003_importjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanBudgetSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('activity_type', models.CharField(choices=[('Training', 'Training'), ('Meeting', 'Meeting'), ('Workshop', 'Workshop'), ('Printing', 'Printing'), ('Supervision', 'Supervision'), ('Procurement', 'Procurement'), ('Other', 'Other')], max_length=20)),
+                ('sub_activity_count', models.PositiveIntegerField(default=0)),
+                ('total_budget', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('government_treasury', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('sdg_funding', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('partners_funding', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('other_funding', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('total_funding', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('funding_gap', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('initiative', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='organizations.strategicinitiative')),
+                ('plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='budget_summaries', to='organizations.plan')),
+                ('strategic_objective', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='organizations.strategicobjective')),
+            ],
+            options={
+                'unique_together': {('plan', 'initiative', 'activity_type')},
+            },
+        ),
+    ]
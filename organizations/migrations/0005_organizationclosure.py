@@ -0,0 +1,42 @@
+# Generated by Django 4.2.10 on 2026-10-17 03:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_closure(apps, schema_editor):
+    Organization = apps.get_model('organizations', 'Organization')
+    OrganizationClosure = apps.get_model('organizations', 'OrganizationClosure')
+    parents = dict(Organization.objects.values_list('id', 'parent_id'))
+    rows = []
+    for organization_id in parents:
+        ancestor_id, depth, seen = organization_id, 0, set()
+        while ancestor_id is not None and ancestor_id in parents and ancestor_id not in seen:
+            seen.add(ancestor_id)
+            rows.append(OrganizationClosure(ancestor_id=ancestor_id, descendant_id=organization_id, depth=depth))
+            ancestor_id, depth = parents[ancestor_id], depth + 1
+    OrganizationClosure.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0004_planbudgetsummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrganizationClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='organizations.organization')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='organizations.organization')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='idx_orgclosure_descendant')],
+                'unique_together': {('ancestor', 'descendant')},
+            },
+        ),
+        migrations.RunPython(populate_closure, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0005_organizationclosure'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='performancemeasure',
+            index=models.Index(fields=['initiative', 'organization'], name='idx_measure_init_org'),
+        ),
+        migrations.AddIndex(
+            model_name='mainactivity',
+            index=models.Index(fields=['initiative', 'organization'], name='idx_mainactivity_init_org'),
+        ),
+        migrations.AddIndex(
+            model_name='subactivity',
+            index=models.Index(fields=['main_activity', 'created_at'], name='idx_subactivity_activity'),
+        ),
+        migrations.AddIndex(
+            model_name='plan',
+            index=models.Index(fields=['organization', 'fiscal_year', 'status'], name='idx_plan_org_year_status'),
+        ),
+        migrations.AddIndex(
+            model_name='plan',
+            index=models.Index(fields=['status', 'fiscal_year'], name='idx_plan_status_year'),
+        ),
+    ]
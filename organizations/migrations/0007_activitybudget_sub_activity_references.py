@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Intentionally empty. 0001 already created ActivityBudget.sub_activity as an integer
+    one-to-one foreign key; only the model declaration disagreed, so there is no data
+    to convert. Kept so that databases which recorded it and 0008 stay consistent.
+    """
+
+    dependencies = [
+        ('organizations', '0006_hot_path_indexes'),
+    ]
+
+    operations = []
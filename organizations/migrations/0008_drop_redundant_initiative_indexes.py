@@ -0,0 +1,24 @@
+# Generated by Django 4.2.10 on 2026-10-17 04:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0007_activitybudget_sub_activity_references'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='mainactivity',
+            name='initiative',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='main_activities', to='organizations.strategicinitiative'),
+        ),
+        migrations.AlterField(
+            model_name='performancemeasure',
+            name='initiative',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='performance_measures', to='organizations.strategicinitiative'),
+        ),
+    ]
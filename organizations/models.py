@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Coalesce, Greatest
 from django.core.exceptions import ValidationError
 from decimal import Decimal
 from django.utils import timezone
@@ -11,6 +12,53 @@ def validate_max_weight(value):
     if value > 100:
         raise ValidationError('Weight cannot exceed 100')
 
+def organization_scope_q(organization_ids, prefix=''):
+    """
+    Default rows (no organization) plus rows owned by one of the given organizations.
+    ``None`` means no organization filtering at all.
+    """
+    if organization_ids is None:
+        return models.Q()
+    return (
+        models.Q(**{f'{prefix}organization__isnull': True}) |
+        models.Q(**{f'{prefix}organization_id__in': list(organization_ids)})
+    )
+
+def weight_total_subquery(model, parent_field, organization_ids=None):
+    """Correlated SUM(weight) of a child model's rows for the outer parent row"""
+    totals = model.objects.filter(
+        organization_scope_q(organization_ids),
+        **{parent_field: models.OuterRef('pk')}
+    ).order_by().values(parent_field).annotate(total=models.Sum('weight')).values('total')
+    return Coalesce(
+        models.Subquery(totals[:1]),
+        models.Value(Decimal('0')),
+        output_field=models.DecimalField(max_digits=7, decimal_places=2)
+    )
+
+def _organization_ids(organizations):
+    """IDs from an organization, an ID, or an iterable of either"""
+    if isinstance(organizations, (models.Model, int, str)):
+        organizations = [organizations]
+    return [org.pk if isinstance(org, models.Model) else org for org in organizations]
+
+
+class OrganizationQuerySet(models.QuerySet):
+    def descendants_of(self, organizations, include_self=True):
+        """Organizations in the subtree(s) of the given organizations, via the closure table"""
+        links = OrganizationClosure.objects.filter(ancestor_id__in=_organization_ids(organizations))
+        if not include_self:
+            links = links.filter(depth__gt=0)
+        return self.filter(pk__in=links.values('descendant_id'))
+
+    def ancestors_of(self, organizations, include_self=True):
+        """Organizations on the path from the root down to the given organizations"""
+        links = OrganizationClosure.objects.filter(descendant_id__in=_organization_ids(organizations))
+        if not include_self:
+            links = links.filter(depth__gt=0)
+        return self.filter(pk__in=links.values('ancestor_id'))
+
+
 class Organization(models.Model):
     ORGANIZATION_TYPES = [
         ('MINISTER', 'Minister'),
@@ -36,10 +84,40 @@ class Organization(models.Model):
     core_values = models.JSONField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = OrganizationQuerySet.as_manager()
     
     def __str__(self):
         return self.name
 
+
+class OrganizationClosure(models.Model):
+    """
+    One row per (ancestor, descendant) pair of the organization tree, including each
+    organization paired with itself at depth 0. Maintained from signals on
+    Organization (see org_hierarchy.py), so subtree filters are a single indexed join.
+    """
+    ancestor = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name='descendant_links'
+    )
+    descendant = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name='ancestor_links'
+    )
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('ancestor', 'descendant')
+        indexes = [
+            models.Index(fields=['descendant', 'depth'], name='idx_orgclosure_descendant'),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
 class OrganizationUser(models.Model):
     ROLES = [
         ('ADMIN', 'Admin'),
@@ -59,6 +137,14 @@ class OrganizationUser(models.Model):
         return f"{self.user.username} - {self.organization.name} ({self.role})"
 
 
+class StrategicObjectiveQuerySet(models.QuerySet):
+    def with_weight_totals(self):
+        """Annotate ``initiatives_weight_total`` (sum of initiative weights) in the database"""
+        return self.annotate(
+            initiatives_weight_total=weight_total_subquery(StrategicInitiative, 'strategic_objective')
+        )
+
+
 class StrategicObjective(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField(null=True, blank=True)
@@ -78,6 +164,8 @@ class StrategicObjective(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = StrategicObjectiveQuerySet.as_manager()
     
     def clean(self):
         # Validate logic (in addition to field validators)
@@ -143,6 +231,18 @@ class InitiativeFeed(models.Model):
 
 
 
+class StrategicInitiativeQuerySet(models.QuerySet):
+    def with_weight_totals(self, organization_ids=None):
+        """
+        Annotate ``measures_weight_total`` and ``activities_weight_total``, counting default
+        rows plus rows of the given organizations (all rows when ``organization_ids`` is None)
+        """
+        return self.annotate(
+            measures_weight_total=weight_total_subquery(PerformanceMeasure, 'initiative', organization_ids),
+            activities_weight_total=weight_total_subquery(MainActivity, 'initiative', organization_ids),
+        )
+
+
 class StrategicInitiative(models.Model):
     name = models.CharField(max_length=255)
     weight = models.DecimalField(max_digits=5, decimal_places=2)
@@ -181,6 +281,8 @@ class StrategicInitiative(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = StrategicInitiativeQuerySet.as_manager()
     
     class Meta:
         constraints = [
@@ -264,10 +366,12 @@ class PerformanceMeasure(models.Model):
         ('constant', 'Constant')
     ]
     
+    # Indexed by idx_measure_init_org, which leads with the initiative
     initiative = models.ForeignKey(
         StrategicInitiative,
         on_delete=models.CASCADE,
-        related_name='performance_measures'
+        related_name='performance_measures',
+        db_index=False
     )
     name = models.CharField(max_length=255)
     weight = models.DecimalField(max_digits=5, decimal_places=2)
@@ -320,6 +424,12 @@ class PerformanceMeasure(models.Model):
     selected_quarters = models.JSONField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Organization-scoped measures of initiatives (plan trees, weight totals)
+            models.Index(fields=['initiative', 'organization'], name='idx_measure_init_org'),
+        ]
     
     def clean(self):
         super().clean()
@@ -404,6 +514,69 @@ class PerformanceMeasure(models.Model):
 
 
 
+def estimated_cost_expression(prefix=''):
+    """SQL form of SubActivity.estimated_cost (the cost matching the calculation type)"""
+    return models.Case(
+        models.When(
+            **{f'{prefix}budget_calculation_type': 'WITH_TOOL'},
+            then=models.F(f'{prefix}estimated_cost_with_tool')
+        ),
+        default=models.F(f'{prefix}estimated_cost_without_tool'),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2)
+    )
+
+def total_funding_expression(prefix=''):
+    """SQL form of SubActivity.total_funding (sum of the four funding sources)"""
+    return models.ExpressionWrapper(
+        models.F(f'{prefix}government_treasury') +
+        models.F(f'{prefix}sdg_funding') +
+        models.F(f'{prefix}partners_funding') +
+        models.F(f'{prefix}other_funding'),
+        output_field=models.DecimalField(max_digits=14, decimal_places=2)
+    )
+
+
+class MainActivityQuerySet(models.QuerySet):
+    def with_budget_totals(self, funding_sources=False):
+        """
+        Annotate ``budget_total``, ``funding_total`` and ``funding_gap_total`` summed over
+        the sub-activities in the database. The total_budget, total_funding and funding_gap
+        properties return these annotations instead of iterating sub-activities.
+        ``funding_sources`` adds ``government_total``, ``partners_total``, ``sdg_total``
+        and ``other_total``.
+        """
+        def sub_activity_sum(expression):
+            totals = SubActivity.objects.filter(
+                main_activity=models.OuterRef('pk')
+            ).order_by().values('main_activity').annotate(
+                total=models.Sum(expression)
+            ).values('total')
+            return Coalesce(
+                models.Subquery(totals[:1]),
+                models.Value(Decimal('0')),
+                output_field=models.DecimalField(max_digits=16, decimal_places=2)
+            )
+
+        queryset = self
+        if funding_sources:
+            queryset = queryset.annotate(
+                government_total=sub_activity_sum(models.F('government_treasury')),
+                partners_total=sub_activity_sum(models.F('partners_funding')),
+                sdg_total=sub_activity_sum(models.F('sdg_funding')),
+                other_total=sub_activity_sum(models.F('other_funding')),
+            )
+        return queryset.annotate(
+            budget_total=sub_activity_sum(estimated_cost_expression()),
+            funding_total=sub_activity_sum(total_funding_expression()),
+        ).annotate(
+            funding_gap_total=Greatest(
+                models.F('budget_total') - models.F('funding_total'),
+                models.Value(Decimal('0')),
+                output_field=models.DecimalField(max_digits=16, decimal_places=2)
+            )
+        )
+
+
 class MainActivity(models.Model):
     TARGET_TYPES = [
         ('cumulative', 'Cumulative'),
@@ -412,10 +585,12 @@ class MainActivity(models.Model):
         ('constant', 'Constant')
     ]
     
+    # Indexed by idx_mainactivity_init_org, which leads with the initiative
     initiative = models.ForeignKey(
         StrategicInitiative,
         on_delete=models.CASCADE,
-        related_name='main_activities'
+        related_name='main_activities',
+        db_index=False
     )
     name = models.CharField(max_length=255)
     weight = models.DecimalField(max_digits=5, decimal_places=2)
@@ -467,20 +642,35 @@ class MainActivity(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    objects = MainActivityQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='idx_mainactivity_created'),
+            # Organization-scoped main activities of initiatives (plan trees, weight totals)
+            models.Index(fields=['initiative', 'organization'], name='idx_mainactivity_init_org'),
+        ]
     
     @property
     def total_budget(self):
         """Calculate total budget from all sub-activities"""
+        if hasattr(self, 'budget_total'):
+            return self.budget_total
         return sum(sub.estimated_cost for sub in self.sub_activities.all())
     
     @property 
     def total_funding(self):
         """Calculate total funding from all sub-activities"""
+        if hasattr(self, 'funding_total'):
+            return self.funding_total
         return sum(sub.total_funding for sub in self.sub_activities.all())
     
     @property
     def funding_gap(self):
         """Calculate total funding gap from all sub-activities"""
+        if hasattr(self, 'funding_gap_total'):
+            return self.funding_gap_total
         return max(0, self.total_budget - self.total_funding)
     
     
@@ -611,6 +801,12 @@ class SubActivity(models.Model):
         verbose_name = "Sub Activity"
         verbose_name_plural = "Sub Activities"
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='idx_subactivity_created'),
+            # sub_activities of main activities, in Meta.ordering
+            models.Index(fields=['main_activity', 'created_at'], name='idx_subactivity_activity'),
+        ]
+
 class ActivityBudget(models.Model):
     BUDGET_CALCULATION_TYPES = [
         ('WITH_TOOL', 'With Tool'),
@@ -635,12 +831,13 @@ class ActivityBudget(models.Model):
         null=True,
         blank=True
     )
-    # Add reference field for tracking but not as foreign key to avoid constraints
-    sub_activity_id = models.CharField(
-        max_length=50,
+    # Budget of a sub-activity: indexed (unique) and deleted together with it
+    sub_activity = models.OneToOneField(
+        'SubActivity',
+        on_delete=models.CASCADE,
+        related_name='budget',
         null=True,
-        blank=True,
-        help_text="Reference to sub-activity ID for tracking purposes only"
+        blank=True
     )
     budget_calculation_type = models.CharField(
         max_length=20,
@@ -1077,6 +1274,15 @@ class Plan(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='idx_plan_created'),
+            # Plan.clean duplicate check, planner plan lists, dashboards
+            models.Index(fields=['organization', 'fiscal_year', 'status'], name='idx_plan_org_year_status'),
+            # Pending reviews and status/fiscal year filters across organizations
+            models.Index(fields=['status', 'fiscal_year'], name='idx_plan_status_year'),
+        ]
+
     def __str__(self):
         return f"{self.organization.name} - {self.strategic_objective} - {self.fiscal_year}"
         
@@ -1173,4 +1379,116 @@ class PlanReview(models.Model):
         super().save(*args, **kwargs)
     
     def __str__(self):
-        return f"Review of {self.plan} by {self.evaluator.user.username}" if self.evaluator else f"Review of {self.plan}"
\ No newline at end of file
+        return f"Review of {self.plan} by {self.evaluator.user.username}" if self.evaluator else f"Review of {self.plan}"
+
+class PlanBudgetSummary(models.Model):
+    """
+    Budget totals of one plan per initiative and activity type.
+
+    Kept current from signals on sub-activities, main activities and plans (see
+    plan_budget.py) so plan summaries and dashboards sum a few rows instead of walking
+    every sub-activity; ``rebuild_plan_budget_summaries`` reconciles it.
+    """
+    plan = models.ForeignKey(
+        Plan,
+        on_delete=models.CASCADE,
+        related_name='budget_summaries'
+    )
+    strategic_objective = models.ForeignKey(
+        StrategicObjective,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    initiative = models.ForeignKey(
+        StrategicInitiative,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    activity_type = models.CharField(max_length=20, choices=SubActivity.ACTIVITY_TYPES)
+    sub_activity_count = models.PositiveIntegerField(default=0)
+    total_budget = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    government_treasury = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    sdg_funding = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    partners_funding = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    other_funding = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    total_funding = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    funding_gap = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('plan', 'initiative', 'activity_type')
+
+    def __str__(self):
+        return f"Plan {self.plan_id} - initiative {self.initiative_id} - {self.activity_type}: ETB {self.total_budget}"
+
+
+class ImportJob(models.Model):
+    """
+    A bulk import queued from an upload and run by the ``run_import_worker`` command.
+
+    The worker commits every chunk together with its checkpoint (``chunks_completed``
+    and the counters), so a job picked up again after a crash resumes at the first
+    chunk that was not committed.
+    """
+    KINDS = [
+        ('SUB_ACTIVITIES', 'Sub-activities'),
+        ('PROCUREMENT_ITEMS', 'Procurement items')
+    ]
+
+    STATUSES = [
+        ('PENDING', 'Pending'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed')
+    ]
+
+    # Only the first messages are kept on the job; the counts are always exact
+    MAX_STORED_MESSAGES = 500
+
+    kind = models.CharField(max_length=20, choices=KINDS)
+    status = models.CharField(max_length=20, choices=STATUSES, default='PENDING')
+    file_path = models.CharField(max_length=500)
+    original_filename = models.CharField(max_length=255)
+    options = models.JSONField(default=dict, blank=True)
+    created_by = models.ForeignKey(
+        'auth.User',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='import_jobs'
+    )
+    chunks_completed = models.PositiveIntegerField(default=0)
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_imported = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    warning_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    warnings = models.JSONField(default=list, blank=True)
+    failure_reason = models.TextField(blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=255, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='idx_importjob_status'),
+        ]
+
+    def record_chunk(self, rows, imported, errors, warnings):
+        """Add one committed chunk to the checkpoint and counters"""
+        self.chunks_completed += 1
+        self.rows_processed += rows
+        self.rows_imported += imported
+        self.error_count += len(errors)
+        self.warning_count += len(warnings)
+        self.errors.extend(errors[:max(self.MAX_STORED_MESSAGES - len(self.errors), 0)])
+        self.warnings.extend(warnings[:max(self.MAX_STORED_MESSAGES - len(self.warnings), 0)])
+        self.heartbeat_at = timezone.now()
+
+    def __str__(self):
+        return f"{self.get_kind_display()} import #{self.pk} ({self.status})"
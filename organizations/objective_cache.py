@@ -0,0 +1,189 @@
+"""
+Cache of serialized objective trees (objective -> programs -> initiatives -> measures ->
+main activities -> sub-activities), one entry per objective and organization scope.
+
+Entries live in the Django cache (CACHES['default'], which every process shares) under
+keys that embed generation tokens:
+
+* a global token, bumped when organizations or initiative feeds change (their names
+  are part of the tree);
+* one token per objective, bumped when the objective, its programs or initiatives,
+  or its default (organization-less) measures and activities change;
+* one token per objective and organization, bumped when that organization's measures,
+  main activities or sub-activities under the objective change. Changes of any
+  organization also bump the objective's ``all`` token used by unscoped readers.
+
+Bumping a token orphans the old entries, which then expire on their own. Tokens are
+random rather than counters so that an evicted token can never bring back an older
+entry. Signals mark the touched keys; the tokens are bumped once the transaction
+commits. Bulk writers that skip signals call ``invalidate_main_activities``.
+"""
+import threading
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from .models import Program, StrategicInitiative, MainActivity
+from .plan_tree import objective_tree_queryset
+from .serializers import StrategicObjectiveSerializer
+
+KEY_PREFIX = 'objective_tree'
+GLOBAL = 'global'
+ALL_ORGANIZATIONS = 'all'
+
+_pending = threading.local()
+
+
+def _cache_timeout():
+    return getattr(settings, 'OBJECTIVE_TREE_CACHE_TIMEOUT', 3600)
+
+
+def _token_key(*parts):
+    return ':'.join([KEY_PREFIX, 'gen'] + [str(part) for part in parts])
+
+
+def _scope_label(organization_ids):
+    return ALL_ORGANIZATIONS if organization_ids is None else ','.join(str(org_id) for org_id in sorted(organization_ids))
+
+
+def _entry_keys(objective_ids, organization_ids):
+    """objective_id -> cache key of its tree for this scope, at the current tokens"""
+    scope_parts = [ALL_ORGANIZATIONS] if organization_ids is None else sorted(organization_ids)
+    token_keys = {_token_key(GLOBAL)}
+    for objective_id in objective_ids:
+        token_keys.add(_token_key(objective_id))
+        token_keys.update(_token_key(objective_id, part) for part in scope_parts)
+
+    tokens = cache.get_many(token_keys)
+    missing = {key: uuid.uuid4().hex for key in token_keys if key not in tokens}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        tokens.update(missing)
+
+    scope = _scope_label(organization_ids)
+    keys = {}
+    for objective_id in objective_ids:
+        parts = [tokens[_token_key(GLOBAL)], tokens[_token_key(objective_id)]]
+        parts += [tokens[_token_key(objective_id, part)] for part in scope_parts]
+        keys[objective_id] = f"{KEY_PREFIX}:{objective_id}:{scope}:{'.'.join(parts)}"
+    return keys
+
+
+def tree_version(objective_ids):
+    """
+    Current tokens of the unscoped trees of these objectives: they change whenever
+    anything in the trees changes, whichever organization it belongs to
+    """
+    keys = _entry_keys(set(objective_ids), None)
+    return ';'.join(keys[objective_id] for objective_id in sorted(keys))
+
+
+def get_objective_trees(objectives, organization_ids):
+    """
+    Serialized trees of the given objectives (instances or IDs, order kept) as seen by
+    ``organization_ids`` (None: unscoped). Missing entries are built with one
+    prefetched queryset and stored.
+    """
+    objective_ids = [getattr(objective, 'pk', objective) for objective in objectives]
+    keys = _entry_keys(set(objective_ids), organization_ids)
+    cached = cache.get_many(list(keys.values()))
+
+    missing = [objective_id for objective_id in keys if keys[objective_id] not in cached]
+    if missing:
+        fresh = list(objective_tree_queryset(organization_ids).filter(pk__in=missing))
+        # No request in the context: the trees depend on the scope alone
+        data = StrategicObjectiveSerializer(fresh, many=True).data
+        built = {keys[objective.pk]: tree for objective, tree in zip(fresh, data)}
+        cache.set_many(built, timeout=_cache_timeout())
+        cached.update(built)
+
+    return [cached[keys[objective_id]] for objective_id in objective_ids if keys[objective_id] in cached]
+
+
+def _flush():
+    keys = getattr(_pending, 'keys', set())
+    main_activity_ids = getattr(_pending, 'main_activity_ids', set())
+    _pending.keys = set()
+    _pending.main_activity_ids = set()
+    if main_activity_ids:
+        activities = MainActivity.objects.filter(id__in=main_activity_ids).values_list('initiative_id', 'organization_id')
+        keys |= initiative_keys(activities)
+    if not keys:
+        return
+
+    token_keys = set()
+    for objective_id, organization_id in keys:
+        if objective_id == GLOBAL:
+            token_keys.add(_token_key(GLOBAL))
+        elif organization_id is None:
+            token_keys.add(_token_key(objective_id))
+        else:
+            token_keys.add(_token_key(objective_id, organization_id))
+            token_keys.add(_token_key(objective_id, ALL_ORGANIZATIONS))
+    cache.set_many({key: uuid.uuid4().hex for key in token_keys}, timeout=None)
+
+
+def _is_pending():
+    return bool(getattr(_pending, 'keys', None) or getattr(_pending, 'main_activity_ids', None))
+
+
+def _schedule(was_pending):
+    """
+    Register ``_flush`` when the pending sets fill up, not on every mark: a cascading delete
+    marks every row it removes. Sets left over from a rolled back transaction lost their
+    callback with it, so they are registered again unless a ``_flush`` is still queued.
+    """
+    if was_pending:
+        connection = transaction.get_connection()
+        if connection.in_atomic_block and any(entry[1] is _flush for entry in connection.run_on_commit):
+            return
+    transaction.on_commit(_flush)
+
+
+def mark_changed(keys):
+    """Invalidate the given (objective_id, organization_id or None) trees once the transaction commits"""
+    was_pending = _is_pending()
+    if not hasattr(_pending, 'keys'):
+        _pending.keys = set()
+    _pending.keys.update(keys)
+    _schedule(was_pending)
+
+
+def mark_all_changed():
+    """Invalidate every tree, e.g. after an organization was renamed"""
+    mark_changed({(GLOBAL, None)})
+
+
+def invalidate_main_activities(main_activity_ids):
+    """Invalidate the trees holding these main activities, e.g. after a bulk write"""
+    was_pending = _is_pending()
+    if not hasattr(_pending, 'main_activity_ids'):
+        _pending.main_activity_ids = set()
+    _pending.main_activity_ids.update(main_activity_ids)
+    _schedule(was_pending)
+
+
+def initiative_keys(pairs):
+    """Tree keys for (initiative_id, organization_id) pairs"""
+    pairs = set(pairs)
+    objectives = dict(
+        StrategicInitiative.objects.filter(id__in={initiative_id for initiative_id, _ in pairs}).annotate(
+            objective_id=Coalesce('strategic_objective_id', 'program__strategic_objective_id')
+        ).values_list('id', 'objective_id')
+    )
+    return {
+        (objectives[initiative_id], organization_id)
+        for initiative_id, organization_id in pairs
+        if objectives.get(initiative_id)
+    }
+
+
+def initiative_objective_ids(initiative):
+    """Objectives an initiative appears under, read from its own fields (works after a delete)"""
+    objective_ids = {initiative.strategic_objective_id}
+    if initiative.program_id:
+        objective_ids.update(
+            Program.objects.filter(pk=initiative.program_id).values_list('strategic_objective_id', flat=True)
+        )
+    return {objective_id for objective_id in objective_ids if objective_id}
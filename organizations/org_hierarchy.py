@@ -0,0 +1,111 @@
+"""
+Maintenance of the OrganizationClosure table.
+
+Inserting an organization copies its parent's ancestor rows; moving one replaces the
+rows that link its subtree to the old ancestors with rows to the new ones; deleting
+one detaches its subtree (children get ``parent = NULL``). The hierarchy is small and
+changes rarely, so each operation reads the affected rows and writes them in bulk.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from .models import Organization, OrganizationClosure
+
+
+def _ancestors(organization_id):
+    """(ancestor_id, depth) pairs of an organization, itself included"""
+    return list(
+        OrganizationClosure.objects.filter(descendant_id=organization_id).values_list('ancestor_id', 'depth')
+    )
+
+
+def _subtree(organization_id):
+    """(descendant_id, depth) pairs below an organization, itself included"""
+    return list(
+        OrganizationClosure.objects.filter(ancestor_id=organization_id).values_list('descendant_id', 'depth')
+    )
+
+
+def validate_parent(organization, parent_id):
+    """Reject a parent that is the organization itself or one of its descendants"""
+    if organization.pk is None or parent_id is None:
+        return
+    if OrganizationClosure.objects.filter(ancestor_id=organization.pk, descendant_id=parent_id).exists():
+        raise ValidationError('An organization cannot be placed under itself or one of its descendants')
+
+
+def insert_node(organization):
+    """Add the rows of a new organization"""
+    rows = [OrganizationClosure(ancestor_id=organization.pk, descendant_id=organization.pk, depth=0)]
+    if organization.parent_id:
+        rows += [
+            OrganizationClosure(ancestor_id=ancestor_id, descendant_id=organization.pk, depth=depth + 1)
+            for ancestor_id, depth in _ancestors(organization.parent_id)
+        ]
+    OrganizationClosure.objects.bulk_create(rows)
+
+
+def _detach(subtree_ids):
+    """Drop the rows linking a subtree to ancestors outside it"""
+    OrganizationClosure.objects.filter(descendant_id__in=subtree_ids).exclude(
+        ancestor_id__in=subtree_ids
+    ).delete()
+
+
+def move_node(organization):
+    """Re-link an organization and its subtree after its parent changed"""
+    subtree = _subtree(organization.pk)
+    subtree_ids = [descendant_id for descendant_id, _ in subtree]
+    with transaction.atomic():
+        _detach(subtree_ids)
+        if organization.parent_id:
+            OrganizationClosure.objects.bulk_create([
+                OrganizationClosure(
+                    ancestor_id=ancestor_id,
+                    descendant_id=descendant_id,
+                    depth=ancestor_depth + descendant_depth + 1
+                )
+                for ancestor_id, ancestor_depth in _ancestors(organization.parent_id)
+                for descendant_id, descendant_depth in subtree
+            ])
+
+
+def detach_children(organization):
+    """Before an organization is deleted, cut its children's subtrees loose from its ancestors"""
+    subtree_ids = [
+        descendant_id for descendant_id, depth in _subtree(organization.pk) if depth > 0
+    ]
+    if subtree_ids:
+        _detach(subtree_ids)
+
+
+def build_closure_rows(parents):
+    """Closure rows for a {organization_id: parent_id} mapping; cycles are cut"""
+    rows = []
+    for organization_id in parents:
+        ancestor_id, depth, seen = organization_id, 0, set()
+        while ancestor_id is not None and ancestor_id in parents and ancestor_id not in seen:
+            seen.add(ancestor_id)
+            rows.append((ancestor_id, organization_id, depth))
+            ancestor_id, depth = parents[ancestor_id], depth + 1
+    return rows
+
+
+def rebuild_closure(dry_run=False):
+    """
+    Recompute the whole table from the parent links; returns the number of rows that
+    were missing and the number that were stale
+    """
+    parents = dict(Organization.objects.values_list('id', 'parent_id'))
+    expected = set(build_closure_rows(parents))
+    current = set(OrganizationClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+    missing = expected - current
+    stale = current - expected
+
+    if not dry_run and (missing or stale):
+        with transaction.atomic():
+            OrganizationClosure.objects.all().delete()
+            OrganizationClosure.objects.bulk_create([
+                OrganizationClosure(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=depth)
+                for ancestor_id, descendant_id, depth in expected
+            ], batch_size=1000)
+    return {'missing': len(missing), 'stale': len(stale), 'rows': len(expected), 'dry_run': dry_run}
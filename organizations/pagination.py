@@ -0,0 +1,28 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class OptInCursorPagination(CursorPagination):
+    """
+    Keyset pagination ordered by (created_at, id).
+
+    Existing clients keep getting plain lists; a page is only returned when the request
+    asks for one with ``?paginate=cursor`` (or follows a ``next``/``previous`` link,
+    which carries ``cursor``). ``?page_size=`` overrides the configured API_PAGE_SIZE.
+    """
+    ordering = ('created_at', 'id')
+    page_size = getattr(settings, 'API_PAGE_SIZE', 100)
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    opt_in_query_param = 'paginate'
+
+    def is_requested(self, request):
+        return (
+            request.query_params.get(self.opt_in_query_param) == 'cursor' or
+            self.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+        return super().paginate_queryset(queryset, request, view)
@@ -0,0 +1,227 @@
+"""
+Maintenance of the PlanBudgetSummary table.
+
+A plan's budget is the sub-activities of its organization (plus default activities)
+under initiatives of the plan's objectives. Signals mark the touched
+(organization, initiative) pairs or plans as dirty; once the transaction commits the
+affected rows are recomputed from the sub-activities, one GROUP BY per plan, so the
+table never accumulates drift from missed deltas. Bulk writers that skip signals
+(bulk_create, bulk_update) call ``mark_main_activities_dirty`` themselves.
+"""
+import threading
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from .dashboard import FUNDING_SOURCES, budget_aggregates, summary_aggregates
+from .models import (
+    Plan, PlanBudgetSummary, MainActivity, StrategicInitiative, SubActivity,
+    organization_scope_q
+)
+
+SUMMARY_FIELDS = ['total_budget'] + FUNDING_SOURCES + ['total_funding', 'funding_gap']
+
+_pending = threading.local()
+
+
+def plan_objective_ids(plan):
+    """The plan's selected objectives, or its single strategic objective when none were selected"""
+    selected = list(plan.selected_objectives.values_list('id', flat=True))
+    return selected or [plan.strategic_objective_id]
+
+
+def compute_plan_rows(plan, initiative_ids=None):
+    """Fresh PlanBudgetSummary rows (unsaved) for a plan, optionally for some initiatives only"""
+    objective_ids = plan_objective_ids(plan)
+    sub_activities = SubActivity.objects.filter(
+        organization_scope_q([plan.organization_id], 'main_activity__'),
+        Q(main_activity__initiative__strategic_objective_id__in=objective_ids) |
+        Q(main_activity__initiative__program__strategic_objective_id__in=objective_ids)
+    )
+    if initiative_ids is not None:
+        sub_activities = sub_activities.filter(main_activity__initiative_id__in=initiative_ids)
+
+    grouped = sub_activities.order_by().values(
+        'main_activity__initiative_id', 'activity_type'
+    ).annotate(
+        objective_id=Coalesce(
+            'main_activity__initiative__strategic_objective_id',
+            'main_activity__initiative__program__strategic_objective_id'
+        ),
+        **budget_aggregates()
+    )
+    return [
+        PlanBudgetSummary(
+            plan=plan,
+            strategic_objective_id=row['objective_id'],
+            initiative_id=row['main_activity__initiative_id'],
+            activity_type=row['activity_type'],
+            sub_activity_count=row['sub_activity_count'],
+            **{field: row[field] for field in SUMMARY_FIELDS}
+        )
+        for row in grouped
+    ]
+
+
+def _row_key(row):
+    return (row.initiative_id, row.activity_type)
+
+
+def _row_values(row):
+    return (
+        row.strategic_objective_id, row.sub_activity_count,
+        *(Decimal(getattr(row, field)).quantize(Decimal('0.01')) for field in SUMMARY_FIELDS)
+    )
+
+
+def refresh_plan_summary(plan, initiative_ids=None, dry_run=False):
+    """
+    Replace the plan's summary rows (or those of some initiatives) with fresh ones.
+    Returns True when the stored rows were out of date.
+    """
+    rows = compute_plan_rows(plan, initiative_ids)
+    stored = PlanBudgetSummary.objects.filter(plan=plan)
+    if initiative_ids is not None:
+        stored = stored.filter(initiative_id__in=initiative_ids)
+
+    current = {_row_key(row): _row_values(row) for row in stored}
+    fresh = {_row_key(row): _row_values(row) for row in rows}
+    if current == fresh:
+        return False
+    if not dry_run:
+        with transaction.atomic():
+            stored.delete()
+            PlanBudgetSummary.objects.bulk_create(rows)
+    return True
+
+
+def refresh_initiatives(keys):
+    """Recompute the rows of every plan affected by the given (organization_id, initiative_id) pairs"""
+    initiative_ids = {initiative_id for _, initiative_id in keys}
+    objectives = dict(
+        StrategicInitiative.objects.filter(id__in=initiative_ids).annotate(
+            objective_id=Coalesce('strategic_objective_id', 'program__strategic_objective_id')
+        ).values_list('id', 'objective_id')
+    )
+    objective_ids = {objective_id for objective_id in objectives.values() if objective_id}
+    if not objective_ids:
+        return
+
+    plans = Plan.objects.filter(
+        Q(selected_objectives__in=objective_ids) | Q(strategic_objective_id__in=objective_ids)
+    ).distinct()
+    # Default activities (no organization) belong to every organization's plans
+    organization_ids = {organization_id for organization_id, _ in keys}
+    if None not in organization_ids:
+        plans = plans.filter(organization_id__in=organization_ids)
+
+    for plan in plans:
+        affected = [
+            initiative_id for organization_id, initiative_id in keys
+            if initiative_id in objectives and organization_id in (None, plan.organization_id)
+        ]
+        if affected:
+            refresh_plan_summary(plan, affected)
+
+
+def _flush():
+    keys = getattr(_pending, 'keys', set())
+    main_activity_ids = getattr(_pending, 'main_activity_ids', set())
+    plan_ids = getattr(_pending, 'plan_ids', set())
+    _pending.keys = set()
+    _pending.main_activity_ids = set()
+    _pending.plan_ids = set()
+    if main_activity_ids:
+        # Deleted main activities are gone here; their own post_delete marked them
+        keys |= set(
+            MainActivity.objects.filter(id__in=main_activity_ids).values_list(
+                'organization_id', 'initiative_id'
+            ).distinct()
+        )
+    if keys:
+        refresh_initiatives(keys)
+    for plan in Plan.objects.filter(id__in=plan_ids):
+        refresh_plan_summary(plan)
+
+
+def _is_pending():
+    return any(getattr(_pending, name, None) for name in ('keys', 'main_activity_ids', 'plan_ids'))
+
+
+def _schedule(was_pending):
+    # One callback drains the pending sets, so only the first mark of a transaction
+    # registers it. Keys left behind by a rolled back transaction lost their callback
+    # and are registered again with the next mark, unless a _flush is still queued.
+    if was_pending:
+        connection = transaction.get_connection()
+        if connection.in_atomic_block and any(entry[1] is _flush for entry in connection.run_on_commit):
+            return
+    transaction.on_commit(_flush)
+
+
+def mark_dirty(organization_id, initiative_id):
+    """Refresh the plans holding this initiative once the current transaction commits"""
+    was_pending = _is_pending()
+    if not hasattr(_pending, 'keys'):
+        _pending.keys = set()
+    _pending.keys.add((organization_id, initiative_id))
+    _schedule(was_pending)
+
+
+def mark_plan_dirty(plan_id):
+    """Rebuild all rows of a plan once the current transaction commits"""
+    was_pending = _is_pending()
+    if not hasattr(_pending, 'plan_ids'):
+        _pending.plan_ids = set()
+    _pending.plan_ids.add(plan_id)
+    _schedule(was_pending)
+
+
+def mark_main_activities_dirty(main_activity_ids):
+    """Refresh the plans holding these main activities, e.g. after a bulk write"""
+    was_pending = _is_pending()
+    if not hasattr(_pending, 'main_activity_ids'):
+        _pending.main_activity_ids = set()
+    _pending.main_activity_ids.update(main_activity_ids)
+    _schedule(was_pending)
+
+
+def rebuild_plan_summaries(plans=None, dry_run=False, progress=None):
+    """Reconcile the summary rows of the given plans (all by default); returns counts"""
+    if plans is None:
+        plans = Plan.objects.all()
+    summary = {'plans': 0, 'out_of_date': 0, 'dry_run': dry_run}
+    for plan in plans.order_by('id').iterator(chunk_size=200):
+        summary['plans'] += 1
+        if refresh_plan_summary(plan, dry_run=dry_run):
+            summary['out_of_date'] += 1
+            if progress:
+                progress(plan)
+    return summary
+
+
+def plan_budget_summary(plan):
+    """Totals of a plan overall, by funding source, objective, initiative and activity type"""
+    rows = PlanBudgetSummary.objects.filter(plan=plan).order_by()
+    aggregates = summary_aggregates()
+
+    totals = rows.aggregate(**aggregates)
+    by_objective = list(
+        rows.values('strategic_objective_id', 'strategic_objective__title')
+        .annotate(**aggregates).order_by('strategic_objective_id')
+    )
+    by_initiative = list(
+        rows.values('strategic_objective_id', 'initiative_id', 'initiative__name')
+        .annotate(**aggregates).order_by('initiative_id')
+    )
+    by_activity_type = list(
+        rows.values('activity_type').annotate(**aggregates).order_by('activity_type')
+    )
+    return {
+        'plan': plan.id,
+        'totals': totals,
+        'funding_by_source': {source: totals[source] for source in FUNDING_SOURCES},
+        'by_objective': by_objective,
+        'by_initiative': by_initiative,
+        'by_activity_type': by_activity_type,
+    }
@@ -0,0 +1,233 @@
+"""
+"Strategic Plan" XLSX workbooks built on the server.
+
+The columns, headers and row layout follow ``processDataForExport`` / ``exportToExcel``
+in ``src/lib/utils/export.ts``: one row per performance measure and main activity,
+with the objective and initiative cells filled only on their first row. Plans are
+loaded one at a time with ``load_plan_tree`` and their rows written to an openpyxl
+write-only workbook, which keeps rows on disk instead of in memory, so the cost of an
+export grows with the largest plan rather than with the number of plans.
+"""
+import tempfile
+from .plan_tree import load_plan_tree
+
+TABLE_HEADERS_EN = [
+    'No.', 'Strategic Objective', 'Strategic Objective Weight', 'Strategic Initiative',
+    'Initiative Weight', 'Performance Measure/Main Activity', 'Weight', 'Baseline',
+    'Jul', 'Aug', 'Sep', 'Q1 Target', 'Oct', 'Nov', 'Dec', 'Q2 Target', '6-Month Target',
+    'Jan', 'Feb', 'Mar', 'Q3 Target', 'Apr', 'May', 'Jun', 'Q4 Target', 'Annual Target',
+    'Implementor', 'Budget Required', 'Government', 'Partners', 'SDG', 'Other',
+    'Total Available', 'Gap',
+]
+
+TABLE_HEADERS_AM = [
+    'ተ.ቁ', 'ስትራቴጂክ ዓላማ', 'የስትራቴጂክ ዓላማ ክብደት', 'ስትራቴጂክ ተነሳሽነት',
+    'የተነሳሽነት ክብደት', 'የአፈጻጸም መለኪያ/ዋና እንቅስቃሴ', 'ክብደት', 'መነሻ',
+    'ሐምሌ', 'ነሐሴ', 'መስከረም', 'የ1ኛ ሩብ ዓመት ዒላማ', 'ጥቅምት', 'ህዳር', 'ታህሳስ',
+    'የ2ኛ ሩብ ዓመት ዒላማ', '6 ወር ዒላማ', 'ጥር', 'የካቲት', 'መጋቢት', 'የ3ኛ ሩብ ዓመት ዒላማ',
+    'ሚያዝያ', 'ግንቦት', 'ሰኔ', 'የ4ኛ ሩብ ዓመት ዒላማ', 'የዓመት ዒላማ', 'ተግባሪ',
+    'የሚያስፈልግ በጀት', 'የመንግስት', 'አጋሮች', 'ኤስዲጂ', 'ሌላ', 'ጠቅላላ ያለ', 'ክፍተት',
+]
+
+COLUMN_WIDTHS = [
+    5, 25, 12, 25, 12, 30, 10, 15,
+    6, 6, 6, 12, 6, 6, 6, 12, 15,
+    6, 6, 6, 12, 6, 6, 6, 12, 15,
+    20, 15, 12, 12, 12, 12, 15, 12,
+]
+
+# Budget Required .. Gap, written as numbers in currency format
+CURRENCY_COLUMNS = range(27, 34)
+CURRENCY_FORMAT = '"$"#,##0.##'
+
+DEFAULT_IMPLEMENTOR = 'Ministry of Health'
+
+# Month -> (quarter, spellings accepted in selected_months)
+MONTHS = [
+    ('JUL', 'Q1', ('jul', 'july')), ('AUG', 'Q1', ('aug', 'august')), ('SEP', 'Q1', ('sep', 'september')),
+    ('OCT', 'Q2', ('oct', 'october')), ('NOV', 'Q2', ('nov', 'november')), ('DEC', 'Q2', ('dec', 'december')),
+    ('JAN', 'Q3', ('jan', 'january')), ('FEB', 'Q3', ('feb', 'february')), ('MAR', 'Q3', ('mar', 'march')),
+    ('APR', 'Q4', ('apr', 'april')), ('MAY', 'Q4', ('may',)), ('JUN', 'Q4', ('jun', 'june')),
+]
+
+CHECK = '✓'
+
+# load_plan_tree arguments for the exports: budget totals per funding source, no sub-activities
+TREE_CHILDREN = {'sub_activities': False, 'funding_sources': True}
+
+
+def _number(value):
+    """Weights as the browser printed them: 25 rather than 25.0, decimals kept as stored"""
+    if value is None:
+        return 0
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _percent(value):
+    return f'{_number(value)}%'
+
+
+def _month_ticks(item, quarter):
+    """The three month cells of a quarter: a tick where the item is scheduled"""
+    quarters = item.selected_quarters or []
+    months = {str(month).lower() for month in (item.selected_months or [])}
+    return [
+        CHECK if in_quarter in quarters or months.intersection(spellings) else ''
+        for _, in_quarter, spellings in MONTHS
+        if in_quarter == quarter
+    ]
+
+
+def _six_month_target(item):
+    if item.target_type == 'cumulative':
+        return (item.q1_target or 0) + (item.q2_target or 0)
+    return item.q2_target or 0
+
+
+def _item_cells(item, label):
+    """Columns from 'Performance Measure/Main Activity' through 'Annual Target'"""
+    return (
+        [f'{label}: {item.name}', _percent(item.weight), item.baseline or '-']
+        + _month_ticks(item, 'Q1') + [item.q1_target or 0]
+        + _month_ticks(item, 'Q2') + [item.q2_target or 0, _six_month_target(item)]
+        + _month_ticks(item, 'Q3') + [item.q3_target or 0]
+        + _month_ticks(item, 'Q4') + [item.q4_target or 0, item.annual_target or 0]
+    )
+
+
+def _empty_item_cells():
+    return ['-', '-', '-'] + ['', '', '', '-'] * 2 + ['-'] + ['', '', '', '-'] * 2 + ['-']
+
+
+def _activity_budget(activity):
+    """(required, government, partners, sdg, other, total available, gap) summed in the database"""
+    return [
+        activity.budget_total, activity.government_total, activity.partners_total, activity.sdg_total,
+        activity.other_total, activity.funding_total, activity.funding_gap_total,
+    ]
+
+
+def _objective_weight(plan, objective):
+    """The weight the planner chose for the objective in this plan"""
+    weights = plan.selected_objectives_weights or {}
+    weight = weights.get(str(objective.id))
+    if weight is None:
+        weight = objective.get_effective_weight()
+    return _number(float(weight) if weight is not None else 0)
+
+
+def _plan_initiatives(plan, objective):
+    """The objective's initiatives shown to the plan's organization"""
+    return [
+        initiative for initiative in objective.initiatives.all()
+        if initiative.is_default or not initiative.organization_id or initiative.organization_id == plan.organization_id
+    ]
+
+
+def plan_rows(plan):
+    """The data rows of a plan whose tree was loaded with ``load_plan_tree(plan, **TREE_CHILDREN)``"""
+    no_budget = [0] * 7
+    for index, objective in enumerate(plan.tree_objectives, start=1):
+        objective_cells = [index, objective.title or 'Untitled Objective', f'{_objective_weight(plan, objective)}%']
+        blank_objective = ['', '', '']
+
+        initiatives = _plan_initiatives(plan, objective)
+        if not initiatives:
+            yield objective_cells + ['-', '-'] + _empty_item_cells() + [DEFAULT_IMPLEMENTOR] + no_budget
+            continue
+
+        objective_added = False
+        for initiative in initiatives:
+            initiative_cells = [initiative.name or 'Untitled Initiative', _percent(initiative.weight)]
+            implementor = initiative.organization.name if initiative.organization_id else None
+            measures = initiative.scoped_performance_measures
+            activities = initiative.scoped_main_activities
+
+            if not measures and not activities:
+                yield (
+                    (blank_objective if objective_added else objective_cells) + initiative_cells
+                    + _empty_item_cells() + [implementor or DEFAULT_IMPLEMENTOR] + no_budget
+                )
+                objective_added = True
+                continue
+
+            initiative_added = False
+            items = [(measure, 'PM') for measure in measures] + [(activity, 'MA') for activity in activities]
+            for item, label in items:
+                budget = _activity_budget(item) if label == 'MA' else no_budget
+                if label == 'MA':
+                    item_implementor = implementor or DEFAULT_IMPLEMENTOR
+                else:
+                    item_implementor = implementor or '-'
+                yield (
+                    (blank_objective if objective_added else objective_cells)
+                    + (['', ''] if initiative_added else initiative_cells)
+                    + _item_cells(item, label) + [item_implementor] + budget
+                )
+                objective_added = True
+                initiative_added = True
+
+
+def _sheet_title(plan, used):
+    """A unique worksheet name within Excel's 31 characters and character rules"""
+    name = ''.join(' ' if char in '[]:*?/\\' else char for char in plan.organization.name)
+    title = f'{name[:22].strip()} #{plan.id}'
+    while title in used:
+        title = f'{title[:28]}~{len(used)}'
+    used.add(title)
+    return title
+
+
+def _write_plan(workbook, plan, title, language):
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+
+    sheet = workbook.create_sheet(title=title)
+    for position, width in enumerate(COLUMN_WIDTHS, start=1):
+        sheet.column_dimensions[get_column_letter(position)].width = width
+
+    sheet.append(['Organization:', plan.organization.name])
+    sheet.append(['Planner:', plan.planner_name or ''])
+    sheet.append(['Plan Type:', plan.type or ''])
+    sheet.append(['From Date:', plan.from_date.isoformat() if plan.from_date else ''])
+    sheet.append(['To Date:', plan.to_date.isoformat() if plan.to_date else ''])
+    sheet.append([])
+    sheet.append(TABLE_HEADERS_AM if language == 'am' else TABLE_HEADERS_EN)
+
+    for row in plan_rows(plan):
+        for column in CURRENCY_COLUMNS:
+            cell = WriteOnlyCell(sheet, value=row[column])
+            cell.number_format = CURRENCY_FORMAT
+            row[column] = cell
+        sheet.append(row)
+
+
+def write_plans_workbook(plans, language='en'):
+    """
+    Write one "Strategic Plan" sheet per plan (a list, with organizations selected)
+    and return the workbook as an open temporary file positioned at 0
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    used_titles = set()
+    single = len(plans) == 1
+    for plan in plans:
+        load_plan_tree(plan, **TREE_CHILDREN)
+        title = 'Strategic Plan' if single else _sheet_title(plan, used_titles)
+        _write_plan(workbook, plan, title, language)
+        # Drop the tree before loading the next plan
+        plan.tree_objectives = []
+
+    if not plans:
+        workbook.create_sheet(title='Strategic Plan').append(
+            TABLE_HEADERS_AM if language == 'am' else TABLE_HEADERS_EN
+        )
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
+
@@ -0,0 +1,249 @@
+"""
+Plan summaries rendered to PDF on the server and kept in a file-system cache.
+
+A rendered file is named after the plan and its content version, a hash of the plan's
+``updated_at`` and of MAX(updated_at)/COUNT of every table in its tree (objectives,
+initiatives, and the measures, main activities and sub-activities of the plan's
+organization). Any change to the plan produces a new name, so a cached file is never
+stale; older versions of a plan are removed when a new one is written, and the least
+recently downloaded files are evicted once PLAN_PDF_CACHE_MAX_BYTES or
+PLAN_PDF_CACHE_MAX_FILES is exceeded.
+
+Rendering runs in a small thread pool (PLAN_PDF_WORKERS) rather than on the request
+thread; concurrent requests for the same version share one render, and a request
+waits at most PLAN_PDF_WAIT_SECONDS before being told to come back.
+"""
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from decimal import Decimal
+from xml.sax.saxutils import escape
+from django.conf import settings
+from django.db import close_old_connections, connection
+from .conditional import table_state
+from .models import (
+    Plan, StrategicObjective, StrategicInitiative, PerformanceMeasure, MainActivity,
+    SubActivity, organization_scope_q
+)
+from .plan_budget import plan_objective_ids
+from .plan_export import TABLE_HEADERS_EN, CURRENCY_COLUMNS, CHECK, TREE_CHILDREN, plan_rows
+from .plan_tree import load_plan_tree
+
+logger = logging.getLogger(__name__)
+
+# Part of every content version: bump it when the layout changes to re-render cached files
+LAYOUT_VERSION = 1
+
+# Column widths in points, as in exportToPDF
+COLUMN_WIDTHS = [
+    25, 60, 35, 60, 35, 70, 30, 40,
+    20, 20, 20, 30, 20, 20, 20, 30, 30,
+    20, 20, 20, 30, 20, 20, 20, 30, 30,
+    50, 40, 35, 35, 35, 35, 40, 35,
+]
+# Free-text columns that wrap instead of overflowing
+WRAPPED_COLUMNS = {1, 3, 5, 26}
+HEADER_COLOR = (41 / 255, 128 / 255, 185 / 255)
+
+_lock = threading.Lock()
+_executor = None
+_in_flight = {}
+
+
+def _cache_dir():
+    path = getattr(settings, 'PLAN_PDF_CACHE_DIR', os.path.join(settings.BASE_DIR, 'plan_pdf_cache'))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def content_version(plan):
+    """Hash of everything the rendered PDF shows; one aggregate query per table"""
+    objective_ids = plan_objective_ids(plan)
+    scope = organization_scope_q([plan.organization_id])
+    initiatives = StrategicInitiative.objects.filter(strategic_objective_id__in=objective_ids)
+    activities = MainActivity.objects.filter(scope, initiative__in=initiatives)
+    states = [
+        table_state(StrategicObjective.objects.filter(pk__in=objective_ids)),
+        table_state(initiatives),
+        table_state(PerformanceMeasure.objects.filter(scope, initiative__in=initiatives)),
+        table_state(activities),
+        table_state(SubActivity.objects.filter(main_activity__in=activities)),
+    ]
+    key = '|'.join(
+        [str(LAYOUT_VERSION), str(plan.pk), plan.updated_at.isoformat(), plan.organization.name]
+        + [f'{latest}:{count}' for latest, count in states]
+    )
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+
+def _cached_path(plan_id, version):
+    return os.path.join(_cache_dir(), f'plan-{plan_id}-{version}.pdf')
+
+
+def _evict(keep):
+    """Drop older versions of ``keep``'s plan, then the least recently used files over the limits"""
+    directory = os.path.dirname(keep)
+    plan_prefix = os.path.basename(keep).rsplit('-', 1)[0] + '-'
+    max_bytes = getattr(settings, 'PLAN_PDF_CACHE_MAX_BYTES', 500 * 1024 * 1024)
+    max_files = getattr(settings, 'PLAN_PDF_CACHE_MAX_FILES', 2000)
+
+    entries = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if not name.endswith('.pdf') or path == keep:
+            continue
+        try:
+            if name.startswith(plan_prefix):
+                os.remove(path)
+                continue
+            stat = os.stat(path)
+        except FileNotFoundError:
+            # Removed by another process
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries) + os.path.getsize(keep)
+    count = len(entries) + 1
+    for _, size, path in sorted(entries):
+        if total <= max_bytes and count <= max_files:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        count -= 1
+
+
+def _format(value, column):
+    if column in CURRENCY_COLUMNS:
+        number = Decimal(value) if not isinstance(value, str) else Decimal('0')
+        return f'${number.quantize(Decimal("0.001")).normalize():,f}'
+    if isinstance(value, Decimal):
+        return f'{value.normalize():f}' if value else ''
+    if value == 0:
+        return ''
+    return str(value)
+
+
+def render_plan_pdf(plan, output):
+    """Write the "Strategic Plan Export" of a plan loaded with ``load_plan_tree(plan, **TREE_CHILDREN)`` to a path or file"""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A3, landscape
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    cell_style = ParagraphStyle('cell', fontName='Helvetica', fontSize=7, leading=8)
+    header_style = ParagraphStyle('header', parent=cell_style, fontName='Helvetica-Bold', textColor=colors.white, alignment=1)
+    # Helvetica has no check mark; ZapfDingbats '4' is one
+    tick = Paragraph('<font name="ZapfDingbats">4</font>', ParagraphStyle('tick', parent=cell_style, alignment=1))
+
+    def cell(value, column):
+        if value == CHECK:
+            return tick
+        text = _format(value, column)
+        return Paragraph(escape(text), cell_style) if column in WRAPPED_COLUMNS else text
+
+    story = [Paragraph('Strategic Plan Export', styles['Title'])]
+    for label, value in [
+        ('Organization', plan.organization.name),
+        ('Planner', plan.planner_name),
+        ('Plan Type', plan.type),
+        ('Period', f'{plan.from_date} - {plan.to_date}'),
+    ]:
+        story.append(Paragraph(f'{label}: {escape(str(value or ""))}', styles['Normal']))
+    story.append(Spacer(1, 10))
+
+    data = [[Paragraph(escape(header), header_style) for header in TABLE_HEADERS_EN]]
+    data += [[cell(value, column) for column, value in enumerate(row)] for row in plan_rows(plan)]
+
+    table = Table(data, colWidths=COLUMN_WIDTHS, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('FONT', (0, 0), (-1, -1), 'Helvetica', 7),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.Color(*HEADER_COLOR)),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
+        ('ALIGN', (1, 1), (1, -1), 'LEFT'),
+        ('ALIGN', (3, 1), (3, -1), 'LEFT'),
+        ('ALIGN', (5, 1), (5, -1), 'LEFT'),
+        ('ALIGN', (26, 1), (26, -1), 'LEFT'),
+        ('ALIGN', (CURRENCY_COLUMNS[0], 1), (-1, -1), 'RIGHT'),
+    ]))
+    story.append(table)
+
+    document = SimpleDocTemplate(
+        output, pagesize=landscape(A3), title=f'Plan {plan.pk}',
+        leftMargin=40, rightMargin=40, topMargin=40, bottomMargin=40,
+    )
+    document.build(story)
+
+
+def _render(plan_id, path):
+    """Worker task: load the plan's tree and write its PDF to ``path``"""
+    close_old_connections()
+    try:
+        plan = load_plan_tree(Plan.objects.select_related('organization').get(pk=plan_id), **TREE_CHILDREN)
+        partial = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            render_plan_pdf(plan, partial)
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        _evict(path)
+        logger.info('Rendered plan %s to %s', plan_id, path)
+        return path
+    finally:
+        # Worker threads outlive the request cycle that normally closes connections
+        connection.close()
+
+
+def _executor_instance():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'PLAN_PDF_WORKERS', 2), thread_name_prefix='plan-pdf'
+        )
+    return _executor
+
+
+def _submit(plan_id, path):
+    """The pending render of ``path``, started unless one is already running"""
+    with _lock:
+        future = _in_flight.get(path)
+        if future is None:
+            future = _executor_instance().submit(_render, plan_id, path)
+            _in_flight[path] = future
+            future.add_done_callback(lambda done: _in_flight.pop(path, None))
+    return future
+
+
+def open_plan_pdf(plan, wait=None):
+    """
+    The plan's PDF as an open binary file, rendered in the worker pool when the cache
+    has no copy of the current version. Returns None while the render is still running
+    after ``wait`` seconds (default PLAN_PDF_WAIT_SECONDS); errors of the render are raised.
+    """
+    if wait is None:
+        wait = getattr(settings, 'PLAN_PDF_WAIT_SECONDS', 30)
+    path = _cached_path(plan.pk, content_version(plan))
+
+    for _ in range(2):
+        try:
+            output = open(path, 'rb')
+        except FileNotFoundError:
+            pass
+        else:
+            # mtime is the LRU clock
+            os.utime(path)
+            return output
+        try:
+            _submit(plan.pk, path).result(timeout=wait)
+        except FutureTimeout:
+            return None
+    # Evicted again right after rendering; only possible with a tiny cache
+    return None
@@ -0,0 +1,146 @@
+"""
+Approving and rejecting many submitted plans at once.
+
+``bulk_review`` applies the rules of ``PlanViewSet.approve``/``reject``, ``PlanReview.clean``
+and the duplicate-submission check of ``Plan.clean`` to a whole batch with a fixed
+number of queries: the plans are read and locked once, the competing submissions of
+their organizations and fiscal years are read once, the reviews are written with one
+bulk INSERT and the plan statuses with one UPDATE.
+
+Plan post_save signals are not sent; the only receiver (plan budget summaries) does
+not depend on the status.
+"""
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Case, CharField, Value, When
+from django.utils import timezone
+from .models import Plan, PlanReview
+
+DECISIONS = {'APPROVED', 'REJECTED'}
+ACTIVE_STATUSES = ['SUBMITTED', 'APPROVED']
+MAX_BATCH_SIZE = 1000
+
+
+class BulkReviewError(ValueError):
+    """The batch as a whole is malformed"""
+
+
+def parse_decisions(data):
+    """
+    ``{"reviews": [{"plan": 1, "status": "APPROVED", "feedback": "..."}, ...]}``, or
+    ``{"plans": [1, 2], "status": "REJECTED", "feedback": "..."}`` for one decision for
+    all; ``feedback`` at the top level is the default of every review.
+    Returns a list of (plan_id, status, feedback) with unparsable IDs as None.
+    """
+    default_feedback = data.get('feedback') or ''
+    if 'reviews' in data:
+        items = data.get('reviews')
+        if not isinstance(items, list):
+            raise BulkReviewError('reviews must be a list')
+    elif 'plans' in data:
+        plans = data.get('plans')
+        if not isinstance(plans, list):
+            raise BulkReviewError('plans must be a list of IDs')
+        items = [{'plan': plan_id, 'status': data.get('status')} for plan_id in plans]
+    else:
+        raise BulkReviewError('reviews or plans is required')
+
+    if not items:
+        raise BulkReviewError('No plans to review')
+    if len(items) > MAX_BATCH_SIZE:
+        raise BulkReviewError(f'At most {MAX_BATCH_SIZE} plans can be reviewed at once')
+
+    decisions = []
+    for item in items:
+        if not isinstance(item, dict):
+            raise BulkReviewError('Every review must be an object with plan and status')
+        try:
+            plan_id = int(item.get('plan'))
+        except (TypeError, ValueError):
+            plan_id = None
+        status = str(item.get('status') or '').upper()
+        decisions.append((plan_id, status, item.get('feedback') or default_feedback))
+    return decisions
+
+
+def bulk_review(decisions, evaluator, visible_plans):
+    """
+    Apply (plan_id, status, feedback) decisions as ``evaluator`` (an OrganizationUser)
+    to plans of the ``visible_plans`` queryset. Valid decisions are applied together
+    in one transaction; the result has one entry per decision, in order:
+    ``{'plan': id, 'status': 'APPROVED'|'REJECTED'|'ERROR', 'error': ...}``.
+    """
+    results = [{'plan': plan_id, 'status': status} for plan_id, status, _ in decisions]
+    errors = {}
+
+    requested_ids = {plan_id for plan_id, _, _ in decisions if plan_id is not None}
+    seen = set()
+    for index, (plan_id, status, _) in enumerate(decisions):
+        if plan_id is None:
+            errors[index] = 'Invalid plan ID'
+        elif plan_id in seen:
+            errors[index] = 'Plan listed more than once'
+        elif status not in DECISIONS:
+            errors[index] = 'status must be APPROVED or REJECTED'
+        seen.add(plan_id)
+
+    with transaction.atomic():
+        visible_ids = set(visible_plans.filter(pk__in=requested_ids).values_list('pk', flat=True))
+        plans = {
+            plan['id']: plan
+            for plan in Plan.objects.select_for_update().filter(pk__in=visible_ids).values(
+                'id', 'status', 'organization_id', 'fiscal_year'
+            )
+        }
+
+        for index, (plan_id, status, _) in enumerate(decisions):
+            if index in errors:
+                continue
+            plan = plans.get(plan_id)
+            if plan is None:
+                errors[index] = 'Plan not found'
+            elif plan['status'] != 'SUBMITTED':
+                errors[index] = f'Only submitted plans can be reviewed (status is {plan["status"]})'
+
+        # Plan.clean: one submitted or approved plan per organization and fiscal year.
+        # Plans rejected in this batch no longer compete.
+        rejected = {plan_id for index, (plan_id, status, _) in enumerate(decisions) if index not in errors and status == 'REJECTED'}
+        approving = [(index, plans[plan_id]) for index, (plan_id, status, _) in enumerate(decisions) if index not in errors and status == 'APPROVED']
+        if approving:
+            active = defaultdict(set)
+            competing = Plan.objects.filter(
+                status__in=ACTIVE_STATUSES,
+                organization_id__in={plan['organization_id'] for _, plan in approving},
+                fiscal_year__in={plan['fiscal_year'] for _, plan in approving},
+            ).values_list('id', 'organization_id', 'fiscal_year')
+            for plan_id, organization_id, fiscal_year in competing:
+                if plan_id not in rejected:
+                    active[(organization_id, fiscal_year)].add(plan_id)
+            for index, plan in approving:
+                if active[(plan['organization_id'], plan['fiscal_year'])] - {plan['id']}:
+                    errors[index] = (
+                        f'A plan for this organization and fiscal year {plan["fiscal_year"]} '
+                        'has already been submitted or approved'
+                    )
+
+        accepted = [decision for index, decision in enumerate(decisions) if index not in errors]
+        if accepted:
+            now = timezone.now()
+            PlanReview.objects.bulk_create([
+                PlanReview(plan_id=plan_id, evaluator=evaluator, status=status, feedback=feedback, reviewed_at=now)
+                for plan_id, status, feedback in accepted
+            ])
+            Plan.objects.filter(pk__in=[plan_id for plan_id, _, _ in accepted], status='SUBMITTED').update(
+                status=Case(
+                    When(pk__in=[plan_id for plan_id, status, _ in accepted if status == 'APPROVED'], then=Value('APPROVED')),
+                    default=Value('REJECTED'),
+                    output_field=CharField(),
+                ),
+                # update() skips auto_now; conditional GETs and cached exports key on it
+                updated_at=now,
+            )
+
+    for index, error in errors.items():
+        results[index]['status'] = 'ERROR'
+        results[index]['error'] = error
+    return results
@@ -0,0 +1,94 @@
+"""
+Prefetch helpers for loading the objective -> initiative -> measure/activity -> sub-activity
+tree of a plan in a fixed number of queries.
+
+The nested serializers read the organization-scoped children from the ``scoped_*``
+attributes set here instead of issuing their own filtered queries per row.
+"""
+from django.db.models import Prefetch, prefetch_related_objects
+from .models import (
+    StrategicObjective, Program, StrategicInitiative,
+    PerformanceMeasure, MainActivity, organization_scope_q
+)
+
+
+def initiative_tree_prefetches(organization_ids, measures=True, activities=True, sub_activities=True,
+                               funding_sources=False):
+    """
+    Prefetches for the measures and activities (with sub-activities and budget totals) of
+    initiatives; children a response leaves out can be skipped. ``funding_sources`` adds
+    the per-source funding totals of the activities.
+    """
+    scope = organization_scope_q(organization_ids)
+    prefetches = []
+    if measures:
+        queryset = PerformanceMeasure.objects.filter(scope).select_related('organization').order_by('id')
+        prefetches.append(Prefetch('performance_measures', queryset=queryset, to_attr='scoped_performance_measures'))
+    if activities:
+        queryset = MainActivity.objects.with_budget_totals(funding_sources).filter(scope).select_related('organization').order_by('id')
+        if sub_activities:
+            queryset = queryset.prefetch_related('sub_activities')
+        prefetches.append(Prefetch('main_activities', queryset=queryset, to_attr='scoped_main_activities'))
+    return prefetches
+
+
+def initiative_tree_queryset(organization_ids, queryset=None, **children):
+    """Initiatives with their organization-scoped measures, activities and weight totals"""
+    if queryset is None:
+        queryset = StrategicInitiative.objects.all()
+    return queryset.with_weight_totals(organization_ids).select_related(
+        'organization', 'initiative_feed'
+    ).prefetch_related(*initiative_tree_prefetches(organization_ids, **children))
+
+
+def initiative_children(spec):
+    """initiative_tree_queryset keyword arguments for the children a FieldSpec selects"""
+    if spec is None:
+        return {}
+    activities = spec.child('main_activities')
+    return {
+        'measures': spec.selects('performance_measures', expandable=True),
+        'activities': spec.selects('main_activities', expandable=True),
+        'sub_activities': activities.selects('sub_activities', expandable=True),
+    }
+
+
+def objective_tree_queryset(organization_ids, queryset=None, **children):
+    """Objectives with weight totals, programs, initiatives and everything below them prefetched"""
+    if queryset is None:
+        queryset = StrategicObjective.objects.all()
+    initiatives = initiative_tree_queryset(organization_ids, **children)
+    programs = Program.objects.select_related('strategic_objective').prefetch_related(
+        Prefetch('initiatives', queryset=initiatives)
+    )
+    return queryset.with_weight_totals().prefetch_related(
+        Prefetch('programs', queryset=programs),
+        Prefetch('initiatives', queryset=initiatives),
+    )
+
+
+def load_plan_tree(plan, **children):
+    """
+    Attach the full objective tree of a plan as ``plan.tree_objectives``; ``children``
+    are passed on to ``initiative_tree_prefetches``.
+
+    Measures and activities are scoped to the plan's organization, so evaluators and
+    admins see the same tree the planner built.
+    """
+    organization_ids = [plan.organization_id]
+    prefetch_related_objects(
+        [plan],
+        Prefetch(
+            'selected_objectives',
+            queryset=objective_tree_queryset(organization_ids, **children),
+            to_attr='tree_objectives'
+        )
+    )
+
+    # Fall back to the single strategic objective when nothing was selected
+    if not plan.tree_objectives and plan.strategic_objective_id:
+        plan.tree_objectives = list(
+            objective_tree_queryset(organization_ids, **children).filter(pk=plan.strategic_objective_id)
+        )
+
+    return plan
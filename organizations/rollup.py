@@ -0,0 +1,138 @@
+"""
+Budget, plan status and weight completion rolled up the organization tree.
+
+Each metric is computed per organization with one GROUP BY query; the tree (depths
+and paths) is read once from the closure table, and every node's totals are added
+into its parent in a single bottom-up pass (deepest nodes first), so the whole
+hierarchy costs a fixed number of queries.
+"""
+from collections import defaultdict
+from decimal import Decimal
+from django.db.models import Count, Sum
+from .dashboard import BUDGET_PLAN_STATUSES, FUNDING_SOURCES
+from .models import Organization, OrganizationClosure, Plan, PlanBudgetSummary, MainActivity
+
+BUDGET_FIELDS = ['total_budget'] + FUNDING_SOURCES + ['total_funding', 'funding_gap']
+PLAN_STATUSES = [status for status, _ in Plan.PLAN_STATUS]
+
+# Main activity weights of an initiative should total 65% of the initiative weight
+ACTIVITIES_WEIGHT_SHARE = Decimal('0.65')
+WEIGHT_TOLERANCE = Decimal('0.01')
+
+
+def load_tree():
+    """Every organization with its depth and root-to-node path of IDs, from the closure table"""
+    nodes = {
+        row['id']: dict(row, path=[], depth=0)
+        for row in Organization.objects.order_by('id').values('id', 'name', 'type', 'parent_id')
+    }
+    links = OrganizationClosure.objects.order_by('descendant_id', '-depth').values_list(
+        'ancestor_id', 'descendant_id', 'depth'
+    )
+    for ancestor_id, descendant_id, depth in links:
+        node = nodes.get(descendant_id)
+        if node is not None:
+            node['path'].append(ancestor_id)
+            node['depth'] = max(node['depth'], depth)
+    return nodes
+
+
+def _empty_metrics():
+    metrics = {field: Decimal('0') for field in BUDGET_FIELDS}
+    metrics['plan_counts'] = {status: 0 for status in PLAN_STATUSES}
+    metrics['initiatives_planned'] = 0
+    metrics['initiatives_weight_complete'] = 0
+    return metrics
+
+
+def _add(target, source):
+    for field in BUDGET_FIELDS:
+        target[field] += source[field]
+    for status, count in source['plan_counts'].items():
+        target['plan_counts'][status] = target['plan_counts'].get(status, 0) + count
+    target['initiatives_planned'] += source['initiatives_planned']
+    target['initiatives_weight_complete'] += source['initiatives_weight_complete']
+
+
+def _finish(metrics):
+    # Clamped after summing, as MainActivity.funding_gap: a surplus offsets a gap
+    metrics['funding_gap'] = max(Decimal('0'), metrics['total_budget'] - metrics['total_funding'])
+    planned = metrics['initiatives_planned']
+    metrics['weight_completion'] = (
+        round(metrics['initiatives_weight_complete'] * 100 / planned, 2) if planned else None
+    )
+    metrics['plan_count'] = sum(metrics['plan_counts'].values())
+    return metrics
+
+
+def own_metrics(fiscal_year=None):
+    """organization_id -> metrics of that organization alone"""
+    metrics = defaultdict(_empty_metrics)
+
+    plans = Plan.objects.all()
+    if fiscal_year:
+        plans = plans.filter(fiscal_year=fiscal_year)
+
+    # Budget of the submitted/approved plans, from the maintained summary table
+    budgets = PlanBudgetSummary.objects.filter(
+        plan__in=plans.filter(status__in=BUDGET_PLAN_STATUSES)
+    ).order_by().values('plan__organization_id').annotate(
+        **{field: Sum(field) for field in BUDGET_FIELDS}
+    )
+    for row in budgets:
+        entry = metrics[row['plan__organization_id']]
+        for field in BUDGET_FIELDS:
+            entry[field] += row[field] or Decimal('0')
+
+    for row in plans.order_by().values('organization_id', 'status').annotate(count=Count('id')):
+        metrics[row['organization_id']]['plan_counts'][row['status']] = row['count']
+
+    # Initiatives an organization has activities in, and whether their weights add up
+    weights = MainActivity.objects.filter(organization__isnull=False).order_by().values(
+        'organization_id', 'initiative_id', 'initiative__weight'
+    ).annotate(total=Sum('weight'))
+    for row in weights:
+        entry = metrics[row['organization_id']]
+        entry['initiatives_planned'] += 1
+        expected = (row['initiative__weight'] or Decimal('0')) * ACTIVITIES_WEIGHT_SHARE
+        if abs((row['total'] or Decimal('0')) - expected) < WEIGHT_TOLERANCE:
+            entry['initiatives_weight_complete'] += 1
+
+    return metrics
+
+
+def organization_rollup(fiscal_year=None, root_ids=None):
+    """
+    One entry per organization with its own metrics and the totals of its whole subtree.
+    ``root_ids`` limits the result to those organizations and everything below them.
+    """
+    nodes = load_tree()
+    own = own_metrics(fiscal_year)
+
+    rollup = {}
+    for node_id in sorted(nodes, key=lambda node_id: nodes[node_id]['depth'], reverse=True):
+        totals = rollup.setdefault(node_id, _empty_metrics())
+        _add(totals, own.get(node_id) or _empty_metrics())
+        parent_id = nodes[node_id]['parent_id']
+        if parent_id in nodes and parent_id != node_id and nodes[parent_id]['depth'] < nodes[node_id]['depth']:
+            _add(rollup.setdefault(parent_id, _empty_metrics()), totals)
+
+    if root_ids is not None:
+        roots = set(root_ids)
+        selected = [node for node in nodes.values() if roots.intersection(node['path'])]
+    else:
+        selected = list(nodes.values())
+
+    return [
+        {
+            'id': node['id'],
+            'name': node['name'],
+            'type': node['type'],
+            'parent': node['parent_id'],
+            'depth': node['depth'],
+            'path': node['path'],
+            'own': _finish(own.get(node['id']) or _empty_metrics()),
+            'rollup': _finish(rollup[node['id']]),
+        }
+        for node in sorted(selected, key=lambda node: node['path'])
+    ]
@@ -9,12 +9,21 @@ from .models import (
     ActivityBudget, ActivityCostingAssumption, InitiativeFeed,
     Location, LandTransport, AirTransport, PerDiem, Accommodation,
     ParticipantCost, SessionCost, PrintingCost, SupervisorCost,
-    ProcurementItem, Plan, PlanReview, SubActivity
+    ProcurementItem, Plan, PlanReview, SubActivity, ImportJob
 )
+from .middleware import get_organization_context
+from . import org_hierarchy
+from .sparse_fields import SparseFieldsMixin, prune
+from .instrumentation import TimedSerializerMixin
 from decimal import Decimal, InvalidOperation
 import json
 
-class OrganizationSerializer(serializers.ModelSerializer):
+
+class BaseModelSerializer(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
+    """Base of the API model serializers: ?fields=/?expand= support and serialization timing"""
+
+
+class OrganizationSerializer(BaseModelSerializer):
     parentId = serializers.IntegerField(source='parent_id', read_only=True)
     coreValues = serializers.ListField(source='core_values', read_only=True)
 
@@ -22,7 +31,15 @@ class OrganizationSerializer(serializers.ModelSerializer):
         model = Organization
         fields = ['id', 'name', 'type', 'parent', 'parentId', 'vision', 'mission', 'core_values', 'coreValues', 'created_at', 'updated_at']
 
-class OrganizationUserSerializer(serializers.ModelSerializer):
+    def validate_parent(self, value):
+        if self.instance is not None and value is not None:
+            try:
+                org_hierarchy.validate_parent(self.instance, value.pk)
+            except DjangoValidationError as e:
+                raise serializers.ValidationError(e.messages)
+        return value
+
+class OrganizationUserSerializer(BaseModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     organization_name = serializers.CharField(source='organization.name', read_only=True)
 
@@ -30,7 +47,8 @@ class OrganizationUserSerializer(serializers.ModelSerializer):
         model = OrganizationUser
         fields = ['id', 'user', 'username', 'organization', 'organization_name', 'role', 'created_at']
 
-class StrategicObjectiveSerializer(serializers.ModelSerializer):
+class StrategicObjectiveSerializer(BaseModelSerializer):
+    expandable_fields = {'programs': 'ProgramSerializer', 'initiatives': 'StrategicInitiativeSerializer'}
     effective_weight = serializers.SerializerMethodField()
     programs = serializers.SerializerMethodField()
     initiatives = serializers.SerializerMethodField()
@@ -68,7 +86,7 @@ class StrategicObjectiveSerializer(serializers.ModelSerializer):
         """
         try:
             programs = obj.programs.all()
-            return ProgramSerializer(programs, many=True).data
+            return ProgramSerializer(programs, many=True, context=self.child_context('programs')).data
         except Exception as e:
             print(f"Error getting programs for objective {obj.id}: {e}")
             return []
@@ -79,7 +97,7 @@ class StrategicObjectiveSerializer(serializers.ModelSerializer):
         """
         try:
             initiatives = obj.initiatives.all()
-            return StrategicInitiativeSerializer(initiatives, many=True, context=self.context).data
+            return StrategicInitiativeSerializer(initiatives, many=True, context=self.child_context('initiatives')).data
         except Exception as e:
             print(f"Error getting initiatives for objective {obj.id}: {e}")
             return []
@@ -89,6 +107,10 @@ class StrategicObjectiveSerializer(serializers.ModelSerializer):
         Get total initiatives weight with error handling
         """
         try:
+            # Read the database-side total when the queryset was annotated
+            if hasattr(obj, 'initiatives_weight_total'):
+                return float(obj.initiatives_weight_total)
+
             initiatives = obj.initiatives.all()
             total = 0
             for initiative in initiatives:
@@ -102,7 +124,8 @@ class StrategicObjectiveSerializer(serializers.ModelSerializer):
             print(f"Error calculating total initiatives weight for objective {obj.id}: {e}")
             return 0
 
-class ProgramSerializer(serializers.ModelSerializer):
+class ProgramSerializer(BaseModelSerializer):
+    expandable_fields = {'initiatives': 'StrategicInitiativeSerializer'}
     strategic_objective_title = serializers.CharField(source='strategic_objective.title', read_only=True)
     initiatives = serializers.SerializerMethodField()
 
@@ -112,16 +135,20 @@ class ProgramSerializer(serializers.ModelSerializer):
 
     def get_initiatives(self, obj):
         initiatives = obj.initiatives.all()
-        return StrategicInitiativeSerializer(initiatives, many=True, context=self.context).data
+        return StrategicInitiativeSerializer(initiatives, many=True, context=self.child_context('initiatives')).data
 
-class InitiativeFeedSerializer(serializers.ModelSerializer):
+class InitiativeFeedSerializer(BaseModelSerializer):
     strategic_objective_title = serializers.CharField(source='strategic_objective.title', read_only=True)
 
     class Meta:
         model = InitiativeFeed
         fields = ['id', 'name', 'description', 'strategic_objective', 'strategic_objective_title', 'is_active', 'created_at', 'updated_at']
 
-class StrategicInitiativeSerializer(serializers.ModelSerializer):
+class StrategicInitiativeSerializer(BaseModelSerializer):
+    expandable_fields = {
+        'performance_measures': 'PerformanceMeasureSerializer',
+        'main_activities': 'MainActivitySerializer',
+    }
     organization_name = serializers.CharField(source='organization.name', read_only=True)
     performance_measures = serializers.SerializerMethodField()
     main_activities = serializers.SerializerMethodField()
@@ -138,61 +165,68 @@ class StrategicInitiativeSerializer(serializers.ModelSerializer):
             'total_activities_weight', 'created_at', 'updated_at'
         ]
 
+    def _user_organization_id(self):
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            return get_organization_context(request).primary_organization_id
+        return None
+
+    def _scoped_measures(self, obj):
+        """Measures visible to the user's organization, from the plan tree prefetch when loaded"""
+        measures = getattr(obj, 'scoped_performance_measures', None)
+        if measures is not None:
+            return measures
+
+        # Filter performance measures by request user's organization
+        measures = obj.performance_measures.all()
+        user_org_id = self._user_organization_id()
+        if user_org_id:
+            measures = measures.filter(
+                models.Q(organization__isnull=True) |
+                models.Q(organization=user_org_id)
+            )
+        return measures
+
+    def _scoped_activities(self, obj):
+        """Main activities visible to the user's organization, from the plan tree prefetch when loaded"""
+        activities = getattr(obj, 'scoped_main_activities', None)
+        if activities is not None:
+            return activities
+
+        # Filter main activities by request user's organization
+        activities = obj.main_activities.all()
+        user_org_id = self._user_organization_id()
+        if user_org_id:
+            activities = activities.filter(
+                models.Q(organization__isnull=True) |
+                models.Q(organization=user_org_id)
+            )
+        return activities
+
     def get_performance_measures(self, obj):
         try:
-            # Filter performance measures by request user's organization
-            measures = obj.performance_measures.all()
-            request = self.context.get('request')
-            if request and request.user.is_authenticated:
-                user_org = getattr(request.user, 'organization_users', None)
-                if user_org and hasattr(user_org, 'first'):
-                    user_org_instance = user_org.first()
-                    if user_org_instance:
-                        user_org_id = user_org_instance.organization_id
-                        measures = measures.filter(
-                            models.Q(organization__isnull=True) |
-                            models.Q(organization=user_org_id)
-                        )
-            return PerformanceMeasureSerializer(measures, many=True).data
+            measures = self._scoped_measures(obj)
+            return PerformanceMeasureSerializer(measures, many=True, context=self.child_context('performance_measures')).data
         except Exception as e:
             print(f"Error getting performance measures for initiative {obj.id}: {e}")
             return []
 
     def get_main_activities(self, obj):
         try:
-            # Filter main activities by request user's organization
-            activities = obj.main_activities.all()
-            request = self.context.get('request')
-            if request and request.user.is_authenticated:
-                user_org = getattr(request.user, 'organization_users', None)
-                if user_org and hasattr(user_org, 'first'):
-                    user_org_instance = user_org.first()
-                    if user_org_instance:
-                        user_org_id = user_org_instance.organization_id
-                        activities = activities.filter(
-                            models.Q(organization__isnull=True) |
-                            models.Q(organization=user_org_id)
-                        )
-            return MainActivitySerializer(activities, many=True, context=self.context).data
+            activities = self._scoped_activities(obj)
+            return MainActivitySerializer(activities, many=True, context=self.child_context('main_activities')).data
         except Exception as e:
             print(f"Error getting main activities for initiative {obj.id}: {e}")
             return []
 
     def get_total_measures_weight(self, obj):
         try:
+            # Read the database-side total when the queryset was annotated
+            if hasattr(obj, 'measures_weight_total'):
+                return float(obj.measures_weight_total)
+
             # Calculate weight only for user's organization measures
-            measures = obj.performance_measures.all()
-            request = self.context.get('request')
-            if request and request.user.is_authenticated:
-                user_org = getattr(request.user, 'organization_users', None)
-                if user_org and hasattr(user_org, 'first'):
-                    user_org_instance = user_org.first()
-                    if user_org_instance:
-                        user_org_id = user_org_instance.organization_id
-                        measures = measures.filter(
-                            models.Q(organization__isnull=True) |
-                            models.Q(organization=user_org_id)
-                        )
+            measures = self._scoped_measures(obj)
             return sum(float(measure.weight or 0) for measure in measures)
         except Exception as e:
             print(f"Error calculating total measures weight for initiative {obj.id}: {e}")
@@ -200,25 +234,18 @@ class StrategicInitiativeSerializer(serializers.ModelSerializer):
 
     def get_total_activities_weight(self, obj):
         try:
+            # Read the database-side total when the queryset was annotated
+            if hasattr(obj, 'activities_weight_total'):
+                return float(obj.activities_weight_total)
+
             # Calculate weight only for user's organization activities
-            activities = obj.main_activities.all()
-            request = self.context.get('request')
-            if request and request.user.is_authenticated:
-                user_org = getattr(request.user, 'organization_users', None)
-                if user_org and hasattr(user_org, 'first'):
-                    user_org_instance = user_org.first()
-                    if user_org_instance:
-                        user_org_id = user_org_instance.organization_id
-                        activities = activities.filter(
-                            models.Q(organization__isnull=True) |
-                            models.Q(organization=user_org_id)
-                        )
+            activities = self._scoped_activities(obj)
             return sum(float(activity.weight or 0) for activity in activities)
         except Exception as e:
             print(f"Error calculating total activities weight for initiative {obj.id}: {e}")
             return 0
 
-class PerformanceMeasureSerializer(serializers.ModelSerializer):
+class PerformanceMeasureSerializer(BaseModelSerializer):
     organization_name = serializers.CharField(source='organization.name', read_only=True)
 
     class Meta:
@@ -233,10 +260,9 @@ class PerformanceMeasureSerializer(serializers.ModelSerializer):
     def validate(self, data):
         # Ensure organization is set from request user
         if not data.get('organization'):
-            user = self.context['request'].user
-            user_org = user.organization_users.first()
+            user_org = get_organization_context(self.context['request']).primary_organization
             if user_org:
-                data['organization'] = user_org.organization
+                data['organization'] = user_org
 
         # Validate period selection
         selected_months = data.get('selected_months', [])
@@ -247,7 +273,7 @@ class PerformanceMeasureSerializer(serializers.ModelSerializer):
 
         return data
 
-class SubActivitySerializer(serializers.ModelSerializer):
+class SubActivitySerializer(BaseModelSerializer):
     total_funding = serializers.SerializerMethodField()
     estimated_cost = serializers.SerializerMethodField()
     funding_gap = serializers.SerializerMethodField()
@@ -283,7 +309,8 @@ class SubActivitySerializer(serializers.ModelSerializer):
 
         return data
 
-class MainActivitySerializer(serializers.ModelSerializer):
+class MainActivitySerializer(BaseModelSerializer):
+    expandable_fields = {'sub_activities': 'SubActivitySerializer'}
     organization_name = serializers.CharField(source='organization.name', read_only=True)
     sub_activities = SubActivitySerializer(many=True, read_only=True)
     total_budget = serializers.SerializerMethodField()
@@ -326,10 +353,9 @@ class MainActivitySerializer(serializers.ModelSerializer):
         """Ensure organization is set, then let model handle weight validation"""
         # Set organization from authenticated user
         if not data.get('organization'):
-            user = self.context['request'].user
-            user_org = user.organization_users.first()
+            user_org = get_organization_context(self.context['request']).primary_organization
             if user_org:
-                data['organization'] = user_org.organization
+                data['organization'] = user_org
 
         # Validate period selection
         selected_months = data.get('selected_months', [])
@@ -342,7 +368,11 @@ class MainActivitySerializer(serializers.ModelSerializer):
         return data
 
 
-class ActivityBudgetSerializer(serializers.ModelSerializer):
+class ActivityBudgetSerializer(BaseModelSerializer):
+    # Kept under its old name; now validated against existing sub-activities
+    sub_activity_id = serializers.PrimaryKeyRelatedField(
+        source='sub_activity', queryset=SubActivity.objects.all(), required=False, allow_null=True
+    )
     total_funding = serializers.SerializerMethodField()
     estimated_cost = serializers.SerializerMethodField()
     funding_gap = serializers.SerializerMethodField()
@@ -368,18 +398,18 @@ class ActivityBudgetSerializer(serializers.ModelSerializer):
     def get_funding_gap(self, obj):
         return obj.funding_gap
 
-class ActivityCostingAssumptionSerializer(serializers.ModelSerializer):
+class ActivityCostingAssumptionSerializer(BaseModelSerializer):
     class Meta:
         model = ActivityCostingAssumption
         fields = '__all__'
 
 # Location and transport serializers
-class LocationSerializer(serializers.ModelSerializer):
+class LocationSerializer(BaseModelSerializer):
     class Meta:
         model = Location
         fields = '__all__'
 
-class LandTransportSerializer(serializers.ModelSerializer):
+class LandTransportSerializer(BaseModelSerializer):
     origin_name = serializers.CharField(source='origin.name', read_only=True)
     destination_name = serializers.CharField(source='destination.name', read_only=True)
 
@@ -387,7 +417,7 @@ class LandTransportSerializer(serializers.ModelSerializer):
         model = LandTransport
         fields = ['id', 'origin', 'destination', 'origin_name', 'destination_name', 'trip_type', 'price', 'created_at', 'updated_at']
 
-class AirTransportSerializer(serializers.ModelSerializer):
+class AirTransportSerializer(BaseModelSerializer):
     origin_name = serializers.CharField(source='origin.name', read_only=True)
     destination_name = serializers.CharField(source='destination.name', read_only=True)
 
@@ -395,14 +425,14 @@ class AirTransportSerializer(serializers.ModelSerializer):
         model = AirTransport
         fields = ['id', 'origin', 'destination', 'origin_name', 'destination_name', 'price', 'created_at', 'updated_at']
 
-class PerDiemSerializer(serializers.ModelSerializer):
+class PerDiemSerializer(BaseModelSerializer):
     location_name = serializers.CharField(source='location.name', read_only=True)
 
     class Meta:
         model = PerDiem
         fields = ['id', 'location', 'location_name', 'amount', 'hardship_allowance_amount', 'created_at', 'updated_at']
 
-class AccommodationSerializer(serializers.ModelSerializer):
+class AccommodationSerializer(BaseModelSerializer):
     location_name = serializers.CharField(source='location.name', read_only=True)
     service_type_display = serializers.CharField(source='get_service_type_display', read_only=True)
 
@@ -410,35 +440,35 @@ class AccommodationSerializer(serializers.ModelSerializer):
         model = Accommodation
         fields = ['id', 'location', 'location_name', 'service_type', 'service_type_display', 'price', 'created_at', 'updated_at']
 
-class ParticipantCostSerializer(serializers.ModelSerializer):
+class ParticipantCostSerializer(BaseModelSerializer):
     cost_type_display = serializers.CharField(source='get_cost_type_display', read_only=True)
 
     class Meta:
         model = ParticipantCost
         fields = ['id', 'cost_type', 'cost_type_display', 'price', 'created_at', 'updated_at']
 
-class SessionCostSerializer(serializers.ModelSerializer):
+class SessionCostSerializer(BaseModelSerializer):
     cost_type_display = serializers.CharField(source='get_cost_type_display', read_only=True)
 
     class Meta:
         model = SessionCost
         fields = ['id', 'cost_type', 'cost_type_display', 'price', 'created_at', 'updated_at']
 
-class PrintingCostSerializer(serializers.ModelSerializer):
+class PrintingCostSerializer(BaseModelSerializer):
     document_type_display = serializers.CharField(source='get_document_type_display', read_only=True)
 
     class Meta:
         model = PrintingCost
         fields = ['id', 'document_type', 'document_type_display', 'price_per_page', 'created_at', 'updated_at']
 
-class SupervisorCostSerializer(serializers.ModelSerializer):
+class SupervisorCostSerializer(BaseModelSerializer):
     cost_type_display = serializers.CharField(source='get_cost_type_display', read_only=True)
 
     class Meta:
         model = SupervisorCost
         fields = ['id', 'cost_type', 'cost_type_display', 'amount', 'created_at', 'updated_at']
 
-class ProcurementItemSerializer(serializers.ModelSerializer):
+class ProcurementItemSerializer(BaseModelSerializer):
     category_display = serializers.CharField(source='get_category_display', read_only=True)
     unit_display = serializers.CharField(source='get_unit_display', read_only=True)
 
@@ -446,7 +476,20 @@ class ProcurementItemSerializer(serializers.ModelSerializer):
         model = ProcurementItem
         fields = ['id', 'category', 'category_display', 'name', 'unit', 'unit_display', 'unit_price', 'created_at', 'updated_at']
 
-class PlanReviewSerializer(serializers.ModelSerializer):
+class ImportJobSerializer(BaseModelSerializer):
+    kind_display = serializers.CharField(source='get_kind_display', read_only=True)
+
+    class Meta:
+        model = ImportJob
+        fields = [
+            'id', 'kind', 'kind_display', 'status', 'original_filename', 'options',
+            'chunks_completed', 'rows_processed', 'rows_imported', 'error_count', 'warning_count',
+            'errors', 'warnings', 'failure_reason', 'attempts',
+            'started_at', 'finished_at', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+class PlanReviewSerializer(BaseModelSerializer):
     evaluator_name = serializers.SerializerMethodField()
 
     class Meta:
@@ -458,7 +501,8 @@ class PlanReviewSerializer(serializers.ModelSerializer):
             return f"{obj.evaluator.user.first_name} {obj.evaluator.user.last_name}".strip() or obj.evaluator.user.username
         return "System"
 
-class PlanSerializer(serializers.ModelSerializer):
+class PlanSerializer(BaseModelSerializer):
+    expandable_fields = {'objectives': 'StrategicObjectiveSerializer'}
     organization_name = serializers.CharField(source='organization.name', read_only=True)
     objectives = serializers.SerializerMethodField()
     reviews = PlanReviewSerializer(many=True, read_only=True)
@@ -607,6 +651,15 @@ class PlanSerializer(serializers.ModelSerializer):
 
     def get_objectives(self, obj):
         """Get all selected objectives with their complete data"""
+        # Use the cached trees or the prefetched objective tree when the view loaded one
+        cached_objectives = getattr(obj, 'cached_objectives', None)
+        if cached_objectives is not None:
+            spec = self.field_spec
+            return prune(cached_objectives, StrategicObjectiveSerializer, spec.child('objectives') if spec else None)
+        tree_objectives = getattr(obj, 'tree_objectives', None)
+        if tree_objectives is not None:
+            return StrategicObjectiveSerializer(tree_objectives, many=True, context=self.child_context('objectives')).data
+
         # Get all selected objectives as instances
         selected_objectives = obj.selected_objectives.all()
 
@@ -614,7 +667,7 @@ class PlanSerializer(serializers.ModelSerializer):
         if not selected_objectives and obj.strategic_objective:
             selected_objectives = [obj.strategic_objective]
 
-        return StrategicObjectiveSerializer(selected_objectives, many=True, context=self.context).data
+        return StrategicObjectiveSerializer(selected_objectives, many=True, context=self.child_context('objectives')).data
 
 class UserSerializer(serializers.ModelSerializer):
     userOrganizations = serializers.SerializerMethodField()
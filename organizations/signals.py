@@ -0,0 +1,170 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from . import costing_reference, objective_cache, org_hierarchy, plan_budget
+from .models import (
+    Organization, InitiativeFeed, Plan, StrategicObjective, Program, StrategicInitiative,
+    PerformanceMeasure, MainActivity, SubActivity
+)
+
+
+def rate_table_changed(sender, **kwargs):
+    costing_reference.bump_version()
+
+
+for rate_model in costing_reference.RATE_MODELS:
+    post_save.connect(rate_table_changed, sender=rate_model, dispatch_uid=f'costing_reference_{rate_model.__name__}_save')
+    post_delete.connect(rate_table_changed, sender=rate_model, dispatch_uid=f'costing_reference_{rate_model.__name__}_delete')
+
+
+# Rows moved by a save: the previous placement is read once and shared by the plan
+# budget and objective tree receivers
+
+# model -> fields that place a row in the plan budgets and objective trees
+PLACEMENT_FIELDS = {
+    Program: ['strategic_objective_id'],
+    StrategicInitiative: ['strategic_objective_id', 'program_id'],
+    PerformanceMeasure: ['initiative_id', 'organization_id'],
+    MainActivity: ['initiative_id', 'organization_id'],
+    SubActivity: ['main_activity_id'],
+}
+
+
+def placement_pre_save(sender, instance, update_fields=None, **kwargs):
+    """Keep the stored placement fields in ``_previous_placement`` when the save moves the row"""
+    instance._previous_placement = None
+    fields = PLACEMENT_FIELDS[sender]
+    if instance._state.adding:
+        return
+    if update_fields is not None and not any(
+        field in update_fields or field[:-len('_id')] in update_fields for field in fields
+    ):
+        return
+    previous = sender.objects.filter(pk=instance.pk).values(*fields).first()
+    if previous and any(previous[field] != getattr(instance, field) for field in fields):
+        instance._previous_placement = previous
+
+
+for placed_model in PLACEMENT_FIELDS:
+    pre_save.connect(placement_pre_save, sender=placed_model, dispatch_uid=f'placement_{placed_model.__name__}_pre_save')
+
+
+# Plan budget summaries: see plan_budget.py
+
+def sub_activity_changed(sender, instance, **kwargs):
+    main_activity_ids = [instance.main_activity_id]
+    previous = getattr(instance, '_previous_placement', None)
+    if previous:
+        main_activity_ids.append(previous['main_activity_id'])
+    plan_budget.mark_main_activities_dirty(main_activity_ids)
+
+
+def main_activity_saved(sender, instance, created, **kwargs):
+    # A new main activity has no sub-activities yet; a moved one changes two initiatives
+    previous = getattr(instance, '_previous_placement', None)
+    if previous:
+        plan_budget.mark_dirty(previous['organization_id'], previous['initiative_id'])
+        plan_budget.mark_dirty(instance.organization_id, instance.initiative_id)
+
+
+def main_activity_deleted(sender, instance, **kwargs):
+    plan_budget.mark_dirty(instance.organization_id, instance.initiative_id)
+
+
+def plan_saved(sender, instance, **kwargs):
+    plan_budget.mark_plan_dirty(instance.pk)
+
+
+def plan_objectives_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        plan_budget.mark_plan_dirty(instance.pk)
+    else:
+        for plan_id in pk_set or []:
+            plan_budget.mark_plan_dirty(plan_id)
+
+
+post_save.connect(sub_activity_changed, sender=SubActivity, dispatch_uid='plan_budget_sub_activity_save')
+post_delete.connect(sub_activity_changed, sender=SubActivity, dispatch_uid='plan_budget_sub_activity_delete')
+post_save.connect(main_activity_saved, sender=MainActivity, dispatch_uid='plan_budget_main_activity_save')
+post_delete.connect(main_activity_deleted, sender=MainActivity, dispatch_uid='plan_budget_main_activity_delete')
+post_save.connect(plan_saved, sender=Plan, dispatch_uid='plan_budget_plan_save')
+m2m_changed.connect(
+    plan_objectives_changed, sender=Plan.selected_objectives.through, dispatch_uid='plan_budget_plan_objectives'
+)
+
+
+# Organization closure table: see org_hierarchy.py
+
+def organization_pre_save(sender, instance, **kwargs):
+    instance._parent_changed = False
+    if instance._state.adding:
+        return
+    previous = Organization.objects.filter(pk=instance.pk).values_list('parent_id', flat=True).first()
+    if previous != instance.parent_id:
+        org_hierarchy.validate_parent(instance, instance.parent_id)
+        instance._parent_changed = True
+
+
+def organization_saved(sender, instance, created, **kwargs):
+    if created:
+        org_hierarchy.insert_node(instance)
+    elif getattr(instance, '_parent_changed', False):
+        org_hierarchy.move_node(instance)
+
+
+def organization_pre_delete(sender, instance, **kwargs):
+    org_hierarchy.detach_children(instance)
+
+
+pre_save.connect(organization_pre_save, sender=Organization, dispatch_uid='org_closure_pre_save')
+post_save.connect(organization_saved, sender=Organization, dispatch_uid='org_closure_save')
+pre_delete.connect(organization_pre_delete, sender=Organization, dispatch_uid='org_closure_pre_delete')
+
+
+# Objective tree cache: see objective_cache.py
+
+def _activity_keys(instance):
+    return objective_cache.initiative_keys([(instance.initiative_id, instance.organization_id)])
+
+
+def _sub_activity_keys(instance):
+    # Resolved once at commit for all sub-activities, so a cascading delete costs no query per row.
+    # A deleted main activity invalidates its own trees.
+    objective_cache.invalidate_main_activities([instance.main_activity_id])
+    return set()
+
+
+# model -> function returning the tree keys of a row
+TREE_MODELS = {
+    StrategicObjective: lambda instance: {(instance.pk, None)},
+    Program: lambda instance: {(instance.strategic_objective_id, None)},
+    StrategicInitiative: lambda instance: {
+        (objective_id, None) for objective_id in objective_cache.initiative_objective_ids(instance)
+    },
+    PerformanceMeasure: _activity_keys,
+    MainActivity: _activity_keys,
+    SubActivity: _sub_activity_keys,
+}
+
+
+def tree_row_changed(sender, instance, **kwargs):
+    tree_keys = TREE_MODELS[sender]
+    keys = tree_keys(instance)
+    # A row moved to another objective or organization invalidates both places
+    previous = getattr(instance, '_previous_placement', None)
+    if previous:
+        keys |= tree_keys(sender(pk=instance.pk, **previous))
+    objective_cache.mark_changed(keys)
+
+
+def tree_names_changed(sender, **kwargs):
+    objective_cache.mark_all_changed()
+
+
+for tree_model in TREE_MODELS:
+    post_save.connect(tree_row_changed, sender=tree_model, dispatch_uid=f'objective_tree_{tree_model.__name__}_save')
+    post_delete.connect(tree_row_changed, sender=tree_model, dispatch_uid=f'objective_tree_{tree_model.__name__}_delete')
+
+for named_model in (Organization, InitiativeFeed):
+    post_save.connect(tree_names_changed, sender=named_model, dispatch_uid=f'objective_tree_{named_model.__name__}_save')
+    post_delete.connect(tree_names_changed, sender=named_model, dispatch_uid=f'objective_tree_{named_model.__name__}_delete')
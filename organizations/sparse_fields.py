@@ -0,0 +1,153 @@
+"""
+Sparse fieldsets for the API serializers.
+
+* ``?fields=id,title,programs.name`` keeps only the named fields at each level (a
+  level with no names keeps all of its fields).
+* ``?expand=programs.initiatives,initiatives`` includes nested children. In list
+  responses the ``expandable_fields`` of a serializer are left out unless expanded
+  (``?expand=*`` expands everything); detail responses include them unless
+  ``?fields=`` says otherwise.
+
+A left-out nested field is dropped from the serializer before it runs, so its
+SerializerMethodField and the queries behind it never execute. Views can ask
+``field_spec_for(request, view)`` which children a response will need and prefetch
+only those.
+"""
+from importlib import import_module
+
+EXPAND_ALL = '*'
+
+_UNSET = object()
+
+
+def _parse(value):
+    """'a,b.c' -> {('a',), ('b', 'c')}"""
+    return {
+        tuple(part for part in item.strip().split('.') if part)
+        for item in (value or '').split(',')
+        if item.strip()
+    }
+
+
+class FieldSpec:
+    """The fields requested at one level of a response, and below it"""
+
+    def __init__(self, fields=(), expand=(), flat=False):
+        self.fields = set(fields)
+        self.expand = set(expand)
+        self.flat = flat
+        self.expand_all = (EXPAND_ALL,) in self.expand
+
+    @classmethod
+    def from_request(cls, request, flat=False):
+        params = request.query_params
+        return cls(_parse(params.get('fields')), _parse(params.get('expand')), flat=flat)
+
+    def _names(self, paths):
+        return {path[0] for path in paths if path}
+
+    def selects(self, name, expandable=False):
+        """Whether ``name`` is part of the response at this level"""
+        named = self._names(self.fields)
+        if named:
+            return name in named or name in self._names(self.expand)
+        if expandable:
+            return not self.flat or self.expand_all or name in self._names(self.expand)
+        return True
+
+    def child(self, name):
+        """The spec for the serializer of field ``name``"""
+        spec = FieldSpec(
+            {path[1:] for path in self.fields if len(path) > 1 and path[0] == name},
+            {path[1:] for path in self.expand if len(path) > 1 and path[0] == name},
+            flat=self.flat,
+        )
+        if self.expand_all:
+            spec.expand.add((EXPAND_ALL,))
+            spec.expand_all = True
+        return spec
+
+
+def field_spec_for(request, view=None):
+    """The top-level spec of a request; list actions default to flat representations"""
+    if request is None or not hasattr(request, 'query_params'):
+        return None
+    return FieldSpec.from_request(request, flat=getattr(view, 'action', None) == 'list')
+
+
+class SparseFieldsMixin:
+    """
+    ModelSerializer mixin applying the request's ``fields``/``expand``.
+    ``expandable_fields`` maps nested fields to their serializer classes (or names).
+    Serializers built without a request (exports, caches) keep every field.
+    """
+    expandable_fields = {}
+
+    @property
+    def field_spec(self):
+        if getattr(self, '_field_spec', _UNSET) is _UNSET:
+            self._field_spec = self._resolve_field_spec()
+        return self._field_spec
+
+    def _resolve_field_spec(self):
+        # Walk up to the root serializer, collecting the field names on the way
+        names = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:
+                names.append(node.field_name)
+            node = node.parent
+
+        context = node.context
+        if 'field_spec' in context:
+            spec = context['field_spec']
+        else:
+            spec = field_spec_for(context.get('request'), context.get('view'))
+        for name in reversed(names):
+            if spec is None:
+                break
+            spec = spec.child(name)
+        return spec
+
+    def get_fields(self):
+        fields = super().get_fields()
+        spec = self.field_spec
+        if spec is None:
+            return fields
+        return {
+            name: field for name, field in fields.items()
+            if spec.selects(name, name in self.expandable_fields)
+        }
+
+    def child_context(self, name):
+        """Context for the serializer a SerializerMethodField builds for ``name``"""
+        spec = self.field_spec
+        return dict(self.context, field_spec=spec.child(name) if spec is not None else None)
+
+
+def _serializer_class(owner, nested):
+    """``expandable_fields`` values may name a class defined later in the owner's module"""
+    if isinstance(nested, str):
+        return getattr(import_module(owner.__module__), nested)
+    return nested
+
+
+def prune(data, serializer_class, spec):
+    """
+    Apply a spec to already serialized data (e.g. cached trees) the way the
+    serializer would have; ``data`` is a dict or a list of dicts
+    """
+    if spec is None:
+        return data
+    if isinstance(data, list):
+        return [prune(item, serializer_class, spec) for item in data]
+
+    expandable = getattr(serializer_class, 'expandable_fields', {})
+    result = {}
+    for name, value in data.items():
+        if not spec.selects(name, name in expandable):
+            continue
+        if name in expandable and value is not None:
+            value = prune(value, _serializer_class(serializer_class, expandable[name]), spec.child(name))
+        result[name] = value
+    return result
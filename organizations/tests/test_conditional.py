@@ -0,0 +1,60 @@
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+from organizations.models import (
+    MainActivity, Organization, Program, StrategicInitiative, StrategicObjective, SubActivity
+)
+from organizations.views import ProgramViewSet
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ObjectiveTreeValidatorTests(TestCase):
+
+    def setUp(self):
+        # Run the objective tree invalidations of the fixtures, as a committed write would
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_fixtures()
+
+    def create_fixtures(self):
+        self.user = User.objects.create_user('reader')
+        organization = Organization.objects.create(name='Desk', type='DESK')
+        self.objective = StrategicObjective.objects.create(title='Objective', weight=Decimal('100'))
+        other_objective = StrategicObjective.objects.create(title='Other', weight=Decimal('0'))
+        Program.objects.create(name='Program', strategic_objective=self.objective)
+        initiative = StrategicInitiative.objects.create(
+            name='Initiative', weight=Decimal('100'), strategic_objective=self.objective
+        )
+        other_initiative = StrategicInitiative.objects.create(
+            name='Other initiative', weight=Decimal('100'), strategic_objective=other_objective
+        )
+        self.main_activity = MainActivity.objects.create(
+            initiative=initiative, organization=organization, name='Activity', weight=Decimal('10')
+        )
+        self.other_main_activity = MainActivity.objects.create(
+            initiative=other_initiative, organization=organization, name='Other activity', weight=Decimal('10')
+        )
+
+    def get(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        request = APIRequestFactory().get('/api/programs/', {'strategic_objective': self.objective.pk}, **headers)
+        force_authenticate(request, self.user)
+        return ProgramViewSet.as_view({'get': 'list'})(request)
+
+    def test_tree_changes_of_served_objectives_change_the_etag(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SubActivity.objects.create(main_activity=self.other_main_activity, name='Elsewhere')
+        self.assertEqual(self.get(etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            SubActivity.objects.create(main_activity=self.main_activity, name='Nested')
+        self.assertEqual(self.get(etag).status_code, 200)
+
+    def test_validators_do_not_scan_the_tree_tables(self):
+        etag = self.get()['ETag']
+        # Served programs, their objectives and the organization context
+        with self.assertNumQueries(3):
+            self.assertEqual(self.get(etag).status_code, 304)
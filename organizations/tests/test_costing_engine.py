@@ -0,0 +1,192 @@
+from decimal import Decimal
+from django.test import SimpleTestCase
+from organizations.costing_engine import CostingError, RateTables, calculate
+
+
+def rates(**tables):
+    defaults = {
+        'locations': [
+            {'id': 1, 'name': 'Adama', 'region': 'Oromia', 'is_hardship_area': False},
+            {'id': 2, 'name': 'Hawassa', 'region': 'Sidama', 'is_hardship_area': False},
+        ],
+        'per_diems': [
+            {'location_id': 1, 'amount': Decimal('1000'), 'hardship_allowance_amount': Decimal('100')},
+            {'location_id': 2, 'amount': Decimal('800'), 'hardship_allowance_amount': None},
+        ],
+    }
+    defaults.update(tables)
+    return RateTables(**defaults)
+
+
+class CalculateTotalBudgetParityTests(SimpleTestCase):
+    """Totals worked out by hand with calculateTotalBudget of each *CostingTool.tsx"""
+
+    def test_training(self):
+        details = {
+            'trainingLocationId': 1,
+            'numberOfDays': 3,
+            'numberOfParticipants': 10,
+            'numberOfSessions': 2,
+            'costMode': 'perdiem',
+            'transportRequired': True,
+            'landTransportRoutes': [{'price': 500, 'participants': 2}],
+            'additionalParticipantCosts': [{'costType': 'FLASH_DISK'}],
+            'additionalSessionCosts': [{'costType': 'MARKER'}],
+            'otherCosts': 1000,
+        }
+        # (1100 * 10 * 3 + 500 * 2 + 10 * 500 + 2 * 150 + 1000) * 2 sessions
+        self.assertEqual(calculate('Training', details, rates())['total'], Decimal('80600.00'))
+
+    def test_meeting_workshop(self):
+        details = {
+            'location': 1,
+            'numberOfDays': 3,
+            'numberOfParticipants': 10,
+            'costMode': 'perdiem',
+            'additionalLocations': [{'locationId': 2, 'participants': 5, 'days': 2}],
+            'additionalParticipantCosts': ['ALL'],
+            'additionalSessionCosts': ['MARKER'],
+            'transportRequired': True,
+            'landTransportParticipants': 3,
+            'airTransportParticipants': 1,
+            'otherCosts': 500,
+        }
+        tables = rates(
+            participant_costs=[
+                {'cost_type': 'FLASH_DISK', 'price': Decimal('500')},
+                {'cost_type': 'STATIONARY', 'price': Decimal('200')},
+                {'cost_type': 'ALL', 'price': Decimal('999')},
+            ],
+            session_costs=[{'cost_type': 'MARKER', 'price': Decimal('150')}],
+        )
+        # 1100 * 10 * 3 + 800 * 5 * 2 + 700 * 15 + 150 + (3 * 1000 + 1 * 5000) + 500
+        self.assertEqual(calculate('Meeting', details, tables)['total'], Decimal('60150.00'))
+
+    def test_supervision(self):
+        details = {
+            'location': 1,
+            'numberOfDays': 4,
+            'numberOfSupervisors': 2,
+            'costMode': 'perdiem',
+            'numberOfSupervisorsWithAdditionalCost': 2,
+            'additionalSupervisorCosts': ['MOBILE_CARD_300'],
+            'landTransportRoutes': [{'price': 700, 'participants': 2}],
+            'transportRequired': True,
+            'landTransportSupervisors': 1,
+            'otherCosts': 250,
+        }
+        tables = rates(
+            supervisor_costs=[{'cost_type': 'MOBILE_CARD_300', 'amount': Decimal('300')}],
+            land_transports=[
+                {'id': 1, 'origin_id': 1, 'destination_id': 2, 'trip_type': 'SINGLE', 'price': Decimal('1000')},
+                {'id': 2, 'origin_id': 2, 'destination_id': 1, 'trip_type': 'SINGLE', 'price': Decimal('2000')},
+            ],
+        )
+        # 1100 * 2 * 4 + 300 * 2 + 700 * 2 + 1 * average land price 1500 + 250
+        self.assertEqual(calculate('Supervision', details, tables)['total'], Decimal('12550.00'))
+
+    def test_printing(self):
+        details = {'documentType': 'Manual', 'numberOfPages': 100, 'numberOfCopies': 10, 'otherCosts': 1000}
+        # DOCUMENT_TYPES: 50 per page for manuals
+        self.assertEqual(calculate('Printing', details, rates())['total'], Decimal('51000.00'))
+
+    def test_procurement(self):
+        details = {'items': [{'itemId': 3, 'quantity': 4}, {'itemId': 99, 'quantity': 1}], 'otherCosts': 100}
+        tables = rates(procurement_items=[{'id': 3, 'unit_price': Decimal('250')}])
+        # Items missing from the catalogue are skipped
+        self.assertEqual(calculate('Procurement', details, tables)['total'], Decimal('1100.00'))
+
+    def test_training_fixed_additional_costs(self):
+        details = {
+            'trainingLocationId': 1,
+            'numberOfParticipants': 2,
+            'numberOfSessions': 3,
+            'additionalParticipantCosts': [{'costType': 'ALL'}, {'costType': 'STATIONARY'}],
+            'additionalSessionCosts': [{'costType': 'ALL'}, {'costType': 'FLIP_CHART'}],
+        }
+        # The training tool ignores the participant and session cost tables
+        tables = rates(
+            participant_costs=[{'cost_type': 'FLASH_DISK', 'price': Decimal('5')}],
+            session_costs=[{'cost_type': 'MARKER', 'price': Decimal('5')}],
+        )
+        # (2 * (700 + 200) + 3 * (1000 + 300)) * 3 sessions
+        self.assertEqual(calculate('Training', details, tables)['total'], Decimal('17100.00'))
+
+    def test_training_per_diem_fallbacks(self):
+        tables = rates(
+            locations=[
+                {'id': 1, 'name': 'Semera', 'region': 'Afar', 'is_hardship_area': True},
+                {'id': 2, 'name': 'Jinka', 'region': 'South', 'is_hardship_area': True},
+            ],
+            per_diems=[
+                {'location_id': 1, 'amount': Decimal('1000'), 'hardship_allowance_amount': None},
+                {'location_id': 2, 'amount': Decimal('0'), 'hardship_allowance_amount': None},
+            ],
+        )
+        details = {
+            'trainingLocationId': 1,
+            'numberOfDays': 1,
+            'numberOfParticipants': 1,
+            'numberOfSessions': 1,
+            'additionalSessionCosts': [{'costType': 'ALL'}],
+        }
+        # A null hardship amount at a hardship location is 200; 'ALL' sessions cost 1000
+        self.assertEqual(calculate('Training', details, tables)['total'], Decimal('2200.00'))
+
+        details = {'trainingLocationId': 2, 'numberOfDays': 1, 'numberOfParticipants': 1}
+        # A zero amount falls back to 1200
+        self.assertEqual(calculate('Training', details, tables)['total'], Decimal('1400.00'))
+
+        details['additionalLocations'] = [{'locationId': 1, 'participants': 1, 'days': 1}]
+        # Additional locations have no column fallbacks: 1400 + 1000
+        self.assertEqual(calculate('Training', details, tables)['total'], Decimal('2400.00'))
+
+    def test_meeting_without_main_location_rates(self):
+        details = {
+            'location': 2,
+            'numberOfDays': 1,
+            'numberOfParticipants': 1,
+            'costMode': 'perdiem',
+            'additionalLocations': [{'locationId': 1, 'participants': 1, 'days': 1}, {'participants': 2}],
+            'additionalParticipantCosts': ['FLASH_DISK'],
+        }
+        tables = rates(
+            per_diems=[{'location_id': 1, 'amount': Decimal('1000'), 'hardship_allowance_amount': None}],
+            participant_costs=[{'cost_type': 'FLASH_DISK', 'price': Decimal('500')}],
+        )
+        # No per diem anywhere without a main location row; participants of every additional location count
+        self.assertEqual(calculate('Meeting', details, tables)['total'], Decimal('2000.00'))
+
+    def test_printing_ignores_unknown_document_types(self):
+        details = {'documentType': 'MANUAL', 'numberOfPages': 100, 'numberOfCopies': 10}
+        self.assertEqual(calculate('Printing', details, rates())['total'], Decimal('0.00'))
+
+    def test_procurement_without_catalogue(self):
+        details = {'items': [{'itemId': 3, 'quantity': 4}], 'otherCosts': 100}
+        self.assertEqual(calculate('Procurement', details, rates())['total'], Decimal('0.00'))
+
+
+class MalformedDetailsTests(SimpleTestCase):
+
+    def test_non_dict_routes_are_skipped(self):
+        details = {'location': 1, 'landTransportRoutes': [1, 'x'], 'airTransportRoutes': 5}
+        self.assertEqual(calculate('Supervision', details, rates())['total'], Decimal('0.00'))
+
+    def test_unhashable_cost_types_are_ignored(self):
+        details = {
+            'location': 1,
+            'numberOfSupervisorsWithAdditionalCost': 1,
+            'additionalSupervisorCosts': [['a'], {'costType': ['b']}],
+        }
+        self.assertEqual(calculate('Supervision', details, rates())['total'], Decimal('0.00'))
+
+    def test_non_finite_numbers_count_as_missing(self):
+        for value in ('Infinity', 'NaN', '-inf', float('inf')):
+            details = {'documentType': 'Manual', 'numberOfPages': value, 'numberOfCopies': 2, 'otherCosts': 10}
+            self.assertEqual(calculate('Printing', details, rates())['total'], Decimal('10.00'))
+
+    def test_remaining_failures_are_costing_errors(self):
+        with self.assertRaises(CostingError):
+            calculate('Training', {'trainingLocationId': 1, 'costMode': 'accommodation', 'selectedAccommodationType': ['BED']}, rates())
+        with self.assertRaises(CostingError):
+            calculate(['Training'], {}, rates())
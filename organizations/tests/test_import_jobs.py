@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from django.test import TestCase
+from django.utils import timezone
+from organizations.import_jobs import MAX_ATTEMPTS, claim_next_job, run_job
+from organizations.models import ImportJob, ProcurementItem
+
+
+class ImportJobTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def job(self, rows=5, **fields):
+        """A procurement import of ``rows`` new items, read two rows per chunk"""
+        file_path = os.path.join(self.directory, f'items-{ImportJob.objects.count()}.csv')
+        with open(file_path, 'w') as csv_file:
+            csv_file.write('category,name,unit,unit_price\n')
+            for number in range(1, rows + 1):
+                csv_file.write(f'STATIONERY,Item {number},PIECE,{number * 10}\n')
+        return ImportJob.objects.create(
+            kind='PROCUREMENT_ITEMS', file_path=file_path, original_filename='items.csv',
+            options={'mode': 'insert', 'chunk_size': 2}, **fields
+        )
+
+
+class ClaimNextJobTests(ImportJobTestCase):
+
+    def test_claims_pending_jobs_oldest_first(self):
+        first, second = self.job(), self.job()
+
+        claimed = claim_next_job('worker-1')
+        self.assertEqual(claimed.pk, first.pk)
+        self.assertEqual((claimed.status, claimed.worker, claimed.attempts), ('RUNNING', 'worker-1', 1))
+        self.assertEqual(claim_next_job('worker-2').pk, second.pk)
+        self.assertIsNone(claim_next_job('worker-3'))
+
+    def test_running_job_is_taken_over_only_when_stale(self):
+        job = self.job(status='RUNNING', worker='worker-1', attempts=1, heartbeat_at=timezone.now())
+        self.assertIsNone(claim_next_job('worker-2', stale_after=300))
+
+        ImportJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(seconds=600))
+        claimed = claim_next_job('worker-2', stale_after=300)
+        self.assertEqual((claimed.pk, claimed.worker, claimed.attempts), (job.pk, 'worker-2', 2))
+
+    def test_gives_up_after_max_attempts(self):
+        exhausted = self.job(
+            status='RUNNING', worker='worker-1', attempts=MAX_ATTEMPTS,
+            heartbeat_at=timezone.now() - timedelta(hours=1),
+        )
+        pending = self.job()
+
+        self.assertEqual(claim_next_job('worker-2', stale_after=300).pk, pending.pk)
+        exhausted.refresh_from_db()
+        self.assertEqual(exhausted.status, 'FAILED')
+        self.assertIsNotNone(exhausted.finished_at)
+
+
+class RunJobTests(ImportJobTestCase):
+
+    def test_runs_all_chunks(self):
+        self.job()
+        job = run_job(claim_next_job('worker-1'))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'COMPLETED')
+        self.assertEqual((job.chunks_completed, job.rows_processed, job.rows_imported), (3, 5, 5))
+        self.assertEqual(ProcurementItem.objects.count(), 5)
+        self.assertFalse(os.path.exists(job.file_path))
+
+    def test_resumes_after_the_last_checkpoint(self):
+        # A worker committed the first chunk (items 1 and 2), then died
+        ProcurementItem.objects.bulk_create([
+            ProcurementItem(category='STATIONERY', name=f'Item {number}', unit='PIECE', unit_price=number * 10)
+            for number in (1, 2)
+        ])
+        job = self.job(
+            status='RUNNING', worker='worker-1', attempts=1, heartbeat_at=timezone.now() - timedelta(hours=1),
+            chunks_completed=1, rows_processed=2, rows_imported=2,
+        )
+
+        claimed = claim_next_job('worker-2', stale_after=300)
+        self.assertEqual(claimed.pk, job.pk)
+        run_job(claimed)
+
+        job.refresh_from_db()
+        # Inserting the first chunk again would have failed on the existing items
+        self.assertEqual((job.status, job.error_count), ('COMPLETED', 0))
+        self.assertEqual((job.chunks_completed, job.rows_processed, job.rows_imported), (3, 5, 5))
+        self.assertEqual(
+            sorted(ProcurementItem.objects.values_list('name', flat=True)),
+            [f'Item {number}' for number in range(1, 6)],
+        )
+
+    def test_stops_when_another_worker_took_over(self):
+        self.job()
+        claimed = claim_next_job('worker-1')
+        ImportJob.objects.filter(pk=claimed.pk).update(worker='worker-2')
+
+        run_job(claimed)
+
+        # The chunk whose checkpoint could not be saved was rolled back with it
+        self.assertFalse(ProcurementItem.objects.exists())
+        job = ImportJob.objects.get(pk=claimed.pk)
+        self.assertEqual((job.status, job.worker, job.chunks_completed), ('RUNNING', 'worker-2', 0))
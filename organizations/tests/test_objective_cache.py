@@ -0,0 +1,29 @@
+from django.db import connection, transaction
+from django.test import TestCase
+from organizations import objective_cache
+
+
+class FlushSchedulingTests(TestCase):
+
+    def flush_callbacks(self):
+        return [entry for entry in connection.run_on_commit if entry[1] is objective_cache._flush]
+
+    def test_one_callback_per_transaction(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            for objective_id in range(50):
+                objective_cache.mark_changed({(objective_id, None)})
+            objective_cache.invalidate_main_activities([1, 2])
+        self.assertEqual(len(callbacks), 1)
+
+    def test_rolled_back_callback_is_registered_again(self):
+        with self.captureOnCommitCallbacks():
+            try:
+                with transaction.atomic():
+                    objective_cache.mark_changed({(1, None)})
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.assertEqual(self.flush_callbacks(), [])
+
+            objective_cache.mark_changed({(2, None)})
+            self.assertEqual(len(self.flush_callbacks()), 1)
@@ -0,0 +1,66 @@
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from organizations import org_hierarchy
+from organizations.models import Organization, OrganizationClosure
+
+
+class ClosureMaintenanceTests(TestCase):
+    """The signals keep OrganizationClosure equal to a rebuild from the parent links"""
+
+    def setUp(self):
+        # ministry -> executive -> team -> desk, and a second executive
+        self.ministry = Organization.objects.create(name='Ministry', type='MINISTER')
+        self.executive = Organization.objects.create(name='Executive', type='EXECUTIVE', parent=self.ministry)
+        self.team = Organization.objects.create(name='Team', type='TEAM_LEAD', parent=self.executive)
+        self.desk = Organization.objects.create(name='Desk', type='DESK', parent=self.team)
+        self.other = Organization.objects.create(name='Other', type='EXECUTIVE', parent=self.ministry)
+
+    def assertClosureConsistent(self):
+        result = org_hierarchy.rebuild_closure(dry_run=True)
+        self.assertEqual((result['missing'], result['stale']), (0, 0))
+
+    def descendants(self, organization):
+        return set(Organization.objects.descendants_of(organization.pk).values_list('name', flat=True))
+
+    def depth(self, ancestor, descendant):
+        return OrganizationClosure.objects.get(ancestor=ancestor, descendant=descendant).depth
+
+    def test_insert(self):
+        self.assertClosureConsistent()
+        self.assertEqual(self.descendants(self.executive), {'Executive', 'Team', 'Desk'})
+        self.assertEqual(self.depth(self.ministry, self.desk), 3)
+
+    def test_move_subtree(self):
+        self.team.parent = self.other
+        self.team.save()
+
+        self.assertClosureConsistent()
+        self.assertEqual(self.descendants(self.executive), {'Executive'})
+        self.assertEqual(self.descendants(self.other), {'Other', 'Team', 'Desk'})
+        self.assertEqual(self.depth(self.ministry, self.desk), 3)
+
+    def test_move_to_root_and_back(self):
+        self.team.parent = None
+        self.team.save()
+        self.assertClosureConsistent()
+        self.assertEqual(self.descendants(self.ministry), {'Ministry', 'Executive', 'Other'})
+
+        self.desk.parent = self.ministry
+        self.desk.save()
+        self.assertClosureConsistent()
+        self.assertEqual(self.depth(self.ministry, self.desk), 1)
+
+    def test_move_under_own_descendant_is_rejected(self):
+        self.executive.parent = self.desk
+        with self.assertRaises(ValidationError):
+            self.executive.save()
+        self.assertClosureConsistent()
+
+    def test_delete_detaches_children(self):
+        self.executive.delete()
+
+        self.assertClosureConsistent()
+        self.team.refresh_from_db()
+        self.assertIsNone(self.team.parent_id)
+        self.assertEqual(self.descendants(self.ministry), {'Ministry', 'Other'})
+        self.assertEqual(self.descendants(self.team), {'Team', 'Desk'})
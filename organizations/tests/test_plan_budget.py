@@ -0,0 +1,30 @@
+from django.db import connection, transaction
+from django.test import TestCase
+from organizations import plan_budget
+
+
+class FlushSchedulingTests(TestCase):
+
+    def flush_callbacks(self):
+        return [entry for entry in connection.run_on_commit if entry[1] is plan_budget._flush]
+
+    def test_one_callback_per_transaction(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            for initiative_id in range(50):
+                plan_budget.mark_dirty(None, initiative_id)
+            plan_budget.mark_plan_dirty(1)
+            plan_budget.mark_main_activities_dirty([1, 2])
+        self.assertEqual(len(callbacks), 1)
+
+    def test_rolled_back_callback_is_registered_again(self):
+        with self.captureOnCommitCallbacks():
+            try:
+                with transaction.atomic():
+                    plan_budget.mark_plan_dirty(1)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            self.assertEqual(self.flush_callbacks(), [])
+
+            plan_budget.mark_dirty(None, 1)
+            self.assertEqual(len(self.flush_callbacks()), 1)
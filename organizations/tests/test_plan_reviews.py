@@ -0,0 +1,98 @@
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import User
+from django.test import TestCase
+from organizations.models import Organization, OrganizationUser, Plan, PlanReview, StrategicObjective
+from organizations.plan_reviews import bulk_review
+
+
+class BulkReviewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        ministry = Organization.objects.create(name='Ministry', type='MINISTER')
+        cls.desk_a = Organization.objects.create(name='Desk A', type='DESK', parent=ministry)
+        cls.desk_b = Organization.objects.create(name='Desk B', type='DESK', parent=ministry)
+        cls.objective = StrategicObjective.objects.create(title='Objective', weight=Decimal('100'))
+        cls.evaluator = OrganizationUser.objects.create(
+            user=User.objects.create_user('evaluator'), organization=ministry, role='EVALUATOR'
+        )
+
+    def plan(self, organization, status='SUBMITTED', fiscal_year='2025'):
+        # bulk_create skips Plan.clean, so tests can set up competing submissions
+        plan, = Plan.objects.bulk_create([Plan(
+            organization=organization, planner_name='Planner', type='LEO/EO Plan',
+            strategic_objective=self.objective, fiscal_year=fiscal_year,
+            from_date=date(2024, 7, 1), to_date=date(2025, 6, 30), status=status,
+        )])
+        return plan
+
+    def review(self, decisions, visible_plans=None):
+        if visible_plans is None:
+            visible_plans = Plan.objects.all()
+        return bulk_review(decisions, self.evaluator, visible_plans)
+
+    def statuses(self, *plans):
+        return [Plan.objects.get(pk=plan.pk).status for plan in plans]
+
+    def test_mixed_batch(self):
+        approved, rejected = self.plan(self.desk_a), self.plan(self.desk_b)
+        results = self.review([(approved.pk, 'APPROVED', 'Good'), (rejected.pk, 'REJECTED', 'Redo')])
+
+        self.assertEqual([result['status'] for result in results], ['APPROVED', 'REJECTED'])
+        self.assertEqual(self.statuses(approved, rejected), ['APPROVED', 'REJECTED'])
+        self.assertEqual(
+            set(PlanReview.objects.values_list('plan_id', 'status', 'feedback', 'evaluator_id')),
+            {(approved.pk, 'APPROVED', 'Good', self.evaluator.pk), (rejected.pk, 'REJECTED', 'Redo', self.evaluator.pk)},
+        )
+
+    def test_same_organization_and_fiscal_year(self):
+        first, second = self.plan(self.desk_a), self.plan(self.desk_a)
+        results = self.review([(first.pk, 'APPROVED', ''), (second.pk, 'APPROVED', '')])
+
+        # Each blocks the other, as Plan.clean would
+        self.assertEqual([result['status'] for result in results], ['ERROR', 'ERROR'])
+        self.assertEqual(self.statuses(first, second), ['SUBMITTED', 'SUBMITTED'])
+        self.assertFalse(PlanReview.objects.exists())
+
+        # A plan rejected in the same batch no longer competes
+        results = self.review([(first.pk, 'APPROVED', ''), (second.pk, 'REJECTED', '')])
+        self.assertEqual([result['status'] for result in results], ['APPROVED', 'REJECTED'])
+        self.assertEqual(self.statuses(first, second), ['APPROVED', 'REJECTED'])
+
+    def test_plan_listed_twice(self):
+        plan = self.plan(self.desk_a)
+        results = self.review([(plan.pk, 'APPROVED', ''), (plan.pk, 'REJECTED', '')])
+
+        self.assertEqual(results[0]['status'], 'APPROVED')
+        self.assertEqual(results[1], {'plan': plan.pk, 'status': 'ERROR', 'error': 'Plan listed more than once'})
+        self.assertEqual(self.statuses(plan), ['APPROVED'])
+        self.assertEqual(PlanReview.objects.count(), 1)
+
+    def test_plan_outside_visible_plans(self):
+        visible, hidden = self.plan(self.desk_a), self.plan(self.desk_b)
+        results = self.review(
+            [(visible.pk, 'APPROVED', ''), (hidden.pk, 'APPROVED', '')],
+            visible_plans=Plan.objects.filter(organization=self.desk_a),
+        )
+
+        self.assertEqual(results[0]['status'], 'APPROVED')
+        self.assertEqual(results[1], {'plan': hidden.pk, 'status': 'ERROR', 'error': 'Plan not found'})
+        self.assertEqual(self.statuses(visible, hidden), ['APPROVED', 'SUBMITTED'])
+
+    def test_only_submitted_plans(self):
+        draft, approved = self.plan(self.desk_a, 'DRAFT'), self.plan(self.desk_b, 'APPROVED')
+        results = self.review([(draft.pk, 'APPROVED', ''), (approved.pk, 'REJECTED', '')])
+
+        self.assertEqual([result['status'] for result in results], ['ERROR', 'ERROR'])
+        self.assertIn('status is DRAFT', results[0]['error'])
+        self.assertEqual(self.statuses(draft, approved), ['DRAFT', 'APPROVED'])
+        self.assertFalse(PlanReview.objects.exists())
+
+    def test_fixed_number_of_queries(self):
+        decisions = [(self.plan(organization, fiscal_year=str(year)).pk, 'APPROVED', '')
+                     for organization in (self.desk_a, self.desk_b) for year in range(2020, 2025)]
+        # visible IDs, lock, competing plans, reviews INSERT, status UPDATE, savepoint and release
+        with self.assertNumQueries(7):
+            results = self.review(decisions)
+        self.assertEqual({result['status'] for result in results}, {'APPROVED'})
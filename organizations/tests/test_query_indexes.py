@@ -0,0 +1,62 @@
+from datetime import date
+from decimal import Decimal
+from django.db import connection
+from django.test import TestCase
+from organizations.management.commands.check_query_indexes import run_query_checks
+from organizations.models import (
+    ActivityBudget, MainActivity, Organization, PerformanceMeasure, Plan, StrategicInitiative,
+    StrategicObjective, SubActivity
+)
+
+
+class HotQueryIndexTests(TestCase):
+    """The hot filter queries keep using their indexes on a realistically shaped database"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Planners prefer table scans on nearly empty tables; bulk_create skips the signals
+        organizations = Organization.objects.bulk_create([
+            Organization(name=f'Desk {i}', type='DESK') for i in range(40)
+        ])
+        objective = StrategicObjective.objects.create(title='Objective', weight=Decimal('100'))
+        initiatives = StrategicInitiative.objects.bulk_create([
+            StrategicInitiative(name=f'Initiative {i}', weight=Decimal('1'), strategic_objective=objective)
+            for i in range(100)
+        ])
+
+        measures = []
+        activities = []
+        for initiative in initiatives:
+            for organization in organizations[:10] + [None]:
+                measures.append(PerformanceMeasure(
+                    initiative=initiative, organization=organization, name='Measure', weight=Decimal('1')
+                ))
+                activities.append(MainActivity(
+                    initiative=initiative, organization=organization, name='Activity', weight=Decimal('1')
+                ))
+        PerformanceMeasure.objects.bulk_create(measures)
+        activities = MainActivity.objects.bulk_create(activities)
+
+        sub_activities = SubActivity.objects.bulk_create([
+            SubActivity(main_activity=activity, name=f'Sub-activity {i}', activity_type='Training')
+            for activity in activities[:500] for i in range(3)
+        ])
+        ActivityBudget.objects.bulk_create([ActivityBudget(sub_activity=sub_activity) for sub_activity in sub_activities])
+
+        statuses = ['DRAFT', 'SUBMITTED', 'APPROVED', 'REJECTED']
+        Plan.objects.bulk_create([
+            Plan(
+                organization=organization, planner_name='Planner', type='LEO/EO Plan',
+                strategic_objective=objective, fiscal_year=str(year),
+                from_date=date(year, 1, 1), to_date=date(year, 12, 31), status=statuses[(index + year) % 4],
+            )
+            for index, organization in enumerate(organizations) for year in range(2015, 2026)
+        ])
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_hot_queries_use_their_indexes(self):
+        for description, queryset, plan, indexes, used in run_query_checks():
+            with self.subTest(description):
+                self.assertTrue(used, f'expected one of {sorted(indexes)}:\n{queryset.query}\n{plan}')
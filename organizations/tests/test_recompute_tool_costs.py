@@ -0,0 +1,59 @@
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from organizations.costing_engine import recompute_sub_activity_costs
+from organizations.models import (
+    Location, MainActivity, Organization, PerDiem, StrategicInitiative, StrategicObjective, SubActivity
+)
+
+
+class RecomputeToolCostsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        organization = Organization.objects.create(name='Desk', type='DESK')
+        objective = StrategicObjective.objects.create(title='Objective', weight=Decimal('100'))
+        initiative = StrategicInitiative.objects.create(
+            name='Initiative', weight=Decimal('100'), strategic_objective=objective
+        )
+        main_activity = MainActivity.objects.create(
+            initiative=initiative, organization=organization, name='Activity', weight=Decimal('10')
+        )
+        semera = Location.objects.create(name='Semera', region='Afar', is_hardship_area=True)
+        PerDiem.objects.create(location=semera, amount=Decimal('1000'), hardship_allowance_amount=0)
+
+        # Saved by TrainingCostingTool: (1200 * 10 * 3 + 10 * 700 + 2 * 1000) * 2 sessions
+        cls.sub_activity = SubActivity.objects.create(
+            main_activity=main_activity,
+            name='Training',
+            activity_type='Training',
+            budget_calculation_type='WITH_TOOL',
+            estimated_cost_with_tool=Decimal('90000.00'),
+            training_details={
+                'trainingLocationId': semera.id,
+                'numberOfDays': 3,
+                'numberOfParticipants': 10,
+                'numberOfSessions': 2,
+                'costMode': 'perdiem',
+                'additionalParticipantCosts': [{'costType': 'ALL'}],
+                'additionalSessionCosts': [{'costType': 'ALL'}],
+                'transportRequired': False,
+            },
+        )
+
+    def test_browser_saved_cost_is_unchanged(self):
+        summary = recompute_sub_activity_costs(dry_run=False)
+        self.assertEqual((summary['scanned'], summary['changed'], summary['skipped']), (1, 0, 0))
+        self.sub_activity.refresh_from_db()
+        self.assertEqual(self.sub_activity.estimated_cost_with_tool, Decimal('90000.00'))
+
+    def test_command_only_reports_without_apply(self):
+        SubActivity.objects.filter(pk=self.sub_activity.pk).update(estimated_cost_with_tool=Decimal('1.00'))
+        call_command('recompute_tool_costs', stdout=StringIO())
+        self.sub_activity.refresh_from_db()
+        self.assertEqual(self.sub_activity.estimated_cost_with_tool, Decimal('1.00'))
+
+        call_command('recompute_tool_costs', '--apply', stdout=StringIO())
+        self.sub_activity.refresh_from_db()
+        self.assertEqual(self.sub_activity.estimated_cost_with_tool, Decimal('90000.00'))
@@ -10,7 +10,7 @@ from .views import (
     LocationViewSet, LandTransportViewSet, AirTransportViewSet,
     PerDiemViewSet, AccommodationViewSet, ParticipantCostViewSet,
     SessionCostViewSet, PrintingCostViewSet, SupervisorCostViewSet,
-    ProcurementItemViewSet,login_view, logout_view, check_auth,
+    ProcurementItemViewSet, DashboardViewSet, CostingViewSet, ImportJobViewSet, login_view, logout_view, check_auth,
     update_profile, password_change)
 from django.views.decorators.csrf import ensure_csrf_cookie, csrf_protect
 from django.http import JsonResponse
@@ -37,6 +37,9 @@ router.register(r'session-costs', SessionCostViewSet)
 router.register(r'printing-costs', PrintingCostViewSet)
 router.register(r'supervisor-costs', SupervisorCostViewSet)
 router.register(r'procurement-items', ProcurementItemViewSet)
+router.register(r'dashboard', DashboardViewSet, basename='dashboard')
+router.register(r'costing', CostingViewSet, basename='costing')
+router.register(r'import-jobs', ImportJobViewSet)
 # router.register(r'bulk-procurement-item-upload', BulkProcurementItemUploadView)
 
 
@@ -1,10 +1,11 @@
+from django.conf import settings
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
-from django.http import JsonResponse
+from django.http import JsonResponse, FileResponse
 from django.views.decorators.csrf import ensure_csrf_cookie, csrf_protect
 from django.db import transaction
-from django.db.models import Sum, Q
+from django.db.models import Sum, Q, Prefetch
 import json
 import traceback
 import logging
@@ -23,7 +24,7 @@ from .models import (
     ActivityBudget, SubActivity, ActivityCostingAssumption,InitiativeFeed,
     Plan, PlanReview,Location, LandTransport, AirTransport,
     PerDiem, Accommodation, ParticipantCost, SessionCost,
-    PrintingCost, SupervisorCost, ProcurementItem
+    PrintingCost, SupervisorCost, ProcurementItem, ImportJob
 )
 from .serializers import (
     OrganizationSerializer, OrganizationUserSerializer, UserSerializer,
@@ -33,8 +34,24 @@ from .serializers import (
     PlanSerializer, PlanReviewSerializer,LocationSerializer, LandTransportSerializer,
     AirTransportSerializer, PerDiemSerializer, AccommodationSerializer,
     ParticipantCostSerializer, SessionCostSerializer, PrintingCostSerializer,
-    SupervisorCostSerializer,ProcurementItemSerializer
+    SupervisorCostSerializer,ProcurementItemSerializer, ImportJobSerializer
 )
+from .plan_tree import initiative_tree_queryset, initiative_children
+from .sparse_fields import field_spec_for, prune
+from .objective_cache import get_objective_trees
+from .middleware import get_organization_context
+from .conditional import ConditionalGetMixin
+from .pagination import OptInCursorPagination
+from .dashboard import dashboard_stats
+from .rollup import organization_rollup
+from .import_jobs import enqueue_import
+from .plan_budget import plan_budget_summary, plan_objective_ids, SUMMARY_FIELDS
+from .plan_export import write_plans_workbook
+from .plan_pdf import open_plan_pdf
+from .plan_reviews import BulkReviewError, bulk_review, parse_decisions
+from .costing_reference import get_reference_data
+from .costing_engine import RateTables, CostingError, calculate as calculate_cost, calculate_sub_activity
+from django.utils.http import parse_etags, quote_etag
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -234,6 +251,15 @@ class OrganizationViewSet(viewsets.ModelViewSet):
             logger.exception("Error in OrganizationViewSet.retrieve")
             return Response({"error": str(e)}, status=500)
 
+    @action(detail=True, methods=['get'])
+    def descendants(self, request, pk=None):
+        """The organization's whole subtree. Pass ?include_self=false to leave it out"""
+        organization = self.get_object()
+        include_self = request.query_params.get('include_self', 'true').lower() != 'false'
+        queryset = Organization.objects.descendants_of(organization, include_self=include_self).order_by('id')
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
     def get_queryset(self):
         try:
             logger.info("Fetching all organizations in get_queryset")
@@ -253,7 +279,8 @@ class OrganizationViewSet(viewsets.ModelViewSet):
             partial = kwargs.pop('partial', False)
             instance = self.get_object()
             serializer = self.get_serializer(instance, data=request.data, partial=partial)
-            serializer.is_valid(raise_exception=True)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
             self.perform_update(serializer)
 
             # Explicitly log the data being saved
@@ -268,10 +295,11 @@ class OrganizationUserViewSet(viewsets.ModelViewSet):
     queryset = OrganizationUser.objects.all()
     serializer_class = OrganizationUserSerializer
     permission_classes = [IsAuthenticated]
-class InitiativeFeedViewSet(viewsets.ModelViewSet):
+class InitiativeFeedViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = InitiativeFeed.objects.filter(is_active=True).select_related('strategic_objective').order_by('name')
     serializer_class = InitiativeFeedSerializer
     permission_classes = [IsAuthenticated]
+    conditional_dependencies = [(StrategicObjective, 'strategic_objective')]
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -304,34 +332,49 @@ class InitiativeFeedViewSet(viewsets.ModelViewSet):
         print(console_log_message)
 
         return queryset
-class StrategicObjectiveViewSet(viewsets.ModelViewSet):
+class StrategicObjectiveViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = StrategicObjective.objects.all()
     serializer_class = StrategicObjectiveSerializer
     permission_classes = [IsAuthenticated]
+    conditional_objective_fields = ['pk']
 
     def get_queryset(self):
         """
         Ensure we always return objectives with proper error handling
         """
         try:
-            queryset = StrategicObjective.objects.all().order_by('id')
-            return queryset
+            # list and retrieve serve the nested trees from objective_cache, built with
+            # objective_tree_queryset and scoped to the user's organization
+            return StrategicObjective.objects.all().order_by('id')
         except Exception as e:
             print(f"Error in StrategicObjectiveViewSet.get_queryset: {e}")
             return StrategicObjective.objects.none()
 
+    def _objective_data(self, request, objectives):
+        """
+        Flat objectives when no nested children were requested, otherwise the cached
+        trees trimmed to the requested ?fields= / ?expand=
+        """
+        spec = field_spec_for(request, self)
+        if spec.selects('programs', expandable=True) or spec.selects('initiatives', expandable=True):
+            scope = get_organization_context(request).primary_scope
+            return prune(get_objective_trees(objectives, scope), StrategicObjectiveSerializer, spec)
+        if hasattr(objectives, 'with_weight_totals'):
+            objectives = objectives.with_weight_totals()
+        return self.get_serializer(objectives, many=True).data
+
     def list(self, request, *args, **kwargs):
         """
         Override list method to ensure proper error handling and response format
         """
         try:
-            queryset = self.get_queryset()
-            serializer = self.get_serializer(queryset, many=True)
+            queryset = self.filter_queryset(self.get_queryset())
+            data = self._objective_data(request, queryset)
 
             # Ensure we return data in expected format
             return Response({
-                'data': serializer.data,
-                'count': len(serializer.data)
+                'data': data,
+                'count': len(data)
             })
         except Exception as e:
             print(f"Error in StrategicObjectiveViewSet.list: {e}")
@@ -346,8 +389,7 @@ class StrategicObjectiveViewSet(viewsets.ModelViewSet):
         """
         try:
             instance = self.get_object()
-            serializer = self.get_serializer(instance)
-            return Response(serializer.data)
+            return Response(self._objective_data(request, [instance])[0])
         except Exception as e:
             print(f"Error in StrategicObjectiveViewSet.retrieve: {e}")
             return Response({
@@ -387,10 +429,7 @@ class StrategicObjectiveViewSet(viewsets.ModelViewSet):
             logger.info(f"Update data: {request.data}")
 
             # Determine if this is a planner updating a default objective
-            user_is_planner = OrganizationUser.objects.filter(
-                user=request.user,
-                role='PLANNER'
-            ).exists()
+            user_is_planner = get_organization_context(request).has_role('PLANNER')
 
             # If a planner is updating weight for a default objective, set planner_weight
             if user_is_planner and instance.is_default and 'weight' in request.data:
@@ -477,26 +516,29 @@ class StrategicObjectiveViewSet(viewsets.ModelViewSet):
                 'is_valid': False
             }, status=status.HTTP_400_BAD_REQUEST)
 
-class ProgramViewSet(viewsets.ModelViewSet):
+class ProgramViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Program.objects.all()
     serializer_class = ProgramSerializer
     permission_classes = [IsAuthenticated]
+    conditional_objective_fields = ['strategic_objective']
 
     def get_queryset(self):
         queryset = super().get_queryset()
 
-        # Get current user's organization for filtering
-        user_org = None
-        if self.request.user.is_authenticated:
-            user_org_instance = self.request.user.organization_users.first()
-            if user_org_instance:
-                user_org = user_org_instance.organization_id
-
         # Filter by strategic objective if provided
         strategic_objective_id = self.request.query_params.get('strategic_objective')
         if strategic_objective_id:
             queryset = queryset.filter(strategic_objective_id=strategic_objective_id)
 
+        if self.action in ('list', 'retrieve'):
+            queryset = queryset.select_related('strategic_objective')
+            # Prefetch the initiative trees only when the response includes them
+            spec = field_spec_for(self.request, self)
+            if spec.selects('initiatives', expandable=True):
+                scope = get_organization_context(self.request).primary_scope
+                initiatives = initiative_tree_queryset(scope, **initiative_children(spec.child('initiatives')))
+                queryset = queryset.prefetch_related(Prefetch('initiatives', queryset=initiatives))
+
         return queryset
 
 class StrategicInitiativeViewSet(viewsets.ModelViewSet):
@@ -506,7 +548,17 @@ class StrategicInitiativeViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         queryset = super().get_queryset()
-            user_organizations = []
+
+        # Get the user's organizations
+        organization_context = get_organization_context(self.request)
+        user_organizations = organization_context.organization_ids
+
+        if self.action in ('list', 'retrieve'):
+            # Annotate weight totals and prefetch the children the response includes, scoped like the serializer
+            queryset = initiative_tree_queryset(
+                organization_context.primary_scope, queryset,
+                **initiative_children(field_spec_for(self.request, self))
+            )
 
         # Filter based on query parameters
         strategic_objective = self.request.query_params.get('objective')
@@ -518,8 +570,16 @@ class StrategicInitiativeViewSet(viewsets.ModelViewSet):
         elif program:
             base_query = queryset.filter(program_id=program)
         else:
-        # ADMIN FIX: Don't filter by organization for admin viewing
-        # Return all initiatives
+            # ADMIN FIX: Don't filter by organization for admin viewing
+            # Return all initiatives
+            return queryset
+
+        # Return default initiatives OR custom initiatives from the user's organizations
+        return base_query.filter(
+            Q(is_default=True) |
+            Q(organization__isnull=True) |
+            Q(organization_id__in=user_organizations)
+        )
 
     def perform_create(self, serializer):
         # Get the organization_id from the request data
@@ -533,9 +593,7 @@ class StrategicInitiativeViewSet(viewsets.ModelViewSet):
 
         # If no organization_id was provided, try to get the user's primary organization
         if not organization_id:
-            user_org = OrganizationUser.objects.filter(user=self.request.user).first()
-            if user_org:
-                organization_id = user_org.organization_id
+            organization_id = get_organization_context(self.request).primary_organization_id
 
         # Set is_default=False and organization_id when created by a planner
         if not serializer.validated_data.get('is_default', True) and organization_id:
@@ -680,10 +738,7 @@ class PerformanceMeasureViewSet(viewsets.ModelViewSet):
         queryset = super().get_queryset()
 
         # Get the user's organizations
-        if self.request.user.is_authenticated:
-            user_organizations = OrganizationUser.objects.filter(user=self.request.user).values_list('organization_id', flat=True)
-        else:
-            user_organizations = []
+        user_organizations = get_organization_context(self.request).organization_ids
 
         # Filter by initiative if provided
         initiative_id = self.request.query_params.get('initiative')
@@ -705,9 +760,7 @@ class PerformanceMeasureViewSet(viewsets.ModelViewSet):
 
         # If no organization_id was provided, try to get the user's primary organization
         if not organization_id:
-            user_org = OrganizationUser.objects.filter(user=self.request.user).first()
-            if user_org:
-                organization_id = user_org.organization_id
+            organization_id = get_organization_context(self.request).primary_organization_id
 
         # Save with the organization ID
         serializer.save(organization_id=organization_id)
@@ -982,21 +1035,8 @@ class MainActivityViewSet(viewsets.ModelViewSet):
     queryset = MainActivity.objects.all()
     serializer_class = MainActivitySerializer
     permission_classes = [IsAuthenticated]
-    
-    def destroy(self, request, *args, **kwargs):
-        """Custom delete method with proper constraint handling"""
-        try:
-            instance = self.get_object()
-            
-            # Log the deletion attempt
-            print(f"Attempting to delete main activity: {instance.id} ({instance.name})")
-            
-            with transaction.atomic():
-                # Get all sub-activities for this main activity
-                sub_activities = instance.sub_activities.all()
-                print(f"Found {sub_activities.count()} sub-activities to delete")
-                
-                # Delete all sub-activities (which will cascade to their budgets)
+    pagination_class = OptInCursorPagination
+
     @transaction.atomic
     def destroy(self, request, *args, **kwargs):
         """
@@ -1004,33 +1044,17 @@ class MainActivityViewSet(viewsets.ModelViewSet):
         """
         try:
             instance = self.get_object()
-            instance_name = instance.name
-            
-            print(f"MainActivityViewSet: Starting delete for main activity {instance.id} ({instance_name})")
-            
-            # Use the model's custom delete method which handles cascades
-            instance.delete()
-                # Get sub-activities count for logging
-                sub_activities = list(instance.sub_activities.all())
-                sub_activity_count = len(sub_activities)
-                
-                # Clean up any ActivityBudget records that reference these sub-activities
-                if sub_activity_count > 0:
-                    logger.info(f"Cleaning up budget references for {sub_activity_count} sub-activities")
-                    for sub_activity in sub_activities:
-                        ActivityBudget.objects.filter(sub_activity_id=str(sub_activity.id)).delete()
-                
-                # Clean up legacy budget records linked to main activity
-                legacy_budgets = ActivityBudget.objects.filter(activity=instance)
-                legacy_count = legacy_budgets.count()
-                if legacy_count > 0:
-                    logger.info(f"Deleting {legacy_count} legacy ActivityBudget records")
-                    legacy_budgets.delete()
-                
-                # Delete the main activity (this will cascade to sub-activities)
-                instance.delete()
-                print(f"Main activity {instance.id} deleted successfully")
-            
+            instance_id = instance.id
+
+            print(f"MainActivityViewSet: Starting delete for main activity {instance_id} ({instance.name})")
+
+            # Cascades to the sub-activities and to the budgets of both, one DELETE per table
+            _, deleted = instance.delete()
+            logger.info(
+                f"Deleted {deleted.get('organizations.ActivityBudget', 0)} ActivityBudget records of main activity {instance_id}"
+            )
+            print(f"Main activity {instance_id} deleted successfully")
+
             return Response(
                 {'message': 'Main activity and all related data deleted successfully'}, 
                 status=status.HTTP_204_NO_CONTENT
@@ -1046,11 +1070,14 @@ class MainActivityViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         queryset = super().get_queryset()
 
+        if self.action in ('list', 'retrieve'):
+            # Budget totals come from the database instead of walking sub-activities per row
+            queryset = queryset.with_budget_totals().select_related('organization')
+            if field_spec_for(self.request, self).selects('sub_activities', expandable=True):
+                queryset = queryset.prefetch_related('sub_activities')
+
         # Get the user's organizations
-        if self.request.user.is_authenticated:
-            user_organizations = OrganizationUser.objects.filter(user=self.request.user).values_list('organization_id', flat=True)
-        else:
-            user_organizations = []
+        user_organizations = get_organization_context(self.request).organization_ids
 
         # Filter by initiative if provided
         initiative_id = self.request.query_params.get('initiative')
@@ -1072,9 +1099,7 @@ class MainActivityViewSet(viewsets.ModelViewSet):
 
         # If no organization_id was provided, try to get the user's primary organization
         if not organization_id:
-            user_org = OrganizationUser.objects.filter(user=self.request.user).first()
-            if user_org:
-                organization_id = user_org.organization_id
+            organization_id = get_organization_context(self.request).primary_organization_id
 
         # Save with the organization ID
         serializer.save(organization_id=organization_id)
@@ -1197,6 +1222,7 @@ class SubActivityViewSet(viewsets.ModelViewSet):
     queryset = SubActivity.objects.all()
     serializer_class = SubActivitySerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptInCursorPagination
 
     def get_queryset(self):
         queryset = SubActivity.objects.all()
@@ -1205,11 +1231,41 @@ class SubActivityViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(main_activity=main_activity)
         return queryset
 
-    @action(detail=True, methods=['post'])
-    def add_budget(self, request, pk=None):
-        """Add budget for a sub-activity"""
+    @action(detail=False, methods=['post'])
+    def bulk_import(self, request):
+        """
+        Queue a CSV/Excel file of sub-activities for the import worker and return the
+        job right away; poll /import-jobs/<id>/ for progress
+        """
+        uploaded_file = request.FILES.get('file')
+        if not uploaded_file:
+            return Response({'error': 'A CSV or Excel file is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        organization_context = get_organization_context(request)
+        if not (request.user.is_superuser or organization_context.has_role('ADMIN', 'PLANNER')):
+            return Response({'error': 'Only planners can import sub-activities'}, status=status.HTTP_403_FORBIDDEN)
+
+        # Rows go to the user's organization unless another one of theirs is chosen
+        organization_id = request.data.get('organization_id') or organization_context.primary_organization_id
         try:
-            sub_activity = self.get_object()
+            organization_id = int(organization_id) if organization_id else None
+        except (TypeError, ValueError):
+            return Response({'error': 'organization_id must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if not request.user.is_superuser and organization_id not in organization_context.organization_ids:
+            return Response({'error': 'You can only import into your own organization'}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            job = enqueue_import(
+                'SUB_ACTIVITIES', uploaded_file, request.user,
+                organization_id=organization_id,
+                scope_main_activities=True,
+                dry_run=str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes'),
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
     @transaction.atomic
     def destroy(self, request, *args, **kwargs):
         """
@@ -1238,6 +1294,11 @@ class SubActivityViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=True, methods=['post'])
+    def add_budget(self, request, pk=None):
+        """Add budget for a sub-activity"""
+        try:
+            sub_activity = self.get_object()
             budget_data = request.data
 
             # Create budget for this sub-activity
@@ -1347,30 +1408,42 @@ class ActivityCostingAssumptionViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class PlanViewSet(viewsets.ModelViewSet):
-    queryset = Plan.objects.all().select_related('organization', 'strategic_objective').prefetch_related('reviews', 'selected_objectives')
+class PlanViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = Plan.objects.all().select_related('organization', 'strategic_objective').prefetch_related(
+        Prefetch('reviews', queryset=PlanReview.objects.select_related('evaluator__user')),
+        'selected_objectives'
+    )
     serializer_class = PlanSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptInCursorPagination
+    # Organization and objective names are covered by the tree tokens
+    conditional_dependencies = [(PlanReview, 'reviews')]
+    conditional_objective_fields = ['strategic_objective', 'selected_objectives']
 
     def get_queryset(self):
         """Filter plans based on user's role and organization"""
         queryset = super().get_queryset()
         user = self.request.user
 
+        # Optional ?organization_subtree=<id>: plans of that organization and everything below it
+        subtree = self.request.query_params.get('organization_subtree')
+        if subtree and subtree.isdigit():
+            queryset = queryset.filter(organization__in=Organization.objects.descendants_of(int(subtree)))
+
         # Check for special 'all' parameter for evaluators/admins
         show_all = self.request.query_params.get('all', 'false').lower() == 'true'
 
         # Get user's organizations and role
-        user_organizations = OrganizationUser.objects.filter(user=user)
+        organization_context = get_organization_context(self.request)
 
-        if not user_organizations.exists():
+        if not organization_context:
             # User has no organization access, return empty queryset
             logger.warning(f"User {user.username} has no organization access")
             return queryset.none()
 
         # Check user's role
-        user_roles = user_organizations.values_list('role', flat=True)
-        user_org_ids = user_organizations.values_list('organization', flat=True)
+        user_roles = organization_context.roles
+        user_org_ids = organization_context.organization_ids
 
         logger.info(f"User {user.username} roles: {list(user_roles)}, orgs: {list(user_org_ids)}")
 
@@ -1392,13 +1465,22 @@ class PlanViewSet(viewsets.ModelViewSet):
         # Planners can only see plans from their own organizations
         if 'PLANNER' in user_roles:
             filtered_queryset = queryset.filter(organization__in=user_org_ids)
-            logger.info(f"Planner {user.username} accessing {filtered_queryset.count()} plans from orgs {list(user_org_ids)}")
+            logger.info(f"Planner {user.username} accessing plans from orgs {list(user_org_ids)}")
             return filtered_queryset
 
         # Default: no access
         logger.warning(f"User {user.username} has no recognized role, denying access")
         return queryset.none()
 
+    def retrieve(self, request, *args, **kwargs):
+        """Return a plan with its whole objective tree, scoped to the plan's organization and cached"""
+        instance = self.get_object()
+        instance.cached_objectives = get_objective_trees(
+            sorted(plan_objective_ids(instance)), [instance.organization_id]
+        )
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
     def create(self, request, *args, **kwargs):
         """Custom create method with enhanced logging and validation"""
         logger.info(f"PlanViewSet.create called with data: {request.data}")
@@ -1540,15 +1622,14 @@ class PlanViewSet(viewsets.ModelViewSet):
                 return Response({'error': 'Only submitted plans can be approved'}, status=status.HTTP_400_BAD_REQUEST)
 
             # Check if user has evaluator role
-            user_organizations = OrganizationUser.objects.filter(user=request.user)
-            user_roles = user_organizations.values_list('role', flat=True)
+            organization_context = get_organization_context(request)
 
-            if 'EVALUATOR' not in user_roles and 'ADMIN' not in user_roles:
+            if not organization_context.has_role('EVALUATOR', 'ADMIN'):
                 logger.warning(f"User {request.user.username} does not have evaluator/admin role")
                 return Response({'error': 'Only evaluators can approve plans'}, status=status.HTTP_403_FORBIDDEN)
 
             # Get the evaluator's organization user record
-            evaluator_org_user = user_organizations.filter(role__in=['EVALUATOR', 'ADMIN']).first()
+            evaluator_org_user = organization_context.membership_with_role('EVALUATOR', 'ADMIN')
             if not evaluator_org_user:
                 logger.error(f"No evaluator organization record found for user {request.user.username}")
                 return Response({'error': 'Evaluator organization record not found'}, status=status.HTTP_400_BAD_REQUEST)
@@ -1587,15 +1668,14 @@ class PlanViewSet(viewsets.ModelViewSet):
                 return Response({'error': 'Only submitted plans can be rejected'}, status=status.HTTP_400_BAD_REQUEST)
 
             # Check if user has evaluator role
-            user_organizations = OrganizationUser.objects.filter(user=request.user)
-            user_roles = user_organizations.values_list('role', flat=True)
+            organization_context = get_organization_context(request)
 
-            if 'EVALUATOR' not in user_roles and 'ADMIN' not in user_roles:
+            if not organization_context.has_role('EVALUATOR', 'ADMIN'):
                 logger.warning(f"User {request.user.username} does not have evaluator/admin role")
                 return Response({'error': 'Only evaluators can reject plans'}, status=status.HTTP_403_FORBIDDEN)
 
             # Get the evaluator's organization user record
-            evaluator_org_user = user_organizations.filter(role__in=['EVALUATOR', 'ADMIN']).first()
+            evaluator_org_user = organization_context.membership_with_role('EVALUATOR', 'ADMIN')
             if not evaluator_org_user:
                 logger.error(f"No evaluator organization record found for user {request.user.username}")
                 return Response({'error': 'Evaluator organization record not found'}, status=status.HTTP_400_BAD_REQUEST)
@@ -1622,13 +1702,44 @@ class PlanViewSet(viewsets.ModelViewSet):
             logger.exception(f"Error rejecting plan {pk}")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=False, methods=['post'])
+    def bulk_review(self, request):
+        """
+        Approve or reject many submitted plans in one transaction.
+        Body: {"reviews": [{"plan": 1, "status": "APPROVED", "feedback": "..."}]}
+        or {"plans": [1, 2], "status": "REJECTED", "feedback": "..."}.
+        Valid decisions are applied, the others reported; one result per plan, in order.
+        """
+        organization_context = get_organization_context(request)
+        if not organization_context.has_role('EVALUATOR', 'ADMIN'):
+            return Response({'error': 'Only evaluators can review plans'}, status=status.HTTP_403_FORBIDDEN)
+
+        # PlanReview.clean only accepts evaluators as reviewers
+        evaluator_org_user = organization_context.membership_with_role('EVALUATOR')
+        if not evaluator_org_user:
+            return Response({'error': 'Evaluator organization record not found'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            decisions = parse_decisions(request.data)
+        except BulkReviewError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = bulk_review(decisions, evaluator_org_user, self.get_queryset())
+        counts = {key: sum(1 for result in results if result['status'] == key) for key in ('APPROVED', 'REJECTED', 'ERROR')}
+        logger.info(f"Bulk review by {request.user.username}: {counts}")
+        return Response({
+            'approved': counts['APPROVED'],
+            'rejected': counts['REJECTED'],
+            'errors': counts['ERROR'],
+            'results': results,
+        })
+
     @action(detail=False, methods=['get'])
     def pending_reviews(self, request):
         """Get plans pending review"""
         try:
             # Check if user is an evaluator
-            user_organizations = OrganizationUser.objects.filter(user=request.user)
-            user_roles = user_organizations.values_list('role', flat=True)
+            user_roles = get_organization_context(request).roles
 
             if 'EVALUATOR' in user_roles:
                 # Evaluators can see all submitted plans for review
@@ -1653,6 +1764,270 @@ class PlanViewSet(viewsets.ModelViewSet):
             logger.exception("Error fetching pending reviews")
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=True, methods=['get'])
+    def budget_summary(self, request, pk=None):
+        """Budget totals of a plan by funding source, objective, initiative and activity type"""
+        return Response(plan_budget_summary(self.get_object()))
+
+    @action(detail=False, methods=['get'])
+    def budget_summaries(self, request):
+        """
+        Budget totals of every visible plan, read from the summary table.
+        Filters: ?fiscal_year=2025&status=SUBMITTED,APPROVED
+        """
+        plans = self.get_queryset()
+        fiscal_year = request.query_params.get('fiscal_year')
+        if fiscal_year:
+            plans = plans.filter(fiscal_year=fiscal_year)
+        statuses = request.query_params.get('status')
+        if statuses:
+            plans = plans.filter(status__in=statuses.split(','))
+
+        aggregates = {field: Sum(f'budget_summaries__{field}') for field in SUMMARY_FIELDS}
+        aggregates['sub_activity_count'] = Sum('budget_summaries__sub_activity_count')
+        rows = plans.prefetch_related(None).order_by().values(
+            'id', 'organization_id', 'fiscal_year', 'status'
+        ).annotate(**aggregates)
+        return Response([
+            {
+                'plan': row.pop('id'),
+                **{key: (value if value is not None else 0) for key, value in row.items()}
+            }
+            for row in rows
+        ])
+
+    def _xlsx_response(self, plans, filename):
+        language = 'am' if self.request.query_params.get('language') == 'am' else 'en'
+        workbook = write_plans_workbook(plans, language)
+        return FileResponse(
+            workbook,
+            as_attachment=True,
+            filename=filename,
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+
+    @action(detail=True, methods=['get'], url_path='export.xlsx')
+    def export_xlsx(self, request, pk=None):
+        """The plan's "Strategic Plan" workbook, in the layout of the browser export. ?language=am for Amharic headers"""
+        plan = self.get_object()
+        return self._xlsx_response([plan], f'plan-{plan.id}-{timezone.now().date().isoformat()}.xlsx')
+
+    @action(detail=True, methods=['get'], url_path='export.pdf')
+    def export_pdf(self, request, pk=None):
+        """
+        The plan's "Strategic Plan Export" PDF, served from the render cache. Answers 202
+        with Retry-After while a first render of the current version is still running.
+        """
+        plan = self.get_object()
+        output = open_plan_pdf(plan)
+        if output is None:
+            response = Response({'status': 'rendering'}, status=status.HTTP_202_ACCEPTED)
+            response['Retry-After'] = '5'
+            return response
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=f'plan-{plan.id}-{timezone.now().date().isoformat()}.pdf',
+            content_type='application/pdf',
+        )
+
+    @action(detail=False, methods=['get'], url_path='export.xlsx')
+    def export_xlsx_many(self, request):
+        """
+        One sheet per visible plan of a fiscal year and/or organization, at most
+        PLAN_EXPORT_MAX_PLANS plans. Filters: ?fiscal_year=2025&organization=3&status=SUBMITTED,APPROVED
+        """
+        plans = self.get_queryset().prefetch_related(None)
+        fiscal_year = request.query_params.get('fiscal_year')
+        organization = request.query_params.get('organization')
+        if not fiscal_year and not organization:
+            return Response({'error': 'fiscal_year or organization is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if fiscal_year:
+            plans = plans.filter(fiscal_year=fiscal_year)
+        if organization:
+            if not organization.isdigit():
+                return Response({'error': 'organization must be an ID'}, status=status.HTTP_400_BAD_REQUEST)
+            plans = plans.filter(organization_id=int(organization))
+        statuses = request.query_params.get('status')
+        if statuses:
+            plans = plans.filter(status__in=statuses.split(','))
+
+        max_plans = getattr(settings, 'PLAN_EXPORT_MAX_PLANS', 100)
+        plans = list(plans.order_by('organization__name', 'id')[:max_plans + 1])
+        if len(plans) > max_plans:
+            return Response(
+                {'error': f'More than {max_plans} plans match; narrow the export with organization or status'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        label = '-'.join(part for part in ['plans', fiscal_year, organization and f'org{organization}'] if part)
+        return self._xlsx_response(plans, f'{label}.xlsx')
+
+class DashboardViewSet(viewsets.ViewSet):
+    permission_classes = [IsAuthenticated]
+
+    @action(detail=False, methods=['get'])
+    def stats(self, request):
+        """
+        Budget and plan statistics computed in the database.
+        Filters: ?fiscal_year=2025&organization=1,2 or ?subtree=3 (an organization and everything below it)
+        """
+        fiscal_year = request.query_params.get('fiscal_year') or None
+        organization_param = request.query_params.get('organization')
+        subtree_param = request.query_params.get('subtree')
+
+        organization_ids = None
+        if organization_param:
+            try:
+                organization_ids = [int(org_id) for org_id in organization_param.split(',') if org_id.strip()]
+            except ValueError:
+                return Response({'error': 'organization must be a comma separated list of IDs'}, status=status.HTTP_400_BAD_REQUEST)
+        if subtree_param:
+            try:
+                root_ids = [int(org_id) for org_id in subtree_param.split(',') if org_id.strip()]
+            except ValueError:
+                return Response({'error': 'subtree must be a comma separated list of IDs'}, status=status.HTTP_400_BAD_REQUEST)
+            subtree_ids = list(Organization.objects.descendants_of(root_ids).values_list('id', flat=True))
+            organization_ids = (
+                [org_id for org_id in organization_ids if org_id in subtree_ids]
+                if organization_ids is not None else subtree_ids
+            )
+
+        # Planners only see their own organizations; admins and evaluators see everything
+        organization_context = get_organization_context(request)
+        if not organization_context.has_role('ADMIN', 'EVALUATOR'):
+            allowed = set(organization_context.organization_ids)
+            if organization_ids is None:
+                organization_ids = list(allowed)
+            else:
+                organization_ids = [org_id for org_id in organization_ids if org_id in allowed]
+
+        try:
+            return Response(dashboard_stats(fiscal_year=fiscal_year, organization_ids=organization_ids))
+        except Exception as e:
+            logger.exception("Error computing dashboard statistics")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    @action(detail=False, methods=['get'], url_path='organization-rollup')
+    def organization_rollup(self, request):
+        """
+        Budget, plan counts by status and weight completion for every organization,
+        with children rolled up into their parents.
+        Filters: ?fiscal_year=2025&root=3 (a subtree; planners only see their own subtrees)
+        """
+        fiscal_year = request.query_params.get('fiscal_year') or None
+        root_param = request.query_params.get('root')
+
+        root_ids = None
+        if root_param:
+            try:
+                root_ids = [int(org_id) for org_id in root_param.split(',') if org_id.strip()]
+            except ValueError:
+                return Response({'error': 'root must be a comma separated list of IDs'}, status=status.HTTP_400_BAD_REQUEST)
+
+        organization_context = get_organization_context(request)
+        if not organization_context.has_role('ADMIN', 'EVALUATOR'):
+            allowed = set(organization_context.organization_ids)
+            root_ids = [org_id for org_id in root_ids if org_id in allowed] if root_ids is not None else list(allowed)
+
+        try:
+            return Response(organization_rollup(fiscal_year=fiscal_year, root_ids=root_ids))
+        except Exception as e:
+            logger.exception("Error computing organization rollup")
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class CostingViewSet(viewsets.ViewSet):
+    permission_classes = [IsAuthenticated]
+
+    @action(detail=False, methods=['get'], url_path='reference-data')
+    def reference_data(self, request):
+        """
+        Every costing rate table in one document. Send the returned ETag back as
+        If-None-Match to get a 304 while the rates are unchanged.
+        """
+        data, etag = get_reference_data()
+        quoted_etag = quote_etag(etag)
+
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            client_etags = [tag[2:] if tag.startswith('W/') else tag for tag in parse_etags(if_none_match)]
+            if '*' in client_etags or quoted_etag in client_etags:
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+                response['ETag'] = quoted_etag
+                response['Cache-Control'] = 'private, no-cache'
+                return response
+
+        response = Response({'version': etag, **data})
+        response['ETag'] = quoted_etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    MAX_CALCULATE_BATCH = 5000
+
+    @action(detail=False, methods=['post'])
+    def calculate(self, request):
+        """
+        Cost tool parameters with the server-side engine, in bulk.
+
+        Body: {"items": [{"key": any, "activity_type": "Training", "details": {...}}],
+               "sub_activities": [<sub-activity id>, ...]}
+        Sub-activities are costed from their stored *_details; the stored
+        estimated_cost_with_tool is returned alongside for comparison. Nothing is saved.
+        """
+        items = request.data.get('items') or []
+        sub_activity_ids = request.data.get('sub_activities') or []
+        if not isinstance(items, list) or not isinstance(sub_activity_ids, list):
+            return Response({'error': 'items and sub_activities must be lists'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) + len(sub_activity_ids) > self.MAX_CALCULATE_BATCH:
+            return Response(
+                {'error': f'At most {self.MAX_CALCULATE_BATCH} items per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rates = RateTables.load()
+        results = []
+        errors = []
+
+        for index, item in enumerate(items):
+            key = item.get('key', index) if isinstance(item, dict) else index
+            try:
+                if not isinstance(item, dict):
+                    raise CostingError('Each item must be an object')
+                breakdown = calculate_cost(item.get('activity_type'), item.get('details'), rates)
+                results.append({'key': key, **breakdown})
+            except CostingError as e:
+                errors.append({'key': key, 'error': str(e)})
+
+        try:
+            sub_activity_ids = [int(sub_activity_id) for sub_activity_id in sub_activity_ids]
+        except (TypeError, ValueError):
+            return Response({'error': 'sub_activities must be a list of IDs'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if sub_activity_ids:
+            sub_activities = SubActivity.objects.filter(id__in=sub_activity_ids).only(
+                'id', 'activity_type', 'estimated_cost_with_tool', 'training_details',
+                'meeting_workshop_details', 'supervision_details', 'printing_details',
+                'procurement_details'
+            )
+            found = set()
+            for sub_activity in sub_activities:
+                found.add(sub_activity.id)
+                try:
+                    breakdown = calculate_sub_activity(sub_activity, rates)
+                    results.append({
+                        'sub_activity': sub_activity.id,
+                        'activity_type': sub_activity.activity_type,
+                        'stored_cost': sub_activity.estimated_cost_with_tool,
+                        **breakdown
+                    })
+                except CostingError as e:
+                    errors.append({'sub_activity': sub_activity.id, 'error': str(e)})
+            for missing in sub_activity_ids:
+                if missing not in found:
+                    errors.append({'sub_activity': missing, 'error': 'Sub-activity not found'})
+
+        return Response({'results': results, 'errors': errors})
+
 class PlanReviewViewSet(viewsets.ModelViewSet):
     queryset = PlanReview.objects.all().select_related('plan', 'evaluator')
     serializer_class = PlanReviewSerializer
@@ -1668,52 +2043,56 @@ class PlanReviewViewSet(viewsets.ModelViewSet):
 
 
 # Costing Model ViewSets
-class LocationViewSet(viewsets.ReadOnlyModelViewSet):
+class LocationViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Location.objects.all().order_by('region', 'name')
     serializer_class = LocationSerializer
     permission_classes = [IsAuthenticated]
 
-class LandTransportViewSet(viewsets.ReadOnlyModelViewSet):
+class LandTransportViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = LandTransport.objects.all().select_related('origin', 'destination')
     serializer_class = LandTransportSerializer
     permission_classes = [IsAuthenticated]
+    conditional_dependencies = [Location]
 
-class AirTransportViewSet(viewsets.ReadOnlyModelViewSet):
+class AirTransportViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = AirTransport.objects.all().select_related('origin', 'destination')
     serializer_class = AirTransportSerializer
     permission_classes = [IsAuthenticated]
+    conditional_dependencies = [Location]
 
-class PerDiemViewSet(viewsets.ReadOnlyModelViewSet):
+class PerDiemViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = PerDiem.objects.all().select_related('location')
     serializer_class = PerDiemSerializer
     permission_classes = [IsAuthenticated]
+    conditional_dependencies = [Location]
 
-class AccommodationViewSet(viewsets.ReadOnlyModelViewSet):
+class AccommodationViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Accommodation.objects.all().select_related('location')
     serializer_class = AccommodationSerializer
     permission_classes = [IsAuthenticated]
+    conditional_dependencies = [Location]
 
-class ParticipantCostViewSet(viewsets.ReadOnlyModelViewSet):
+class ParticipantCostViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = ParticipantCost.objects.all()
     serializer_class = ParticipantCostSerializer
     permission_classes = [IsAuthenticated]
 
-class SessionCostViewSet(viewsets.ReadOnlyModelViewSet):
+class SessionCostViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = SessionCost.objects.all()
     serializer_class = SessionCostSerializer
     permission_classes = [IsAuthenticated]
 
-class PrintingCostViewSet(viewsets.ReadOnlyModelViewSet):
+class PrintingCostViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = PrintingCost.objects.all()
     serializer_class = PrintingCostSerializer
     permission_classes = [IsAuthenticated]
 
-class SupervisorCostViewSet(viewsets.ReadOnlyModelViewSet):
+class SupervisorCostViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = SupervisorCost.objects.all()
     serializer_class = SupervisorCostSerializer
     permission_classes = [IsAuthenticated]
 
-class ProcurementItemViewSet(viewsets.ReadOnlyModelViewSet):
+class ProcurementItemViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = ProcurementItem.objects.all().order_by('category', 'name')
     serializer_class = ProcurementItemSerializer
     permission_classes = [IsAuthenticated]
@@ -1723,4 +2102,44 @@ class ProcurementItemViewSet(viewsets.ReadOnlyModelViewSet):
         category = self.request.query_params.get('category', None)
         if category is not None:
             queryset = queryset.filter(category=category)
-        return queryset
\ No newline at end of file
+        return queryset
+
+    @action(detail=False, methods=['post'])
+    def bulk_import(self, request):
+        """
+        Queue a CSV/Excel file of procurement items (``mode``: insert, skip or upsert)
+        for the import worker and return the job right away
+        """
+        uploaded_file = request.FILES.get('file')
+        if not uploaded_file:
+            return Response({'error': 'A CSV or Excel file is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not (request.user.is_superuser or get_organization_context(request).has_role('ADMIN')):
+            return Response({'error': 'Only admins can import procurement items'}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            job = enqueue_import(
+                'PROCUREMENT_ITEMS', uploaded_file, request.user,
+                mode=request.data.get('mode') or 'skip',
+                dry_run=str(request.data.get('dry_run', '')).lower() in ('1', 'true', 'yes'),
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ImportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Progress of queued bulk imports; users see their own jobs"""
+    queryset = ImportJob.objects.all()
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.request.user.is_superuser:
+            queryset = queryset.filter(created_by=self.request.user)
+        status_filter = self.request.query_params.get('status', None)
+        if status_filter is not None:
+            queryset = queryset.filter(status=status_filter)
+        return queryset
@@ -2,7 +2,7 @@ import React, { useEffect, useState } from 'react';
 import { useForm, Controller, useFieldArray } from 'react-hook-form';
 import { Calculator, DollarSign, Info, Plus, Trash2, AlertCircle } from 'lucide-react';
 import type { MeetingWorkshopCost, TrainingLocation } from '../types/costing';
-import { locations, perDiems, accommodations, participantCosts, sessionCosts, landTransports, airTransports } from '../lib/api';
+import { costingReference } from '../lib/api';
 
 // Fallback data if API fails
 const FALLBACK_LOCATIONS = [
@@ -132,75 +132,22 @@ const MeetingWorkshopCostingTool: React.FC<MeetingWorkshopCostingToolProps> = ({
       const errors: string[] = [];
       
       try {
-        // Locations
+        // All rate tables come from one cached, ETag-validated request
+        let referenceData: any = null;
         try {
-          const locationsResult = await locations.getAll();
-          setLocationsData(locationsResult?.data || FALLBACK_LOCATIONS);
+          referenceData = await costingReference.get();
         } catch (e) {
-          console.warn('Failed to fetch locations, using fallback:', e);
-          setLocationsData(FALLBACK_LOCATIONS);
-          errors.push('Locations data loaded from fallback');
-        }
-        
-        // Per Diems
-        try {
-          const perDiemsResult = await perDiems.getAll();
-          setPerDiemsData(perDiemsResult?.data || FALLBACK_PER_DIEMS);
-        } catch (e) {
-          console.warn('Failed to fetch per diems, using fallback:', e);
-          setPerDiemsData(FALLBACK_PER_DIEMS);
-          errors.push('Per diems data loaded from fallback');
-        }
-        
-        // Accommodations
-        try {
-          const accommodationsResult = await accommodations.getAll();
-          setAccommodationsData(accommodationsResult?.data || FALLBACK_ACCOMMODATIONS);
-        } catch (e) {
-          console.warn('Failed to fetch accommodations, using fallback:', e);
-          setAccommodationsData(FALLBACK_ACCOMMODATIONS);
-          errors.push('Accommodations data loaded from fallback');
-        }
-        
-        // Participant Costs
-        try {
-          const participantCostsResult = await participantCosts.getAll();
-          setParticipantCostsData(participantCostsResult?.data || FALLBACK_PARTICIPANT_COSTS);
-        } catch (e) {
-          console.warn('Failed to fetch participant costs, using fallback:', e);
-          setParticipantCostsData(FALLBACK_PARTICIPANT_COSTS);
-          errors.push('Participant costs data loaded from fallback');
-        }
-        
-        // Session Costs
-        try {
-          const sessionCostsResult = await sessionCosts.getAll();
-          setSessionCostsData(sessionCostsResult?.data || FALLBACK_SESSION_COSTS);
-        } catch (e) {
-          console.warn('Failed to fetch session costs, using fallback:', e);
-          setSessionCostsData(FALLBACK_SESSION_COSTS);
-          errors.push('Session costs data loaded from fallback');
-        }
-        
-        // Land Transports
-        try {
-          const landTransportsResult = await landTransports.getAll();
-          setLandTransportsData(landTransportsResult?.data || []);
-        } catch (e) {
-          console.warn('Failed to fetch land transports:', e);
-          setLandTransportsData([]);
-          errors.push('Land transport data not available');
-        }
-        
-        // Air Transports
-        try {
-          const airTransportsResult = await airTransports.getAll();
-          setAirTransportsData(airTransportsResult?.data || []);
-        } catch (e) {
-          console.warn('Failed to fetch air transports:', e);
-          setAirTransportsData([]);
-          errors.push('Air transport data not available');
+          console.warn('Failed to fetch costing reference data, using fallback:', e);
+          errors.push('Costing data loaded from fallback');
         }
+
+        setLocationsData(referenceData?.locations || FALLBACK_LOCATIONS);
+        setPerDiemsData(referenceData?.per_diems || FALLBACK_PER_DIEMS);
+        setAccommodationsData(referenceData?.accommodations || FALLBACK_ACCOMMODATIONS);
+        setParticipantCostsData(referenceData?.participant_costs || FALLBACK_PARTICIPANT_COSTS);
+        setSessionCostsData(referenceData?.session_costs || FALLBACK_SESSION_COSTS);
+        setLandTransportsData(referenceData?.land_transports || []);
+        setAirTransportsData(referenceData?.air_transports || []);
         
         // Set API errors if any
         if (errors.length > 0) {
@@ -73,7 +73,8 @@ const PlanPreviewModal: React.FC<PlanPreviewModalProps> = ({
         objectivesList.map(async (objective) => {
           try {
             // Fetch fresh initiatives for this objective
-            const initiativesResponse = await initiatives.getByObjective(objective.id.toString());
+            // Flat initiatives: their measures and activities are fetched below
+            const initiativesResponse = await initiatives.getByObjective(objective.id.toString(), {});
             const objectiveInitiatives = initiativesResponse?.data || [];
 
             // Filter initiatives based on user organization
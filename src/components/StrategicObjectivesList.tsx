@@ -189,7 +189,7 @@ const StrategicObjectivesList: React.FC<StrategicObjectivesListProps> = ({
   
   const { data: objectivesData, isLoading } = useQuery({
     queryKey: ['objectives'],
-    queryFn: () => objectives.getAll(),
+    queryFn: () => objectives.getAll({ expand: 'programs' }),
     onSuccess: (data) => {
       console.log("Fetched objectives data:", data);
       console.log("Type of data:", typeof data);
@@ -2,7 +2,7 @@ import React, { useEffect, useState } from 'react';
 import { useForm, useFieldArray, Controller } from 'react-hook-form';
 import { Calculator, DollarSign, Info, Plus, Trash2, AlertCircle } from 'lucide-react';
 import type { SupervisionCost, TrainingLocation } from '../types/costing';
-import { locations, perDiems, accommodations, supervisorCosts, landTransports, airTransports } from '../lib/api';
+import { costingReference } from '../lib/api';
 
 // Fallback data if API fails
 const FALLBACK_LOCATIONS = [
@@ -95,40 +95,20 @@ const SupervisionCostingTool: React.FC<SupervisionCostingToolProps> = ({
         
         console.log('Fetching supervision costing data...');
         
-        // Fetch all data in parallel
-        const [
-          locationsResponse,
-          perDiemsResponse,
-          accommodationsResponse,
-          supervisorCostsResponse,
-          landTransportsResponse,
-          airTransportsResponse
-        ] = await Promise.all([
-          locations.getAll().catch(err => {
-            console.error('Failed to fetch locations:', err);
-            return { data: FALLBACK_LOCATIONS };
-          }),
-          perDiems.getAll().catch(err => {
-            console.error('Failed to fetch per diems:', err);
-            return { data: [] };
-          }),
-          accommodations.getAll().catch(err => {
-            console.error('Failed to fetch accommodations:', err);
-            return { data: [] };
-          }),
-          supervisorCosts.getAll().catch(err => {
-            console.error('Failed to fetch supervisor costs:', err);
-            return { data: FALLBACK_SUPERVISOR_COSTS };
-          }),
-          landTransports.getAll().catch(err => {
-            console.error('Failed to fetch land transports:', err);
-            return { data: [] };
-          }),
-          airTransports.getAll().catch(err => {
-            console.error('Failed to fetch air transports:', err);
-            return { data: [] };
-          })
-        ]);
+        // All rate tables come from one cached, ETag-validated request
+        let referenceData: any = {};
+        try {
+          referenceData = await costingReference.get();
+        } catch (err) {
+          console.error('Failed to fetch costing reference data:', err);
+        }
+
+        const locationsResponse = { data: referenceData.locations ?? FALLBACK_LOCATIONS };
+        const perDiemsResponse = { data: referenceData.per_diems ?? [] };
+        const accommodationsResponse = { data: referenceData.accommodations ?? [] };
+        const supervisorCostsResponse = { data: referenceData.supervisor_costs ?? FALLBACK_SUPERVISOR_COSTS };
+        const landTransportsResponse = { data: referenceData.land_transports ?? [] };
+        const airTransportsResponse = { data: referenceData.air_transports ?? [] };
 
         // Set all data
         setLocationsData(locationsResponse?.data || FALLBACK_LOCATIONS);
@@ -470,9 +450,14 @@ const SupervisionCostingTool: React.FC<SupervisionCostingToolProps> = ({
           numberOfSupervisors: Number(data.numberOfSupervisors),
           location: data.location,
           costMode,
+          accommodationType: data.accommodationType,
           additionalLocations,
           landTransportRoutes,
           airTransportRoutes,
+          transportRequired: data.transportRequired,
+          landTransportSupervisors: Number(data.landTransportSupervisors || 0),
+          airTransportSupervisors: Number(data.airTransportSupervisors || 0),
+          numberOfSupervisorsWithAdditionalCost: Number(data.numberOfSupervisorsWithAdditionalCost || 0),
           additionalSupervisorCosts: data.additionalSupervisorCosts,
           otherCosts: Number(data.otherCosts || 0),
           justification: data.justification
@@ -2,7 +2,7 @@ import React, { useEffect, useState } from 'react';
 import { useForm, Controller, useFieldArray } from 'react-hook-form';
 import { Calculator, DollarSign, Info, Plus, Trash2, AlertCircle, Loader } from 'lucide-react';
 import type { TrainingCost, TrainingLocation } from '../types/costing';
-import { api } from '../lib/api';
+import { costingReference } from '../lib/api';
 
 // Fallback data if API fails
 const FALLBACK_LOCATIONS = [
@@ -131,47 +131,21 @@ const TrainingCostingTool: React.FC<TrainingCostingToolProps> = ({
     console.log('🔄 Starting to fetch training costing data...');
     
     try {
-      // Fetch data step by step with better error handling
-      const dataPromises = [
-        api.get('/locations/').catch(err => {
-          console.error('❌ Failed to fetch locations:', err);
-          return { data: FALLBACK_LOCATIONS };
-        }),
-        api.get('/land-transports/').catch(err => {
-          console.error('❌ Failed to fetch land transports:', err);
-          return { data: FALLBACK_LAND_TRANSPORTS };
-        }),
-        api.get('/air-transports/').catch(err => {
-          console.error('❌ Failed to fetch air transports:', err);
-          return { data: FALLBACK_AIR_TRANSPORTS };
-        }),
-        api.get('/accommodations/').catch(err => {
-          console.error('❌ Failed to fetch accommodations:', err);
-          return { data: FALLBACK_ACCOMMODATIONS };
-        }),
-        api.get('/per-diems/').catch(err => {
-          console.error('❌ Failed to fetch per diems:', err);
-          return { data: [] };
-        }),
-        api.get('/participant-costs/').catch(err => {
-          console.error('❌ Failed to fetch participant costs:', err);
-          return { data: [] };
-        }),
-        api.get('/session-costs/').catch(err => {
-          console.error('❌ Failed to fetch session costs:', err);
-          return { data: [] };
-        })
-      ];
-
-      const [
-        locationsResult,
-        landTransportsResult,
-        airTransportsResult,
-        accommodationsResult,
-        perDiemsResult,
-        participantCostsResult,
-        sessionCostsResult
-      ] = await Promise.all(dataPromises);
+      // All rate tables come from one cached, ETag-validated request
+      let referenceData: any = {};
+      try {
+        referenceData = await costingReference.get();
+      } catch (err) {
+        console.error('❌ Failed to fetch costing reference data:', err);
+      }
+
+      const locationsResult = { data: referenceData.locations ?? FALLBACK_LOCATIONS };
+      const landTransportsResult = { data: referenceData.land_transports ?? FALLBACK_LAND_TRANSPORTS };
+      const airTransportsResult = { data: referenceData.air_transports ?? FALLBACK_AIR_TRANSPORTS };
+      const accommodationsResult = { data: referenceData.accommodations ?? FALLBACK_ACCOMMODATIONS };
+      const perDiemsResult = { data: referenceData.per_diems ?? [] };
+      const participantCostsResult = { data: referenceData.participant_costs ?? [] };
+      const sessionCostsResult = { data: referenceData.session_costs ?? [] };
 
       // Process locations
       const locations = Array.isArray(locationsResult?.data) ? locationsResult.data : FALLBACK_LOCATIONS;
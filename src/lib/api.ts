@@ -219,6 +219,47 @@ export const stopSessionRefresh = () => {
   }
 };
 
+// Cursor pagination is opt-in: list endpoints return a plain array unless
+// `paginate=cursor` is sent. Pass the `next` URL back as `cursor` to fetch the next page.
+export interface CursorPage<T = any> {
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
+export const fetchCursorPage = async <T = any>(
+  url: string,
+  { cursor, pageSize, params }: { cursor?: string | null; pageSize?: number; params?: Record<string, any> } = {}
+): Promise<CursorPage<T>> => {
+  if (cursor) {
+    const response = await api.get(cursor.replace(/^https?:\/\/[^/]+/, '').replace(/^\/api/, ''));
+    return response.data;
+  }
+  const response = await api.get(url, {
+    params: { ...params, paginate: 'cursor', ...(pageSize ? { page_size: pageSize } : {}) }
+  });
+  return response.data;
+};
+
+// List endpoints return flat rows; nested children must be asked for with ?expand=
+// (dotted paths reach deeper levels, '*' expands everything). ?fields= trims columns.
+export interface SparseFieldOptions {
+  expand?: string | string[];
+  fields?: string | string[];
+}
+
+export const sparseParams = ({ expand, fields }: SparseFieldOptions = {}) => {
+  const join = (value?: string | string[]) => (Array.isArray(value) ? value.join(',') : value);
+  const params: Record<string, string> = {};
+  if (join(expand)) params.expand = join(expand) as string;
+  if (join(fields)) params.fields = join(fields) as string;
+  return params;
+};
+
+// What the initiative and main activity lists embedded before lists became flat
+const INITIATIVE_CHILDREN = 'performance_measures,main_activities.sub_activities';
+const ACTIVITY_CHILDREN = 'sub_activities';
+
 // Initiative Feed API
 export const initiativeFeeds = {
   getAll: async () => {
@@ -282,12 +323,46 @@ export const initiativeFeeds = {
   }
 };
 
+// Costing reference data: every rate table in one document, revalidated with
+// If-None-Match so repeat loads are answered with 304 and served from memory.
+let costingReferenceCache: { etag: string; data: any } | null = null;
+
+export const costingReference = {
+  get: async () => {
+    const headers: Record<string, string> = {};
+    if (costingReferenceCache) {
+      headers['If-None-Match'] = costingReferenceCache.etag;
+    }
+    const response = await api.get('/costing/reference-data/', {
+      headers,
+      validateStatus: status => (status >= 200 && status < 300) || status === 304
+    });
+    if (response.status === 304 && costingReferenceCache) {
+      return costingReferenceCache.data;
+    }
+    costingReferenceCache = { etag: response.headers['etag'], data: response.data };
+    return response.data;
+  },
+
+  clear: () => {
+    costingReferenceCache = null;
+  },
+
+  // Cost tool parameters and/or stored sub-activities with the server-side engine
+  calculate: async (payload: {
+    items?: { key?: string | number; activity_type: string; details: any }[];
+    sub_activities?: (string | number)[];
+  }) => {
+    const response = await api.post('/costing/calculate/', payload);
+    return response.data;
+  }
+};
+
 // Locations API
 export const locations = {
   getAll: async () => {
     try {
-      const timestamp = new Date().getTime();
-      const response = await api.get(`/locations/?_=${timestamp}`);
+      const response = await api.get('/locations/');
       return response;
     } catch (error) {
       console.error('Failed to fetch locations:', error);
@@ -310,10 +385,7 @@ export const locations = {
 export const landTransports = {
   getAll: async () => {
     try {
-      const timestamp = new Date().getTime();
-      const response = await api.get('/land-transports/', {
-        headers: { 'Cache-Control': 'no-cache, no-store, must-revalidate' }
-      });
+      const response = await api.get('/land-transports/');
       return response;
     } catch (error) {
       console.error('Failed to fetch land transports:', error);
@@ -336,10 +408,7 @@ export const landTransports = {
 export const airTransports = {
   getAll: async () => {
     try {
-      const timestamp = new Date().getTime();
-      const response = await api.get('/air-transports/', {
-        headers: { 'Cache-Control': 'no-cache, no-store, must-revalidate' }
-      });
+      const response = await api.get('/air-transports/');
       return response;
     } catch (error) {
       console.error('Failed to fetch air transports:', error);
@@ -362,8 +431,7 @@ export const airTransports = {
 export const perDiems = {
   getAll: async () => {
     try {
-      const timestamp = new Date().getTime();
-      const response = await api.get(`/per-diems/?_=${timestamp}`);
+      const response = await api.get('/per-diems/');
       return response;
     } catch (error) {
       console.error('Failed to fetch per diems:', error);
@@ -386,8 +454,7 @@ export const perDiems = {
 export const accommodations = {
   getAll: async () => {
     try {
-      const timestamp = new Date().getTime();
-      const response = await api.get(`/accommodations/?_=${timestamp}`);
+      const response = await api.get('/accommodations/');
       return response;
     } catch (error) {
       console.error('Failed to fetch accommodations:', error);
@@ -410,8 +477,7 @@ export const accommodations = {
 export const participantCosts = {
   getAll: async () => {
     try {
-      const timestamp = new Date().getTime();
-      const response = await api.get(`/participant-costs/?_=${timestamp}`);
+      const response = await api.get('/participant-costs/');
       return response;
     } catch (error) {
       console.error('Failed to fetch participant costs:', error);
@@ -434,8 +500,7 @@ export const participantCosts = {
 export const sessionCosts = {
   getAll: async () => {
     try {
-      const timestamp = new Date().getTime();
-      const response = await api.get(`/session-costs/?_=${timestamp}`);
+      const response = await api.get('/session-costs/');
       return response;
     } catch (error) {
       console.error('Failed to fetch session costs:', error);
@@ -458,8 +523,7 @@ export const sessionCosts = {
 export const printingCosts = {
   getAll: async () => {
     try {
-      const timestamp = new Date().getTime();
-      const response = await api.get(`/printing-costs/?_=${timestamp}`);
+      const response = await api.get('/printing-costs/');
       return response;
     } catch (error) {
       console.error('Failed to fetch printing costs:', error);
@@ -482,8 +546,7 @@ export const printingCosts = {
 export const supervisorCosts = {
   getAll: async () => {
     try {
-      const timestamp = new Date().getTime();
-      const response = await api.get(`/supervisor-costs/?_=${timestamp}`);
+      const response = await api.get('/supervisor-costs/');
       return response;
     } catch (error) {
       console.error('Failed to fetch supervisor costs:', error);
@@ -506,8 +569,7 @@ export const supervisorCosts = {
 export const procurementItems = {
   getAll: async () => {
     try {
-      const timestamp = new Date().getTime();
-      const response = await api.get(`/procurement-items/?_=${timestamp}`);
+      const response = await api.get('/procurement-items/');
       return response;
     } catch (error) {
       console.error('Failed to fetch procurement items:', error);
@@ -533,6 +595,34 @@ export const procurementItems = {
       console.error(`Failed to fetch procurement items for category ${category}:`, error);
       return { data: [] };
     }
+  },
+
+  // Queues the file for the import worker; poll importJobs.get(job.id) for progress
+  bulkImport: (file: File, mode: 'insert' | 'skip' | 'upsert' = 'skip', dryRun = false) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    formData.append('mode', mode);
+    formData.append('dry_run', String(dryRun));
+    return api.post('/procurement-items/bulk_import/', formData, {
+      headers: { 'Content-Type': 'multipart/form-data' }
+    });
+  }
+};
+
+// Bulk import jobs run by the server-side import worker
+export const importJobs = {
+  getAll: () => api.get('/import-jobs/'),
+  get: (id: number | string) => api.get(`/import-jobs/${id}/`),
+  // Polls until the job has COMPLETED or FAILED, reporting progress along the way
+  waitFor: async (id: number | string, onProgress?: (job: any) => void, intervalMs = 2000) => {
+    while (true) {
+      const response = await api.get(`/import-jobs/${id}/`);
+      onProgress?.(response.data);
+      if (response.data.status === 'COMPLETED' || response.data.status === 'FAILED') {
+        return response.data;
+      }
+      await new Promise(resolve => setTimeout(resolve, intervalMs));
+    }
   }
 };
 
@@ -559,6 +649,18 @@ export const organizations = {
     }
   },
   
+  async getDescendants(id: string | number, includeSelf: boolean = true) {
+    try {
+      const response = await api.get(`/organizations/${id}/descendants/`, {
+        params: includeSelf ? {} : { include_self: 'false' }
+      });
+      return response.data;
+    } catch (error) {
+      console.error(`Failed to get descendants of organization ${id}:`, error);
+      throw error;
+    }
+  },
+  
   async update(id: string, data: any) {
     try {
       const response = await api.patch(`/organizations/${id}/`, data);
@@ -609,10 +711,13 @@ export const organizations = {
 
 // Strategic objectives service
 export const objectives = {
-  async getAll() {
+  // Flat objectives unless children are requested; include_details loads the whole tree
+  async getAll(options: SparseFieldOptions & { include_details?: boolean; organization?: any } = {}) {
     try {
       console.log('API: Fetching all strategic objectives...');
-      const response = await api.get('/strategic-objectives/');
+      const response = await api.get('/strategic-objectives/', {
+        params: sparseParams(options.include_details ? { ...options, expand: '*' } : options)
+      });
       
       // Ensure we have valid data structure
       if (!response.data) {
@@ -788,9 +893,9 @@ export const objectives = {
 
 // Programs service
 export const programs = {
-  async getAll() {
+  async getAll(options: SparseFieldOptions = {}) {
     try {
-      const response = await api.get('/programs/');
+      const response = await api.get('/programs/', { params: sparseParams(options) });
       return response;
     } catch (error) {
       console.error('Failed to get programs:', error);
@@ -798,9 +903,9 @@ export const programs = {
     }
   },
   
-  async getByObjective(objectiveId: string) {
+  async getByObjective(objectiveId: string, options: SparseFieldOptions = {}) {
     try {
-      const response = await api.get(`/programs/?strategic_objective=${objectiveId}`);
+      const response = await api.get(`/programs/?strategic_objective=${objectiveId}`, { params: sparseParams(options) });
       return response;
     } catch (error) {
       console.error(`Failed to get programs for objective ${objectiveId}:`, error);
@@ -851,9 +956,9 @@ export const programs = {
 
 // Strategic Initiatives API
 export const initiatives = {
-  getAll: async () => {
+  getAll: async (options: SparseFieldOptions = { expand: INITIATIVE_CHILDREN }) => {
     try {
-      const response = await api.get('/strategic-initiatives/');
+      const response = await api.get('/strategic-initiatives/', { params: sparseParams(options) });
       
       // Ensure we return data in expected format
       if (response.data && Array.isArray(response.data.data)) {
@@ -880,10 +985,12 @@ export const initiatives = {
     }
   },
   
-  getByObjective: async (objectiveId: string) => {
+  getByObjective: async (objectiveId: string, options: SparseFieldOptions = { expand: INITIATIVE_CHILDREN }) => {
     try {
       console.log(`Fetching initiatives for objective: ${objectiveId}`);
-      const response = await api.get(`/strategic-initiatives/?strategic_objective=${objectiveId}`);
+      const response = await api.get(`/strategic-initiatives/?strategic_objective=${objectiveId}`, {
+        params: sparseParams(options)
+      });
       
       console.log('Raw initiatives response:', response.data);
       
@@ -909,10 +1016,10 @@ export const initiatives = {
     }
   },
   
-  getByProgram: async (programId: string) => {
+  getByProgram: async (programId: string, options: SparseFieldOptions = { expand: INITIATIVE_CHILDREN }) => {
     try {
       console.log(`Fetching initiatives for program: ${programId}`);
-      const response = await api.get(`/strategic-initiatives/?program=${programId}`);
+      const response = await api.get(`/strategic-initiatives/?program=${programId}`, { params: sparseParams(options) });
       
       // Handle different response formats
       let initiativesData = [];
@@ -938,7 +1045,9 @@ export const initiatives = {
   
   getBySubProgram: async (subProgramId: string) => {
     try {
-      const response = await api.get(`/strategic-initiatives/?subprogram=${subProgramId}`);
+      const response = await api.get(`/strategic-initiatives/?subprogram=${subProgramId}`, {
+        params: sparseParams({ expand: INITIATIVE_CHILDREN })
+      });
       return response;
     } catch (error) {
       console.error(`Failed to fetch initiatives for subprogram ${subProgramId}:`, error);
@@ -1182,7 +1291,7 @@ export const performanceMeasures = {
 export const mainActivities = {
   getAll: async () => {
     try {
-      const response = await api.get('/main-activities/');
+      const response = await api.get('/main-activities/', { params: sparseParams({ expand: ACTIVITY_CHILDREN }) });
       console.log('API: All main activities response:', response.data?.length || 0, 'items');
       return response.data;
     } catch (error) {
@@ -1191,6 +1300,9 @@ export const mainActivities = {
     }
   },
 
+  getPage: (options: { cursor?: string | null; pageSize?: number } = {}) =>
+    fetchCursorPage('/main-activities/', { ...options, params: sparseParams({ expand: ACTIVITY_CHILDREN }) }),
+
   getById: async (id: string) => {
     try {
       console.log('API: Getting main activity by ID:', id);
@@ -1211,14 +1323,16 @@ export const mainActivities = {
       let response;
       try {
         // Strategy 1: Direct query with initiative parameter
-        response = await api.get(`/main-activities/?initiative=${initiativeId}`);
+        response = await api.get(`/main-activities/?initiative=${initiativeId}`, {
+          params: sparseParams({ expand: ACTIVITY_CHILDREN })
+        });
         console.log(`API: Main activities response for initiative ${initiativeId}:`, response.data);
       } catch (error1) {
         console.warn(`API: Strategy 1 failed for initiative ${initiativeId}:`, error1);
         
         try {
           // Strategy 2: Get all and filter (fallback)
-          const allResponse = await api.get('/main-activities/');
+          const allResponse = await api.get('/main-activities/', { params: sparseParams({ expand: ACTIVITY_CHILDREN }) });
           const allActivities = allResponse.data?.results || allResponse.data || [];
           const filteredActivities = allActivities.filter((activity: any) => 
             activity && activity.initiative && String(activity.initiative) === String(initiativeId)
@@ -1308,7 +1422,9 @@ export const mainActivities = {
     console.log('API: Getting main activities with sub-activities for initiative:', initiativeId);
     
     try {
-      const response = await api.get(`/main-activities/?initiative=${initiativeId}&include_sub_activities=true`);
+      const response = await api.get(`/main-activities/?initiative=${initiativeId}`, {
+        params: sparseParams({ expand: ACTIVITY_CHILDREN })
+      });
       
       let activitiesData = response.data?.results || response.data || [];
       if (!Array.isArray(activitiesData)) activitiesData = [];
@@ -1450,24 +1566,68 @@ export const subActivities = {
       throw new Error(error.message || 'Failed to delete sub-activity');
     }
   },
+  getPage: (options: { cursor?: string | null; pageSize?: number } = {}) =>
+    fetchCursorPage('/sub-activities/', options),
   getByMainActivity: (mainActivityId: string) => api.get('/sub-activities/', { params: { main_activity: mainActivityId } }),
   addBudget: (id: string, data: any) => api.post(`/sub-activities/${id}/add-budget/`, data),
   updateBudget: (id: string, data: any) => api.put(`/sub-activities/${id}/update-budget/`, data),
-  deleteBudget: (id: string) => api.delete(`/sub-activities/${id}/delete-budget/`)
+  deleteBudget: (id: string) => api.delete(`/sub-activities/${id}/delete-budget/`),
+  // Queues the file for the import worker; poll importJobs.get(job.id) for progress
+  bulkImport: (file: File, organizationId?: number, dryRun = false) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    if (organizationId) formData.append('organization_id', String(organizationId));
+    formData.append('dry_run', String(dryRun));
+    return api.post('/sub-activities/bulk_import/', formData, {
+      headers: { 'Content-Type': 'multipart/form-data' }
+    });
+  }
 };
 
 // Plans service
 export const plans = {
   async getAll() {
     try {
-      const timestamp = new Date().getTime();
-      const response = await api.get(`/plans/?_=${timestamp}`);
+      const response = await api.get('/plans/');
       return response;
     } catch (error) {
       console.error('Failed to get plans:', error);
       throw error;
     }
   },
+
+  getPage(options: { cursor?: string | null; pageSize?: number } = {}) {
+    return fetchCursorPage('/plans/', options);
+  },
+
+  // Budget totals read from the server-maintained plan budget summary table
+  getBudgetSummary(planId: string | number) {
+    return api.get(`/plans/${planId}/budget_summary/`);
+  },
+
+  getBudgetSummaries(params: { fiscal_year?: string; status?: string } = {}) {
+    return api.get('/plans/budget_summaries/', { params });
+  },
+
+  // "Strategic Plan" workbooks built on the server; save the returned blob as an .xlsx file
+  exportXlsx(planId: string | number, language: 'en' | 'am' = 'en') {
+    return api.get(`/plans/${planId}/export.xlsx/`, { params: { language }, responseType: 'blob' });
+  },
+
+  exportXlsxMany(params: { fiscal_year?: string; organization?: string | number; status?: string; language?: 'en' | 'am' }) {
+    return api.get('/plans/export.xlsx/', { params, responseType: 'blob' });
+  },
+
+  // Server-rendered PDF; the first download of a new plan version may answer 202 while it renders
+  async exportPdf(planId: string | number, attempts: number = 12) {
+    for (let attempt = 0; attempt < attempts; attempt++) {
+      const response = await api.get(`/plans/${planId}/export.pdf/`, { responseType: 'blob' });
+      if (response.status !== 202) return response;
+      const retryAfter = Number(response.headers['retry-after']) || 5;
+      await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+    }
+    throw new Error('The plan PDF is still being rendered, please try again shortly');
+  },
   
   async getById(id: string) {
     try {
@@ -1751,6 +1911,18 @@ export const plans = {
       throw error;
     }
   },
+
+  // Approve/reject many submitted plans in one transaction; returns one result per plan
+  async bulkReview(reviews: { plan: string | number; status: 'APPROVED' | 'REJECTED'; feedback?: string }[], feedback: string = '') {
+    try {
+      await ensureCsrfToken();
+      const response = await api.post('/plans/bulk_review/', { reviews, feedback });
+      return response;
+    } catch (error) {
+      console.error('Failed to review plans:', error);
+      throw error;
+    }
+  },
   
   async getPendingReviews() {
     try {
@@ -1764,6 +1936,40 @@ export const plans = {
   }
 };
 
+// Dashboard statistics service (aggregated on the server)
+export const dashboard = {
+  async getStats(params: { fiscalYear?: string; organizationIds?: (string | number)[] } = {}) {
+    try {
+      const query: Record<string, string> = {};
+      if (params.fiscalYear) query.fiscal_year = params.fiscalYear;
+      if (params.organizationIds && params.organizationIds.length > 0) {
+        query.organization = params.organizationIds.join(',');
+      }
+      const response = await api.get('/dashboard/stats/', { params: query });
+      return response.data;
+    } catch (error) {
+      console.error('Failed to get dashboard statistics:', error);
+      throw error;
+    }
+  },
+
+  // Every organization with its own and subtree-wide budget, plan counts and weight completion
+  async getOrganizationRollup(params: { fiscalYear?: string; rootIds?: (string | number)[] } = {}) {
+    try {
+      const query: Record<string, string> = {};
+      if (params.fiscalYear) query.fiscal_year = params.fiscalYear;
+      if (params.rootIds && params.rootIds.length > 0) {
+        query.root = params.rootIds.join(',');
+      }
+      const response = await api.get('/dashboard/organization-rollup/', { params: query });
+      return response.data;
+    } catch (error) {
+      console.error('Failed to get organization rollup:', error);
+      throw error;
+    }
+  }
+};
+
 // Utility export functions
 export const processDataForExport = (objectives: any[], language: string = 'en'): any[] => {
   return []; // Placeholder - implement actual export processing
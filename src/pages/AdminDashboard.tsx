@@ -8,7 +8,7 @@ import {
   Activity, Briefcase, GraduationCap, MessageSquare, Wrench, FileText, Package
 } from 'lucide-react';
 import { useLanguage } from '../lib/i18n/LanguageContext';
-import { organizations, auth, api } from '../lib/api';
+import { organizations, auth, api, plans as plansApi } from '../lib/api';
 import { format } from 'date-fns';
 import { isAdmin } from '../types/user';
 import { Bar, Doughnut, Line } from 'react-chartjs-2';
@@ -139,26 +139,14 @@ const AdminDashboard: React.FC = () => {
         // Determine allowed organizations based on hierarchy
         const allOrgIds = allOrgs.map((org: any) => org.id);
         
-        // Function to check if org is descendant of parent
-        const isDescendantOf = (org: any, parentId: number, organizations: any[]): boolean => {
-          if (!org.parent) return false;
-          if (org.parent === parentId) return true;
-          
-          const parentOrg = organizations.find(o => o.id === org.parent);
-          return parentOrg ? isDescendantOf(parentOrg, parentId, organizations) : false;
-        };
-        
         if (adminOrg.type === 'MINISTER') {
           // Minister admin can see all organizations
           setAllowedOrgIds(allOrgIds);
           console.log('Minister admin - allowed to see all organizations:', allOrgIds.length);
         } else {
-          // Other parent organization admin can only see child organizations + self
-          const childOrgIds = allOrgs.filter((org: any) => 
-            org.id === adminOrgId || // Self
-            org.parent === adminOrgId || // Direct children
-            isDescendantOf(org, adminOrgId, allOrgs) // Indirect descendants
-          ).map((org: any) => org.id);
+          // Other parent organization admin can only see its own subtree (self included)
+          const subtree = await organizations.getDescendants(adminOrgId);
+          const childOrgIds = subtree.map((org: any) => org.id);
           
           setAllowedOrgIds(childOrgIds);
           console.log(`${adminOrg.type} admin - allowed to see hierarchy organizations:`, childOrgIds.length);
@@ -183,7 +171,8 @@ const AdminDashboard: React.FC = () => {
         // Fetch sub-activities and main activities in parallel for better performance
         const [subActivitiesResponse, mainActivitiesResponse] = await Promise.all([
           api.get('/sub-activities/'),
-          api.get('/main-activities/')
+          // Only the organization of each main activity is needed here
+          api.get('/main-activities/', { params: { fields: 'id,organization' } })
         ]);
         
         const allSubActivities = subActivitiesResponse.data?.results || subActivitiesResponse.data || [];
@@ -240,19 +229,24 @@ const AdminDashboard: React.FC = () => {
     retry: 2
   });
 
-  // Helper function to calculate plan budget from sub-activities (MOVED UP TO AVOID REFERENCE ERROR)
+  // Per-plan budget totals maintained on the server (one row per plan)
+  const { data: planBudgetSummaries } = useQuery({
+    queryKey: ['plans', 'budget-summaries'],
+    queryFn: async () => {
+      const response = await plansApi.getBudgetSummaries();
+      const byPlan = new Map<string, number>();
+      (response.data || []).forEach((row: any) => {
+        byPlan.set(String(row.plan), Number(row.total_budget || 0));
+      });
+      return byPlan;
+    },
+    enabled: isAuthInitialized,
+    staleTime: 2 * 60 * 1000
+  });
+
+  // Helper function to get a plan's budget (MOVED UP TO AVOID REFERENCE ERROR)
   const calculatePlanBudgetFromSubActivities = (planId: string) => {
-    const subActivities = directSubActivitiesData?.data || [];
-    
-    // For now, we'll estimate based on organization (more complex plan-to-subactivity mapping would require additional API calls)
-    const planSubActivities = subActivities; // All sub-activities for simplicity
-    
-    return planSubActivities.reduce((sum, subActivity) => {
-      const cost = subActivity.budget_calculation_type === 'WITH_TOOL'
-        ? Number(subActivity.estimated_cost_with_tool || 0)
-        : Number(subActivity.estimated_cost_without_tool || 0);
-      return sum + cost;
-    }, 0);
+    return planBudgetSummaries?.get(String(planId)) || 0;
   };
 
   // Fetch all plans for admin overview
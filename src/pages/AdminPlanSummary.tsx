@@ -96,7 +96,7 @@ const AdminPlanSummary: React.FC = () => {
                       
                       // Get ALL main activities for this initiative  
                       const activitiesResponse = await api.get('/main-activities/', {
-                        params: { initiative: initiative.id }
+                        params: { initiative: initiative.id, expand: 'sub_activities' }
                       });
                       const allActivities = activitiesResponse.data?.results || activitiesResponse.data || [];
                       
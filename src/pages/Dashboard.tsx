@@ -133,26 +133,14 @@ const AdminDashboard: React.FC = () => {
         // Determine allowed organizations based on hierarchy
         const allOrgIds = allOrgs.map((org: any) => org.id);
         
-        // Function to check if org is descendant of parent
-        const isDescendantOf = (org: any, parentId: number, organizations: any[]): boolean => {
-          if (!org.parent) return false;
-          if (org.parent === parentId) return true;
-          
-          const parentOrg = organizations.find(o => o.id === org.parent);
-          return parentOrg ? isDescendantOf(parentOrg, parentId, organizations) : false;
-        };
-        
         if (adminOrg.type === 'MINISTER') {
           // Minister admin can see all organizations
           setAllowedOrgIds(allOrgIds);
           console.log('Minister admin - allowed to see all organizations:', allOrgIds.length);
         } else {
-          // Other parent organization admin can only see child organizations + self
-          const childOrgIds = allOrgs.filter((org: any) => 
-            org.id === adminOrgId || // Self
-            org.parent === adminOrgId || // Direct children
-            isDescendantOf(org, adminOrgId, allOrgs) // Indirect descendants
-          ).map((org: any) => org.id);
+          // Other parent organization admin can only see its own subtree (self included)
+          const subtree = await organizations.getDescendants(adminOrgId);
+          const childOrgIds = subtree.map((org: any) => org.id);
           
           setAllowedOrgIds(childOrgIds);
           console.log(`${adminOrg.type} admin - allowed to see hierarchy organizations:`, childOrgIds.length);
@@ -177,7 +165,8 @@ const AdminDashboard: React.FC = () => {
         // Fetch sub-activities and main activities in parallel for better performance
         const [subActivitiesResponse, mainActivitiesResponse] = await Promise.all([
           api.get('/sub-activities/'),
-          api.get('/main-activities/')
+          // Only the organization of each main activity is needed here
+          api.get('/main-activities/', { params: { fields: 'id,organization' } })
         ]);
         
         const allSubActivities = subActivitiesResponse.data?.results || subActivitiesResponse.data || [];
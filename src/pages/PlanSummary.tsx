@@ -6,7 +6,6 @@ import { useLanguage } from '../lib/i18n/LanguageContext';
 import { plans, auth, api } from '../lib/api';
 import { format } from 'date-fns';
 import PlanReviewTable from '../components/PlanReviewTable';
-import { exportToExcel, exportToPDF } from '../lib/utils/export';
 import { isEvaluator, isAdmin } from '../types/user';
 
 const PlanSummary: React.FC = () => {
@@ -322,43 +321,36 @@ const PlanSummary: React.FC = () => {
 
   const budgetSummary = calculateBudgetSummary();
 
-  const handleExportExcel = () => {
-    if (!plan?.objectives) return;
+  const downloadBlob = (blob: Blob, filename: string) => {
+    const url = URL.createObjectURL(blob);
+    const link = document.createElement('a');
+    link.href = url;
+    link.download = filename;
+    document.body.appendChild(link);
+    link.click();
+    link.remove();
+    URL.revokeObjectURL(url);
+  };
+
+  const handleExportExcel = async () => {
+    if (!planId) return;
     
     try {
-      exportToExcel(
-        plan.objectives,
-        `plan-${planId}-${new Date().toISOString().slice(0, 10)}`,
-        'en',
-        {
-          organization: plan.organization_name,
-          planner: plan.planner_name,
-          fromDate: plan.from_date,
-          toDate: plan.to_date,
-          planType: plan.type
-        }
-      );
+      // Built and streamed by the server; large plans no longer stall the browser
+      const response = await plans.exportXlsx(planId);
+      downloadBlob(response.data, `plan-${planId}-${new Date().toISOString().slice(0, 10)}.xlsx`);
     } catch (error) {
       console.error('Error exporting to Excel:', error);
     }
   };
 
-  const handleExportPDF = () => {
-    if (!plan?.objectives) return;
+  const handleExportPDF = async () => {
+    if (!planId) return;
     
     try {
-      exportToPDF(
-        plan.objectives,
-        `plan-${planId}-${new Date().toISOString().slice(0, 10)}`,
-        'en',
-        {
-          organization: plan.organization_name,
-          planner: plan.planner_name,
-          fromDate: plan.from_date,
-          toDate: plan.to_date,
-          planType: plan.type
-        }
-      );
+      // Rendered once per plan version on the server and served from its cache
+      const response = await plans.exportPdf(planId);
+      downloadBlob(response.data, `plan-${planId}-${new Date().toISOString().slice(0, 10)}.pdf`);
     } catch (error) {
       console.error('Error exporting to PDF:', error);
     }